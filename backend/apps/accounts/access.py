@@ -0,0 +1,98 @@
+"""
+Resolución de los cofres accesibles por un usuario.
+
+Los ids se calculan una vez por petición y se guardan en caché hasta que
+cambia un Vault o VaultMember del usuario (ver signals.py). Las vistas
+filtran con vault_id__in, sin joins contra vault_members ni DISTINCT.
+
+La caché entre peticiones solo se usa si el backend es compartido entre
+procesos: con una caché local cada worker tendría su copia y la
+invalidación solo borraría la del proceso que hizo el cambio, dejando a un
+miembro quitado con acceso en los demás. En ese caso los ids se guardan
+solo durante la petición.
+"""
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from .models import Vault, VaultMember
+
+_REQUEST_ATTR = '_accessible_vault_ids'
+
+# SQLite admite como mucho 500 SELECT en una consulta compuesta
+_MAX_MERGED_VAULTS = 100
+
+
+def _cache_key(user_id):
+    return f'accounts:vault_ids:{user_id}'
+
+
+def _shared_cache():
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _load_vault_ids(user):
+    owned = Vault.objects.filter(owner=user).order_by().values_list('id', flat=True)
+    shared = VaultMember.objects.filter(user=user).order_by().values_list('vault_id', flat=True)
+    return frozenset(owned.union(shared))
+
+
+def accessible_vault_ids(request):
+    """
+    Devuelve los ids de los cofres que el usuario de la petición puede ver
+    """
+    vault_ids = getattr(request, _REQUEST_ATTR, None)
+    if vault_ids is not None:
+        return vault_ids
+
+    user = request.user
+    if not user.is_authenticated:
+        vault_ids = frozenset()
+    elif not _shared_cache():
+        vault_ids = _load_vault_ids(user)
+    else:
+        key = _cache_key(user.pk)
+        vault_ids = cache.get(key)
+        if vault_ids is None:
+            vault_ids = _load_vault_ids(user)
+            cache.set(key, vault_ids, settings.VAULT_ACCESS_CACHE_TIMEOUT)
+
+    setattr(request, _REQUEST_ATTR, vault_ids)
+    return vault_ids
+
+
+def has_vault_access(request, vault_id):
+    """
+    Indica si el usuario de la petición puede acceder al cofre
+    """
+    return vault_id in accessible_vault_ids(request)
+
+
+def invalidate_vault_access(*user_ids):
+    """
+    Descarta los cofres en caché de los usuarios indicados al confirmar la transacción
+    """
+    if not _shared_cache():
+        return
+    keys = [_cache_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def merge_vaults(queryset, vault_ids):
+    """
+    Filtra por cofres y conserva el orden del queryset leyendo cada cofre por separado.
+
+    Con vault_id IN (...) el índice (vault, ...) solo da filas ordenadas
+    dentro de cada cofre y el motor ordena todo en una tabla temporal. Con un
+    UNION ALL de una rama por cofre cada rama recorre el índice en orden y
+    el motor las mezcla hasta llegar al LIMIT. El resultado solo admite
+    ordenar, paginar y contar: los filtros van antes.
+    """
+    vault_ids = list(vault_ids)
+    if len(vault_ids) < 2 or len(vault_ids) > _MAX_MERGED_VAULTS:
+        return queryset.filter(vault_id__in=vault_ids)
+
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    parts = [queryset.filter(vault_id=vault_id).order_by() for vault_id in vault_ids]
+    return parts[0].union(*parts[1:], all=True).order_by(*ordering)
@@ -0,0 +1,437 @@
+"""
+Exportación e importación de un cofre completo como archivo zip.
+
+El zip contiene manifest.json, un NDJSON por tipo de objeto (SECTIONS) y los
+archivos de media en media/<ruta original>. La exportación es un generador:
+zipfile escribe sobre un flujo no posicionable (con descriptores de datos
+tras cada entrada) y cada bloque se entrega en cuanto se produce, así que la
+memoria no depende del tamaño del cofre ni de sus archivos.
+
+La importación crea un cofre nuevo: lee cada NDJSON línea a línea, asigna
+ids nuevos (mapeando las referencias entre objetos) e inserta con
+bulk_create por lotes.
+"""
+import io
+import json
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from apps.conversation.models import ConversationSession, Phrase, PhraseTag
+from apps.genealogy.models import Person, PersonMemory, Relation
+from apps.media import audio, blobs, derivatives, zips
+from apps.memories.bulk import bulk_create_memories
+from apps.memories.models import Memory, MemoryComment
+from apps.memories.stats import rebuild_rollups
+from apps.memories.tags import sync_tags
+from .models import User, Vault
+
+ARCHIVE_FORMAT = 'nonna-vault'
+ARCHIVE_VERSION = 1
+MEDIA_DIR = 'media'
+
+BATCH_SIZE = 500
+_FLUSH_SIZE = 256 * 1024
+_COPY_BLOCK_SIZE = 64 * 1024
+
+# (sección, modelo, campos exportados) en el orden en que se importan
+SECTIONS = [
+    ('persons', Person, [
+        'id', 'first_name', 'last_name', 'middle_name', 'birth_date', 'death_date',
+        'birth_place', 'death_place', 'email', 'phone', 'address', 'photo', 'documents',
+        'occupation', 'notes', 'is_living', 'created_at', 'updated_at',
+    ]),
+    ('memories', Memory, [
+        'id', 'title', 'description', 'type', 'photo', 'audio', 'video', 'date_taken',
+        'location', 'tags', 'created_at', 'updated_at',
+    ]),
+    ('person_memories', PersonMemory, ['person', 'memory', 'role', 'created_at']),
+    ('relations', Relation, [
+        'id', 'person1', 'person2', 'relation_type', 'start_date', 'end_date', 'notes',
+        'created_at', 'updated_at',
+    ]),
+    ('comments', MemoryComment, ['id', 'memory', 'text', 'created_at', 'updated_at']),
+    ('phrases', Phrase, [
+        'id', 'text', 'translation', 'category', 'context', 'person_mentioned', 'language',
+        'audio_file', 'audio_duration', 'tags', 'is_favorite', 'usage_count',
+        'created_at', 'updated_at',
+    ]),
+    ('sessions', ConversationSession, [
+        'id', 'name', 'description', 'auto_play', 'shuffle_order', 'total_playbacks',
+        'last_played', 'created_at', 'updated_at',
+    ]),
+]
+
+# Campos de archivo por modelo
+MEDIA_FIELDS = {
+    Person: ['photo'],
+    Memory: ['photo', 'audio', 'video'],
+    Phrase: ['audio_file'],
+}
+
+
+class ArchiveError(ValueError):
+    """
+    Archivo de importación inválido
+    """
+
+
+def _querysets(vault):
+    return {
+        'persons': Person.objects.filter(vault=vault),
+        'memories': Memory.objects.filter(vault=vault),
+        'person_memories': PersonMemory.objects.filter(person__vault=vault, memory__vault=vault),
+        'relations': Relation.objects.filter(vault=vault),
+        'comments': MemoryComment.objects.filter(memory__vault=vault).select_related('user'),
+        'phrases': Phrase.objects.filter(vault=vault),
+        'sessions': ConversationSession.objects.filter(vault=vault).prefetch_related('phrases'),
+    }
+
+
+# Exportación
+
+class _ZipStream(io.RawIOBase):
+    """
+    Destino no posicionable del zip: acumula lo escrito hasta que se drena
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self.pending = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.pending = 0
+        return data
+
+
+def _record(instance, fields):
+    record = {}
+    for name in fields:
+        field = instance._meta.get_field(name)
+        value = getattr(instance, field.attname)
+        if hasattr(value, 'name') and not isinstance(value, str):
+            value = value.name or None
+        record[name] = value
+    if isinstance(instance, MemoryComment):
+        # Los usuarios se emparejan por email al importar en otro servidor
+        record['user_email'] = instance.user.email
+    elif isinstance(instance, ConversationSession):
+        record['phrases'] = [phrase.pk for phrase in instance.phrases.all()]
+    return record
+
+
+def _entry(name, compress_type=zipfile.ZIP_DEFLATED, size=None):
+    info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+    info.compress_type = compress_type
+    if size is not None:
+        info.file_size = size
+    return info
+
+
+def export_archive(vault):
+    """
+    Generador con los bytes del zip del cofre
+    """
+    stream = _ZipStream()
+    media_names = set()
+    with zipfile.ZipFile(stream, 'w') as archive:
+        manifest = {
+            'format': ARCHIVE_FORMAT,
+            'version': ARCHIVE_VERSION,
+            'exported_at': timezone.now(),
+            'vault': {'id': vault.id, 'name': vault.name, 'description': vault.description},
+            'sections': [section for section, _, _ in SECTIONS],
+        }
+        archive.writestr(_entry('manifest.json'), json.dumps(manifest, cls=DjangoJSONEncoder, indent=2))
+
+        querysets = _querysets(vault)
+        for section, model, fields in SECTIONS:
+            with archive.open(_entry(f'{section}.ndjson'), 'w', force_zip64=True) as entry:
+                for instance in querysets[section].order_by().iterator(chunk_size=BATCH_SIZE):
+                    record = _record(instance, fields)
+                    entry.write(json.dumps(record, cls=DjangoJSONEncoder).encode() + b'\n')
+                    for field_name in MEDIA_FIELDS.get(model, []):
+                        if record[field_name]:
+                            media_names.add(record[field_name])
+                    if stream.pending >= _FLUSH_SIZE:
+                        yield stream.drain()
+            yield stream.drain()
+
+        for name in sorted(media_names):
+            if not default_storage.exists(name):
+                continue
+            # Los archivos de media ya vienen comprimidos
+            info = _entry(f'{MEDIA_DIR}/{name}', zipfile.ZIP_STORED, default_storage.size(name))
+            with default_storage.open(name, 'rb') as source, archive.open(info, 'w') as entry:
+                for block in iter(lambda: source.read(_COPY_BLOCK_SIZE), b''):
+                    entry.write(block)
+                    if stream.pending >= _FLUSH_SIZE:
+                        yield stream.drain()
+            yield stream.drain()
+    yield stream.drain()
+
+
+# Importación
+
+def read_manifest(archive):
+    try:
+        zips.check_limits(archive.infolist())
+    except zips.ZipLimitError as exc:
+        raise ArchiveError(str(exc))
+    try:
+        manifest = json.loads(archive.read('manifest.json'))
+    except (KeyError, ValueError):
+        raise ArchiveError('El archivo no tiene un manifest.json válido')
+    if manifest.get('format') != ARCHIVE_FORMAT:
+        raise ArchiveError('El archivo no es una exportación de un cofre')
+    if manifest.get('version', 0) > ARCHIVE_VERSION:
+        raise ArchiveError('La exportación es de una versión más nueva')
+    return manifest
+
+
+def _records(archive, section):
+    try:
+        entry = archive.open(f'{section}.ndjson')
+    except KeyError:
+        return
+    with io.TextIOWrapper(entry, encoding='utf-8') as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _batches(records):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Importer:
+    def __init__(self, archive, owner, vault):
+        self.archive = archive
+        self.owner = owner
+        self.vault = vault
+        self.ids = {}          # (sección, id original) -> id nuevo
+        self.media = {}        # ruta original -> ruta nueva
+        self.media_names = []  # rutas guardadas, para contar referencias de blobs
+        self.counts = {}
+
+    def new_id(self, section, old_id):
+        new_id = uuid.uuid4()
+        self.ids[(section, old_id)] = new_id
+        return new_id
+
+    def ref(self, section, old_id):
+        return self.ids.get((section, old_id))
+
+    def attach_media(self, instance, field_name, old_name):
+        if not old_name:
+            return
+        if old_name not in self.media:
+            try:
+                entry = self.archive.open(f'{MEDIA_DIR}/{old_name}')
+            except KeyError:
+                self.media[old_name] = None
+            else:
+                with entry:
+                    field_file = getattr(instance, field_name)
+                    field_file.save(os.path.basename(old_name), File(entry), save=False)
+                    self.media[old_name] = field_file.name
+        if self.media[old_name]:
+            setattr(instance, field_name, self.media[old_name])
+            self.media_names.append(self.media[old_name])
+
+    def build(self, model, record, fields, **extra):
+        values = {name: record.get(name) for name in fields if name in record and name != 'id'}
+        for field_name in MEDIA_FIELDS.get(model, []):
+            values.pop(field_name, None)
+        instance = model(**values, **extra)
+        for field_name in MEDIA_FIELDS.get(model, []):
+            self.attach_media(instance, field_name, record.get(field_name))
+        # bulk_create sobrescribe las fechas automáticas; se restauran después
+        instance._archived_dates = (record.get('created_at'), record.get('updated_at'))
+        return instance
+
+    def restore_dates(self, model, instances):
+        fields = [
+            name for name in ('created_at', 'updated_at')
+            if any(field.name == name for field in model._meta.fields)
+        ]
+        for instance in instances:
+            for name, value in zip(('created_at', 'updated_at'), instance._archived_dates):
+                if value and name in fields:
+                    setattr(instance, name, value)
+        model.objects.bulk_update(instances, fields, batch_size=BATCH_SIZE)
+
+    def run(self):
+        fields_by_section = {section: fields for section, _, fields in SECTIONS}
+        for section, model, _ in SECTIONS:
+            handler = getattr(self, f'import_{section}')
+            total = 0
+            for batch in _batches(_records(self.archive, section)):
+                total += handler(batch, fields_by_section[section])
+            self.counts[section] = total
+
+    def import_persons(self, batch, fields):
+        persons = [
+            self.build(
+                Person, record, fields, id=self.new_id('persons', record['id']),
+                vault=self.vault, created_by=self.owner,
+            )
+            for record in batch
+        ]
+        Person.objects.bulk_create(persons)
+        self.restore_dates(Person, persons)
+        return len(persons)
+
+    def import_memories(self, batch, fields):
+        memories = [
+            self.build(
+                Memory, record, fields, id=self.new_id('memories', record['id']),
+                vault=self.vault, created_by=self.owner,
+            )
+            for record in batch
+        ]
+        bulk_create_memories(memories)
+        self.restore_dates(Memory, memories)
+        return len(memories)
+
+    def import_person_memories(self, batch, fields):
+        links = []
+        for record in batch:
+            person_id = self.ref('persons', record['person'])
+            memory_id = self.ref('memories', record['memory'])
+            if person_id and memory_id:
+                links.append(PersonMemory(
+                    person_id=person_id, memory_id=memory_id, role=record.get('role') or 'subject'
+                ))
+        PersonMemory.objects.bulk_create(links, ignore_conflicts=True)
+        return len(links)
+
+    def import_relations(self, batch, fields):
+        relations = []
+        for record in batch:
+            person1_id = self.ref('persons', record['person1'])
+            person2_id = self.ref('persons', record['person2'])
+            if not (person1_id and person2_id):
+                continue
+            relations.append(self.build(
+                Relation, record, [name for name in fields if name not in ('person1', 'person2')],
+                id=self.new_id('relations', record['id']),
+                person1_id=person1_id, person2_id=person2_id, vault=self.vault,
+            ))
+        Relation.objects.bulk_create(relations)
+        self.restore_dates(Relation, relations)
+        return len(relations)
+
+    def import_comments(self, batch, fields):
+        emails = {record.get('user_email') for record in batch if record.get('user_email')}
+        users = dict(User.objects.filter(email__in=emails).values_list('email', 'id'))
+        comments = []
+        for record in batch:
+            memory_id = self.ref('memories', record['memory'])
+            if not memory_id:
+                continue
+            comments.append(self.build(
+                MemoryComment, record, [name for name in fields if name != 'memory'],
+                id=self.new_id('comments', record['id']), memory_id=memory_id,
+                user_id=users.get(record.get('user_email'), self.owner.pk),
+            ))
+        MemoryComment.objects.bulk_create(comments)
+        self.restore_dates(MemoryComment, comments)
+        return len(comments)
+
+    def import_phrases(self, batch, fields):
+        phrases = [
+            self.build(
+                Phrase, record, fields, id=self.new_id('phrases', record['id']),
+                vault=self.vault, created_by=self.owner,
+            )
+            for record in batch
+        ]
+        Phrase.objects.bulk_create(phrases)
+        self.restore_dates(Phrase, phrases)
+        sync_tags(PhraseTag, 'phrase', phrases)
+        return len(phrases)
+
+    def import_sessions(self, batch, fields):
+        sessions = []
+        links = []
+        through = ConversationSession.phrases.through
+        for record in batch:
+            session = self.build(
+                ConversationSession, record, fields, id=self.new_id('sessions', record['id']),
+                vault=self.vault, created_by=self.owner,
+            )
+            sessions.append(session)
+            for old_id in record.get('phrases', []):
+                phrase_id = self.ref('phrases', old_id)
+                if phrase_id:
+                    links.append(through(conversationsession_id=session.id, phrase_id=phrase_id))
+        ConversationSession.objects.bulk_create(sessions)
+        self.restore_dates(ConversationSession, sessions)
+        through.objects.bulk_create(links, ignore_conflicts=True)
+        return len(sessions)
+
+
+def import_archive(source, owner, name=None):
+    """
+    Crea un cofre de owner con el contenido del zip source (archivo
+    posicionable). Devuelve (cofre, cantidad importada por sección).
+    """
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise ArchiveError('El archivo no es un zip válido')
+
+    with archive:
+        manifest = read_manifest(archive)
+        with transaction.atomic():
+            vault = Vault.objects.create(
+                name=name or manifest['vault'].get('name') or 'Cofre importado',
+                description=manifest['vault'].get('description', ''),
+                owner=owner,
+            )
+            importer = _Importer(archive, owner, vault)
+            importer.run()
+
+            # bulk_create no dispara señales: referencias de blobs, contadores,
+            # agregados y procesamiento de media se hacen aquí
+            blobs.retain(importer.media_names)
+            Memory.objects.filter(vault=vault).rebuild_counters()
+            rebuild_rollups([vault.id])
+            processors = [(derivatives, source[:2]) for source in derivatives.SOURCES]
+            processors += [(audio, source[:2]) for source in audio.SOURCES]
+            for module, (label, field_name) in processors:
+                model = apps.get_model(label)
+                if model not in MEDIA_FIELDS:
+                    continue
+                pks = model.objects.filter(vault=vault).exclude(**{field_name: ''}).exclude(
+                    **{f'{field_name}__isnull': True}
+                ).values_list('pk', flat=True)
+                for pk in pks:
+                    module.schedule(model(pk=pk), field_name)
+
+    return vault, importer.counts
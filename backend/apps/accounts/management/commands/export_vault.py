@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounts.archive import export_archive
+from apps.accounts.models import Vault
+
+
+class Command(BaseCommand):
+    help = 'Exporta un cofre completo (datos y archivos) a un zip'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('vault_id', help='Id del cofre')
+        parser.add_argument('output', help='Ruta del zip a escribir')
+    
+    def handle(self, *args, **options):
+        try:
+            vault = Vault.objects.get(id=options['vault_id'])
+        except (Vault.DoesNotExist, ValueError):
+            raise CommandError('Vault no encontrado')
+        
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in export_archive(vault):
+                output.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'{vault.name} exportado ({size} bytes)'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounts.archive import ArchiveError, import_archive
+from apps.accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Crea un cofre a partir de un zip exportado con export_vault'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help='Ruta del zip')
+        parser.add_argument('--owner', required=True, help='Email del propietario del cofre nuevo')
+        parser.add_argument('--name', help='Nombre del cofre (por defecto, el del zip)')
+    
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError('Usuario no encontrado')
+        
+        try:
+            with open(options['archive'], 'rb') as source:
+                vault, counts = import_archive(source, owner, options['name'])
+        except ArchiveError as exc:
+            raise CommandError(str(exc))
+        
+        summary = ', '.join(f'{total} {section}' for section, total in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Cofre {vault.id} creado: {summary}'))
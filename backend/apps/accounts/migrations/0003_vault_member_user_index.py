@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_vault_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vaultmember',
+            index=models.Index(fields=['user', 'vault'], name='vault_members_user_vault_idx'),
+        ),
+    ]
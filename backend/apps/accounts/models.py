@@ -11,6 +11,7 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     name = models.CharField(max_length=100)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
     phone = models.CharField(
         max_length=15,
         validators=[RegexValidator(regex=r'^\+?1?\d{9,15}$')],
@@ -76,6 +77,9 @@ class VaultMember(models.Model):
     class Meta:
         db_table = 'vault_members'
         unique_together = ['vault', 'user']
+        indexes = [
+            models.Index(fields=['user', 'vault'], name='vault_members_user_vault_idx'),
+        ]
         verbose_name = 'Miembro del Cofre'
         verbose_name_plural = 'Miembros del Cofre'
     
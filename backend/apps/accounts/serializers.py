@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from apps.media.fields import RenditionsField
 from .models import User, Vault, VaultMember
 
 
@@ -44,9 +45,11 @@ class UserLoginSerializer(serializers.Serializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar_renditions = RenditionsField()
+    
     class Meta:
         model = User
-        fields = ('id', 'email', 'username', 'name', 'avatar', 'phone', 
+        fields = ('id', 'email', 'username', 'name', 'avatar', 'avatar_renditions', 'phone', 
                  'birth_date', 'is_premium', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
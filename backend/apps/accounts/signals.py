@@ -0,0 +1,39 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .access import invalidate_vault_access
+from .models import Vault, VaultMember
+
+
+@receiver(pre_save, sender=Vault)
+def remember_vault_owner(sender, instance, **kwargs):
+    instance._previous_owner_id = None
+    if not instance._state.adding:
+        instance._previous_owner_id = Vault.objects.filter(pk=instance.pk).values_list(
+            'owner_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Vault)
+def invalidate_vault_owner_access(sender, instance, **kwargs):
+    invalidate_vault_access(instance.owner_id, getattr(instance, '_previous_owner_id', None))
+
+
+@receiver(post_delete, sender=Vault)
+def invalidate_deleted_vault_access(sender, instance, **kwargs):
+    # Los miembros se borran en cascada y disparan su propia invalidación
+    invalidate_vault_access(instance.owner_id)
+
+
+@receiver(pre_save, sender=VaultMember)
+def remember_member_user(sender, instance, **kwargs):
+    instance._previous_user_id = None
+    if not instance._state.adding:
+        instance._previous_user_id = VaultMember.objects.filter(pk=instance.pk).values_list(
+            'user_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=VaultMember)
+@receiver(post_delete, sender=VaultMember)
+def invalidate_member_access(sender, instance, **kwargs):
+    invalidate_vault_access(instance.user_id, getattr(instance, '_previous_user_id', None))
@@ -0,0 +1,19 @@
+"""
+Tareas en segundo plano de cuentas y cofres (ver apps.jobs)
+"""
+import os
+from apps.jobs.queue import task
+from .archive import import_archive
+from .models import User
+
+
+@task('accounts.import_vault', max_attempts=1)
+def import_vault(path, owner_id, name=None):
+    try:
+        owner = User.objects.get(pk=owner_id)
+        with open(path, 'rb') as source:
+            vault, counts = import_archive(source, owner, name)
+        return {'vault': str(vault.id), 'counts': counts}
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
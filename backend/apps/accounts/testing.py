@@ -0,0 +1,136 @@
+"""
+Utilidades de pruebas para comprobar con EXPLAIN los planes de las consultas.
+
+Una consulta falla si recorre completa alguna de las tablas indicadas o si
+necesita ordenar en una tabla temporal. En PostgreSQL se desactivan los
+recorridos secuenciales y las ordenaciones para comprobar que existe un
+índice utilizable aunque las tablas de prueba sean pequeñas.
+"""
+import json
+import re
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from .access import _load_vault_ids
+from .models import User, Vault, VaultMember
+
+_SQLITE_SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?(\w+)')
+
+
+def explain(sql):
+    """
+    Devuelve el plan de una consulta SQL ya interpolada, en texto y en árbol (PostgreSQL)
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(row[3] for row in cursor.fetchall()), None
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+        plan = cursor.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return json.dumps(plan, indent=2), plan[0]['Plan']
+
+
+def plan_problems(sql, tables, allow_sort=False):
+    """
+    Devuelve el plan en texto y la lista de problemas encontrados
+    """
+    plan, node = explain(sql)
+    if connection.vendor == 'sqlite':
+        return plan, _sqlite_problems(plan, tables, allow_sort)
+    return plan, _postgres_problems(node, tables, allow_sort)
+
+
+def _sqlite_problems(plan, tables, allow_sort):
+    problems = []
+    for line in plan.splitlines():
+        match = _SQLITE_SCAN_RE.search(line)
+        if match and match.group(1) in tables:
+            problems.append(f'recorrido completo de {match.group(1)}')
+        if 'USE TEMP B-TREE' in line and not allow_sort:
+            problems.append('ordenación temporal')
+    return problems
+
+
+def _postgres_problems(node, tables, allow_sort):
+    problems = []
+    if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in tables:
+        problems.append(f'recorrido completo de {node["Relation Name"]}')
+    if node['Node Type'] in ('Sort', 'Incremental Sort') and not allow_sort:
+        problems.append('ordenación temporal')
+    for child in node.get('Plans', []):
+        problems.extend(_postgres_problems(child, tables, allow_sort))
+    return problems
+
+
+class QueryPlanTestCase(APITestCase):
+    """
+    Usuario dueño de un cofre y miembro de otro, más un tercer cofre ajeno con
+    más datos para que filtrar por cofre sea selectivo.
+    
+    Las subclases siembran sus datos en seed(); después se ejecuta ANALYZE.
+    """
+    rows = 300
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='nonna', email='nonna@example.com', password='secreta', name='Nonna'
+        )
+        other = User.objects.create_user(
+            username='zia', email='zia@example.com', password='secreta', name='Zia'
+        )
+        cls.vault = Vault.objects.create(name='Familia', owner=cls.user)
+        shared = Vault.objects.create(name='Rama materna', owner=other)
+        VaultMember.objects.create(vault=shared, user=cls.user)
+        foreign = Vault.objects.create(name='Otra familia', owner=other)
+        cls.vault_ids = _load_vault_ids(cls.user)
+        cls.seeded_vaults = [(cls.vault, cls.rows), (shared, cls.rows), (foreign, cls.rows * 4)]
+    
+        cls.seed()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    
+    @classmethod
+    def seed(cls):
+        pass
+    
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+    
+    def assertUsesIndexes(self, queryset, tables, allow_sort=False):
+        """
+        Evalúa el queryset y comprueba el plan de las consultas que ejecuta
+        """
+        with CaptureQueriesContext(connection) as context:
+            list(queryset)
+        self.assertPlansUseIndexes(context.captured_queries, tables, allow_sort)
+    
+    def assertRequestUsesIndexes(self, path, tables, params=None, allow_sort=False):
+        """
+        Hace la petición y comprueba el plan de todas las consultas que ejecuta.
+        
+        allow_sort admite ordenar en una tabla temporal las pocas filas que
+        deja un filtro selectivo (p. ej. por etiqueta).
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertPlansUseIndexes(context.captured_queries, tables, allow_sort)
+        return response
+    
+    def assertPlansUseIndexes(self, captured_queries, tables, allow_sort=False):
+        failures = []
+        for query in captured_queries:
+            sql = query['sql']
+            # Solo importan las consultas que leen alguna de las tablas indicadas
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            if not any(f'"{table}"' in sql for table in tables):
+                continue
+            plan, problems = plan_problems(sql, set(tables), allow_sort)
+            if problems:
+                failures.append(f'{", ".join(problems)}\n{sql}\n{plan}')
+        self.assertFalse(failures, '\n\n'.join(failures))
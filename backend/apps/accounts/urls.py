@@ -9,7 +9,9 @@ urlpatterns = [
     path('profile/', views.UserProfileView.as_view(), name='user_profile'),
     path('update/', views.UserUpdateView.as_view(), name='user_update'),
     path('vaults/', views.VaultListCreateView.as_view(), name='vault_list_create'),
+    path('vaults/import/', views.vault_import, name='vault_import'),
     path('vaults/<uuid:vault_id>/', views.VaultDetailView.as_view(), name='vault_detail'),
+    path('vaults/<uuid:vault_id>/export/', views.vault_export, name='vault_export'),
     path('vaults/<uuid:vault_id>/members/', views.VaultMemberListCreateView.as_view(), name='vault_member_list_create'),
     path('vaults/<uuid:vault_id>/members/<int:pk>/', views.VaultMemberDetailView.as_view(), name='vault_member_detail'),
 ]
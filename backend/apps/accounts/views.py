@@ -1,9 +1,22 @@
+import os
+import shutil
+import uuid
+import zipfile
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils.text import slugify
+from rest_framework.exceptions import NotFound
+from apps.jobs.queue import enqueue
+from apps.jobs.serializers import JobSerializer
+from .access import accessible_vault_ids, has_vault_access
+from .archive import ArchiveError, export_archive, read_manifest
 from .models import Vault, VaultMember
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
@@ -82,10 +95,7 @@ class VaultListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        return Vault.objects.filter(
-            models.Q(owner=user) | models.Q(members__user=user)
-        ).distinct()
+        return Vault.objects.filter(id__in=accessible_vault_ids(self.request))
 
 
 class VaultDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -94,12 +104,10 @@ class VaultDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     serializer_class = VaultDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    lookup_url_kwarg = 'vault_id'
     
     def get_queryset(self):
-        user = self.request.user
-        return Vault.objects.filter(
-            models.Q(owner=user) | models.Q(members__user=user)
-        ).distinct()
+        return Vault.objects.filter(id__in=accessible_vault_ids(self.request))
 
 
 class VaultMemberListCreateView(generics.ListCreateAPIView):
@@ -111,12 +119,15 @@ class VaultMemberListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         vault_id = self.kwargs['vault_id']
+        if not has_vault_access(self.request, vault_id):
+            return VaultMember.objects.none()
         return VaultMember.objects.filter(vault_id=vault_id)
     
     def perform_create(self, serializer):
         vault_id = self.kwargs['vault_id']
-        vault = Vault.objects.get(id=vault_id)
-        serializer.save(vault=vault)
+        if not has_vault_access(self.request, vault_id):
+            raise NotFound('Vault no encontrado')
+        serializer.save(vault_id=vault_id)
 
 
 class VaultMemberDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -128,6 +139,8 @@ class VaultMemberDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         vault_id = self.kwargs['vault_id']
+        if not has_vault_access(self.request, vault_id):
+            return VaultMember.objects.none()
         return VaultMember.objects.filter(vault_id=vault_id)
 
 
@@ -154,3 +167,66 @@ def refresh_token(request):
             {'error': 'Token inválido'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def vault_export(request, vault_id):
+    """
+    Vista para descargar un cofre completo (datos en NDJSON y archivos) como zip.
+    
+    El zip se genera mientras se envía, sin construirlo antes en memoria ni en disco.
+    """
+    if not has_vault_access(request, vault_id):
+        return Response(
+            {'error': 'Vault no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    vault = Vault.objects.get(id=vault_id)
+    response = StreamingHttpResponse(export_archive(vault), content_type='application/zip')
+    filename = slugify(vault.name) or 'cofre'
+    response['Content-Disposition'] = f'attachment; filename="{filename}.zip"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([MultiPartParser])
+def vault_import(request):
+    """
+    Vista para crear un cofre a partir de un zip exportado.
+    
+    La importación se hace en segundo plano; la respuesta incluye el trabajo
+    para consultar su estado en /api/jobs/<id>/.
+    """
+    archive = request.FILES.get('archive')
+    if archive is None:
+        return Response(
+            {'error': 'archive es requerido'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        with zipfile.ZipFile(archive) as zipped:
+            read_manifest(zipped)
+    except (zipfile.BadZipFile, ArchiveError) as exc:
+        message = str(exc) if isinstance(exc, ArchiveError) else 'El archivo no es un zip válido'
+        return Response(
+            {'error': message}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # El worker lee el zip desde disco
+    os.makedirs(settings.VAULT_IMPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.VAULT_IMPORT_DIR, f'{uuid.uuid4().hex}.zip')
+    archive.seek(0)
+    with open(path, 'wb') as target:
+        shutil.copyfileobj(archive, target)
+    
+    job = enqueue(
+        'accounts.import_vault',
+        {'path': path, 'owner_id': request.user.pk, 'name': request.data.get('name') or None},
+        user=request.user,
+    )
+    return Response({'job': JobSerializer(job).data}, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_tags(apps, schema_editor):
+    Phrase = apps.get_model('conversation', 'Phrase')
+    PhraseTag = apps.get_model('conversation', 'PhraseTag')
+    
+    rows = []
+    for phrase_id, vault_id, tags in Phrase.objects.values_list('id', 'vault_id', 'tags').iterator():
+        seen = set()
+        for tag in tags if isinstance(tags, list) else []:
+            tag = str(tag).strip().lower()[:100]
+            if tag and tag not in seen:
+                seen.add(tag)
+                rows.append(PhraseTag(phrase_id=phrase_id, vault_id=vault_id, tag=tag))
+    PhraseTag.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_vault_id'),
+        ('conversation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhraseTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100)),
+                ('phrase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_index', to='conversation.phrase')),
+                ('vault', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='phrase_tags', to='accounts.vault')),
+            ],
+            options={
+                'verbose_name': 'Etiqueta de Frase',
+                'verbose_name_plural': 'Etiquetas de Frases',
+                'db_table': 'phrase_tags',
+                'indexes': [models.Index(fields=['vault', 'tag'], name='phrase_tags_vault_tag_idx')],
+                'unique_together': {('phrase', 'tag')},
+            },
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
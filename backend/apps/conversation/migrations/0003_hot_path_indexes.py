@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversation', '0002_phrase_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversationsession',
+            index=models.Index(fields=['vault', '-last_played', '-created_at'], name='sessions_vault_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phrase',
+            index=models.Index(fields=['vault', '-usage_count', '-created_at'], name='phrases_vault_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phraseplayback',
+            index=models.Index(fields=['phrase', '-played_at'], name='phrase_playbacks_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:58
+
+import apps.media.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversation', '0004_sync_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='phrase',
+            name='audio_file',
+            field=models.FileField(blank=True, null=True, storage=apps.media.storage.content_addressed_storage, upload_to='conversation/audio/'),
+        ),
+    ]
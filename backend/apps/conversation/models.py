@@ -2,6 +2,7 @@ import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 from apps.accounts.models import Vault
+from apps.media.storage import content_addressed_storage
 
 User = get_user_model()
 
@@ -33,8 +34,11 @@ class Phrase(models.Model):
     language = models.CharField(max_length=10, default='es')  # Idioma original
     
     # Archivos de audio
-    audio_file = models.FileField(upload_to='conversation/audio/', null=True, blank=True)
+    audio_file = models.FileField(
+        upload_to='conversation/audio/', storage=content_addressed_storage, null=True, blank=True
+    )
     audio_duration = models.FloatField(null=True, blank=True)  # Duración en segundos
+    audio_analysis = models.JSONField(default=dict, blank=True, editable=False)  # Picos y versión comprimida
     
     # Metadatos
     tags = models.JSONField(default=list, blank=True)
@@ -54,6 +58,12 @@ class Phrase(models.Model):
         verbose_name = 'Frase'
         verbose_name_plural = 'Frases'
         ordering = ['-usage_count', '-created_at']
+        indexes = [
+            models.Index(
+                fields=['vault', '-usage_count', '-created_at'], name='phrases_vault_usage_idx'
+            ),
+            models.Index(fields=['vault', 'updated_at'], name='phrases_vault_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.text[:50]}... - {self.vault.name}"
@@ -73,6 +83,9 @@ class PhrasePlayback(models.Model):
         verbose_name = 'Reproducción de Frase'
         verbose_name_plural = 'Reproducciones de Frases'
         ordering = ['-played_at']
+        indexes = [
+            models.Index(fields=['phrase', '-played_at'], name='phrase_playbacks_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.phrase.text[:30]}... reproducida por {self.user.name}"
@@ -108,6 +121,11 @@ class ConversationSession(models.Model):
         verbose_name = 'Sesión de Conversación'
         verbose_name_plural = 'Sesiones de Conversación'
         ordering = ['-last_played', '-created_at']
+        indexes = [
+            models.Index(
+                fields=['vault', '-last_played', '-created_at'], name='sessions_vault_recent_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.vault.name}"
@@ -131,3 +149,24 @@ class ConversationPlayback(models.Model):
     
     def __str__(self):
         return f"Sesión {self.session.name} reproducida por {self.user.name}"
+
+
+class PhraseTag(models.Model):
+    """
+    Índice normalizado de las etiquetas de cada frase (espejo de Phrase.tags)
+    """
+    phrase = models.ForeignKey(Phrase, on_delete=models.CASCADE, related_name='tag_index')
+    vault = models.ForeignKey(Vault, on_delete=models.CASCADE, related_name='phrase_tags')
+    tag = models.CharField(max_length=100)
+    
+    class Meta:
+        db_table = 'phrase_tags'
+        unique_together = ['phrase', 'tag']
+        indexes = [
+            models.Index(fields=['vault', 'tag'], name='phrase_tags_vault_tag_idx'),
+        ]
+        verbose_name = 'Etiqueta de Frase'
+        verbose_name_plural = 'Etiquetas de Frases'
+    
+    def __str__(self):
+        return f"{self.tag} ({self.phrase_id})"
@@ -1,24 +1,31 @@
 from rest_framework import serializers
 from .models import Phrase, PhrasePlayback, ConversationSession, ConversationPlayback
 from apps.accounts.serializers import UserSerializer
+from apps.media.fields import AudioAnalysisField
 
 
 class PhraseSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.name', read_only=True)
     vault_name = serializers.CharField(source='vault.name', read_only=True)
     playbacks_count = serializers.SerializerMethodField()
+    audio_analysis = AudioAnalysisField()
     
     class Meta:
         model = Phrase
         fields = (
             'id', 'text', 'translation', 'category', 'context', 'person_mentioned',
-            'language', 'audio_file', 'audio_duration', 'tags', 'is_favorite',
+            'language', 'audio_file', 'audio_duration', 'audio_analysis', 'tags', 'is_favorite',
             'usage_count', 'playbacks_count', 'vault', 'vault_name',
             'created_by', 'created_by_name', 'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'created_by', 'usage_count', 'created_at', 'updated_at')
+        read_only_fields = (
+            'id', 'created_by', 'audio_duration', 'usage_count', 'created_at', 'updated_at'
+        )
     
     def get_playbacks_count(self, obj):
+        # El feed de sincronización anota playbacks_count con Count
+        if hasattr(obj, 'playbacks_count'):
+            return obj.playbacks_count
         return obj.playbacks.count()
     
     def create(self, validated_data):
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.memories.tags import sync_tags
+from .models import Phrase, PhraseTag
+
+
+@receiver(post_save, sender=Phrase)
+def update_tag_index_on_save(sender, instance, **kwargs):
+    sync_tags(PhraseTag, 'phrase', [instance])
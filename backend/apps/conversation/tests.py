@@ -0,0 +1,68 @@
+from datetime import timedelta
+from django.utils import timezone
+from apps.accounts.testing import QueryPlanTestCase
+from .models import ConversationSession, Phrase, PhrasePlayback, PhraseTag
+
+
+class ConversationQueryPlanTests(QueryPlanTestCase):
+    
+    @classmethod
+    def seed(cls):
+        now = timezone.now()
+        for vault, rows in cls.seeded_vaults:
+            phrases = Phrase.objects.bulk_create([
+                Phrase(
+                    text=f'Frase {index}', vault=vault, created_by=cls.user,
+                    usage_count=index % 50, tags=[f'tag{index % 20}'],
+                )
+                for index in range(rows)
+            ])
+            PhraseTag.objects.bulk_create([
+                PhraseTag(phrase=phrase, vault=vault, tag=phrase.tags[0]) for phrase in phrases
+            ])
+            PhrasePlayback.objects.bulk_create([
+                PhrasePlayback(phrase=phrases[index % 10], user=cls.user) for index in range(rows)
+            ])
+            ConversationSession.objects.bulk_create([
+                ConversationSession(
+                    name=f'Sesión {index}', vault=vault, created_by=cls.user,
+                    last_played=now - timedelta(hours=index) if index % 4 else None,
+                )
+                for index in range(rows // 5)
+            ])
+        cls.phrase = Phrase.objects.filter(vault=cls.vault).first()
+    
+    def test_phrases_merge_vaults(self):
+        response = self.assertRequestUsesIndexes('/api/conversation/phrases/', {'phrases'})
+        self.assertEqual(response.data['count'], self.rows * 2)
+        expected = Phrase.objects.filter(vault_id__in=self.vault_ids).order_by(
+            '-usage_count', '-created_at', '-id'
+        ).values_list('usage_count', flat=True)[:20]
+        usage = [phrase['usage_count'] for phrase in response.data['results']]
+        self.assertEqual(usage, list(expected))
+    
+    def test_phrases_by_tag(self):
+        response = self.assertRequestUsesIndexes(
+            '/api/conversation/phrases/', {'phrases', 'phrase_tags'}, {'tags': 'tag1'},
+            allow_sort=True,
+        )
+        self.assertEqual(response.data['count'], self.rows * 2 // 20)
+    
+    def test_most_used(self):
+        self.assertUsesIndexes(
+            Phrase.objects.filter(vault_id=self.vault.id).order_by('-usage_count')[:5], {'phrases'}
+        )
+    
+    def test_playbacks(self):
+        self.assertRequestUsesIndexes(
+            f'/api/conversation/phrases/{self.phrase.id}/playbacks/', {'phrase_playbacks'}
+        )
+    
+    def test_sessions_merge_vaults(self):
+        response = self.assertRequestUsesIndexes(
+            '/api/conversation/sessions/', {'conversation_sessions'}
+        )
+        self.assertEqual(response.data['count'], self.rows * 2 // 5)
+        self.assertEqual(
+            {session['vault'] for session in response.data['results']}, set(self.vault_ids)
+        )
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('phrases/', views.PhraseListCreateView.as_view(), name='phrase_list_create'),
+    path('phrases/tags/', views.phrase_tag_facets, name='phrase_tag_facets'),
     path('phrases/<uuid:pk>/', views.PhraseDetailView.as_view(), name='phrase_detail'),
     path('phrases/<uuid:phrase_id>/play/', views.play_phrase, name='play_phrase'),
     path('phrases/<uuid:phrase_id>/favorite/', views.toggle_favorite_phrase, name='toggle_favorite_phrase'),
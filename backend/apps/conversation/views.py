@@ -2,8 +2,12 @@ from rest_framework import generics, status, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count
-from .models import Phrase, PhrasePlayback, ConversationSession, ConversationPlayback
+from django.db.models import Count
+from django.shortcuts import get_object_or_404
+import uuid
+from apps.accounts.access import accessible_vault_ids, has_vault_access, merge_vaults
+from apps.memories.tags import TagIndexFilter, tag_facets
+from .models import Phrase, PhrasePlayback, ConversationSession, ConversationPlayback, PhraseTag
 from .serializers import (
     PhraseSerializer, PhraseCreateSerializer, PhraseUpdateSerializer,
     PhrasePlaybackSerializer, ConversationSessionSerializer,
@@ -17,9 +21,13 @@ class PhraseListCreateView(generics.ListCreateAPIView):
     Vista para listar y crear frases
     """
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [
+        DjangoFilterBackend, filters.SearchFilter, TagIndexFilter, filters.OrderingFilter
+    ]
     filterset_fields = ['category', 'vault', 'is_favorite']
     search_fields = ['text', 'translation', 'person_mentioned', 'context']
+    tag_model = PhraseTag
+    tag_owner_field = 'phrase'
     ordering_fields = ['usage_count', 'created_at', 'text']
     ordering = ['-usage_count', '-created_at']
     
@@ -29,10 +37,10 @@ class PhraseListCreateView(generics.ListCreateAPIView):
         return PhraseSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        return Phrase.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+        return Phrase.objects.filter(vault_id__in=accessible_vault_ids(self.request))
+    
+    def filter_queryset(self, queryset):
+        return merge_vaults(super().filter_queryset(queryset), accessible_vault_ids(self.request))
 
 
 class PhraseDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -47,10 +55,7 @@ class PhraseDetailView(generics.RetrieveUpdateDestroyAPIView):
         return PhraseSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        return Phrase.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+        return Phrase.objects.filter(vault_id__in=accessible_vault_ids(self.request))
 
 
 class PhrasePlaybackListCreateView(generics.ListCreateAPIView):
@@ -62,11 +67,16 @@ class PhrasePlaybackListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         phrase_id = self.kwargs['phrase_id']
-        return PhrasePlayback.objects.filter(phrase_id=phrase_id)
+        return PhrasePlayback.objects.filter(
+            phrase_id=phrase_id,
+            phrase__vault_id__in=accessible_vault_ids(self.request)
+        )
     
     def perform_create(self, serializer):
         phrase_id = self.kwargs['phrase_id']
-        phrase = Phrase.objects.get(id=phrase_id)
+        phrase = get_object_or_404(
+            Phrase, id=phrase_id, vault_id__in=accessible_vault_ids(self.request)
+        )
         serializer.save(phrase=phrase)
         
         # Incrementar contador de uso
@@ -86,10 +96,12 @@ class ConversationSessionListCreateView(generics.ListCreateAPIView):
         return ConversationSessionSerializer
     
     def get_queryset(self):
-        user = self.request.user
         return ConversationSession.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+            vault_id__in=accessible_vault_ids(self.request)
+        )
+    
+    def filter_queryset(self, queryset):
+        return merge_vaults(super().filter_queryset(queryset), accessible_vault_ids(self.request))
 
 
 class ConversationSessionDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -104,10 +116,9 @@ class ConversationSessionDetailView(generics.RetrieveUpdateDestroyAPIView):
         return ConversationSessionSerializer
     
     def get_queryset(self):
-        user = self.request.user
         return ConversationSession.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+            vault_id__in=accessible_vault_ids(self.request)
+        )
 
 
 class ConversationPlaybackListCreateView(generics.ListCreateAPIView):
@@ -119,11 +130,16 @@ class ConversationPlaybackListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         session_id = self.kwargs['session_id']
-        return ConversationPlayback.objects.filter(session_id=session_id)
+        return ConversationPlayback.objects.filter(
+            session_id=session_id,
+            session__vault_id__in=accessible_vault_ids(self.request)
+        )
     
     def perform_create(self, serializer):
         session_id = self.kwargs['session_id']
-        session = ConversationSession.objects.get(id=session_id)
+        session = get_object_or_404(
+            ConversationSession, id=session_id, vault_id__in=accessible_vault_ids(self.request)
+        )
         serializer.save(session=session)
 
 
@@ -134,7 +150,7 @@ def play_phrase(request, phrase_id):
     Vista para reproducir una frase y registrar la reproducción
     """
     try:
-        phrase = Phrase.objects.get(id=phrase_id)
+        phrase = Phrase.objects.get(id=phrase_id, vault_id__in=accessible_vault_ids(request))
     except Phrase.DoesNotExist:
         return Response(
             {'error': 'Frase no encontrada'}, 
@@ -162,7 +178,7 @@ def toggle_favorite_phrase(request, phrase_id):
     Vista para marcar/desmarcar una frase como favorita
     """
     try:
-        phrase = Phrase.objects.get(id=phrase_id)
+        phrase = Phrase.objects.get(id=phrase_id, vault_id__in=accessible_vault_ids(request))
     except Phrase.DoesNotExist:
         return Response(
             {'error': 'Frase no encontrada'}, 
@@ -182,23 +198,14 @@ def phrase_stats(request, vault_id):
     """
     Vista para obtener estadísticas de frases
     """
-    user = request.user
-    
     # Verificar acceso al vault
-    from apps.accounts.models import Vault
-    vault = Vault.objects.filter(
-        id=vault_id
-    ).filter(
-        Q(owner=user) | Q(members__user=user)
-    ).first()
-    
-    if not vault:
+    if not has_vault_access(request, vault_id):
         return Response(
             {'error': 'Vault no encontrado'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    phrases = Phrase.objects.filter(vault=vault)
+    phrases = Phrase.objects.filter(vault_id=vault_id)
     
     # Estadísticas por categoría
     by_category = {}
@@ -212,14 +219,14 @@ def phrase_stats(request, vault_id):
     
     # Reproducciones recientes
     recent_playbacks = PhrasePlayback.objects.filter(
-        phrase__vault=vault
+        phrase__vault_id=vault_id
     ).order_by('-played_at')[:10]
     recent_playbacks_data = PhrasePlaybackSerializer(
         recent_playbacks, many=True, context={'request': request}
     ).data
     
     # Total de reproducciones
-    total_playbacks = PhrasePlayback.objects.filter(phrase__vault=vault).count()
+    total_playbacks = PhrasePlayback.objects.filter(phrase__vault_id=vault_id).count()
     
     stats = {
         'total_phrases': phrases.count(),
@@ -239,23 +246,35 @@ def random_phrases(request, vault_id):
     """
     Vista para obtener frases aleatorias
     """
-    user = request.user
     count = int(request.query_params.get('count', 5))
     
     # Verificar acceso al vault
-    from apps.accounts.models import Vault
-    vault = Vault.objects.filter(
-        id=vault_id
-    ).filter(
-        Q(owner=user) | Q(members__user=user)
-    ).first()
-    
-    if not vault:
+    if not has_vault_access(request, vault_id):
         return Response(
             {'error': 'Vault no encontrado'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    phrases = Phrase.objects.filter(vault=vault).order_by('?')[:count]
+    phrases = Phrase.objects.filter(vault_id=vault_id).order_by('?')[:count]
     serializer = PhraseSerializer(phrases, many=True, context={'request': request})
     return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def phrase_tag_facets(request):
+    """
+    Vista para obtener el número de frases por etiqueta en cada cofre
+    """
+    vault_ids = accessible_vault_ids(request)
+    vault = request.query_params.get('vault')
+    if vault:
+        try:
+            vault_ids = vault_ids & {uuid.UUID(vault)}
+        except ValueError:
+            return Response(
+                {'error': 'Vault inválido'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    return Response(tag_facets(PhraseTag, vault_ids))
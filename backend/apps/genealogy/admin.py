@@ -14,7 +14,7 @@ class PersonAdmin(admin.ModelAdmin):
 @admin.register(Relation)
 class RelationAdmin(admin.ModelAdmin):
     list_display = ('person1', 'relation_type', 'person2', 'start_date', 'created_at')
-    list_filter = ('relation_type', 'start_date', 'created_at')
+    list_filter = ('relation_type', 'vault', 'start_date', 'created_at')
     search_fields = ('person1__first_name', 'person1__last_name', 'person2__first_name', 'person2__last_name')
     ordering = ('-created_at',)
     readonly_fields = ('id', 'created_at', 'updated_at')
@@ -0,0 +1,328 @@
+"""
+Grafo familiar de un cofre en memoria.
+
+Se carga con dos consultas (personas y relaciones, solo las columnas que
+hacen falta) y se recorre en Python. Cada Relation se lee como "person1 es
+<relation_type> de person2"; las relaciones de ascendencia se normalizan a
+aristas padre -> hijo con la cantidad de generaciones que cubren, así un
+CHILD equivale a un PARENT en sentido contrario y un GRANDPARENT a un
+salto de dos generaciones.
+
+El grafo de cada cofre se guarda en caché bajo su GraphVersion, que las
+señales suben con cada escritura de Person o Relation: una versión nueva es
+otra clave, así que nunca se lee un grafo desactualizado y no hace falta
+invalidar nada.
+"""
+from collections import defaultdict, deque
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import GraphVersion, Person, Relation, RelationType
+
+# Generaciones que sube person2 -> person1 (ascendencia de person2)
+ANCESTRY_STEPS = {
+    RelationType.PARENT: (1, False),
+    RelationType.CHILD: (1, True),
+    RelationType.GRANDPARENT: (2, False),
+    RelationType.GRANDCHILD: (2, True),
+}
+
+PERSON_FIELDS = (
+    'id', 'first_name', 'middle_name', 'last_name', 'birth_date', 'death_date',
+    'is_living', 'photo',
+)
+
+MAX_TREE_DEPTH = 10
+
+# Sube cuando cambia la estructura de FamilyGraph, para no leer de la caché
+# grafos serializados con la anterior
+GRAPH_FORMAT = 2
+
+
+def _node(row):
+    full_name = ' '.join(
+        part for part in (row['first_name'], row['middle_name'], row['last_name']) if part
+    )
+    return {
+        'id': str(row['id']),
+        'full_name': full_name,
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'birth_date': row['birth_date'].isoformat() if row['birth_date'] else None,
+        'death_date': row['death_date'].isoformat() if row['death_date'] else None,
+        'is_living': row['is_living'],
+        'photo': row['photo'] or None,
+    }
+
+
+class FamilyGraph:
+    """
+    Personas (nodos compactos) y relaciones de un cofre con listas de adyacencia
+    """
+
+    def __init__(self, nodes, edges):
+        self.nodes = nodes
+        self.edges = edges
+        # persona -> [(ancestro, generaciones)] y a la inversa
+        self.parents = defaultdict(set)
+        self.children = defaultdict(set)
+        self.spouses = defaultdict(set)
+        # persona -> [(otra persona, arista)] para recorrer cualquier relación
+        self.adjacency = defaultdict(list)
+        for edge in edges:
+            self.adjacency[edge['person1']].append((edge['person2'], edge))
+            self.adjacency[edge['person2']].append((edge['person1'], edge))
+            first, second, relation_type = edge['person1'], edge['person2'], edge['relation_type']
+            if relation_type in ANCESTRY_STEPS:
+                steps, reverse = ANCESTRY_STEPS[relation_type]
+                ancestor, descendant = (second, first) if reverse else (first, second)
+                self.parents[descendant].add((ancestor, steps))
+                self.children[ancestor].add((descendant, steps))
+            elif relation_type == RelationType.SPOUSE:
+                self.spouses[first].add(second)
+                self.spouses[second].add(first)
+
+    def __contains__(self, person_id):
+        return person_id in self.nodes
+
+    def node(self, person_id):
+        """
+        Nodo listo para la respuesta: la foto como URL (firmada en el momento,
+        no en el grafo)
+        """
+        node = dict(self.nodes[person_id])
+        if node['photo']:
+            node['photo'] = Person._meta.get_field('photo').storage.url(node['photo'])
+        return node
+
+    def _levels(self, root, adjacency, depth):
+        """
+        Generación más cercana (1..depth) de cada persona alcanzable desde
+        root siguiendo adjacency; los ciclos no se recorren dos veces
+        """
+        best = {root: 0}
+        for level in range(depth):
+            for person_id in [person for person, found in best.items() if found == level]:
+                for other, steps in adjacency.get(person_id, ()):
+                    reached = level + steps
+                    if reached <= depth and reached < best.get(other, depth + 1):
+                        best[other] = reached
+        levels = [[] for _ in range(depth)]
+        for person_id, level in best.items():
+            if level:
+                levels[level - 1].append(person_id)
+        for level in levels:
+            level.sort(key=lambda person_id: self.nodes[person_id]['full_name'])
+        return levels
+
+    def ancestors(self, root, depth):
+        return self._levels(root, self.parents, depth)
+
+    def descendants(self, root, depth):
+        return self._levels(root, self.children, depth)
+
+    def shortest_path(self, source, target):
+        """
+        Camino más corto de source a target por cualquier relación, como
+        lista de (persona, arista por la que se llegó); None si no hay.
+
+        BFS bidireccional: se expande siempre la frontera más chica, así que
+        se visitan del orden de b^(d/2) personas en lugar de b^d.
+        """
+        if source not in self.nodes or target not in self.nodes:
+            return None
+        if source == target:
+            return [(source, None)]
+        # persona -> (persona anterior, arista) en cada sentido
+        forward = {source: None}
+        backward = {target: None}
+        forward_frontier, backward_frontier = [source], [target]
+        while forward_frontier and backward_frontier:
+            expand_forward = len(forward_frontier) <= len(backward_frontier)
+            frontier = forward_frontier if expand_forward else backward_frontier
+            seen, other_seen = (forward, backward) if expand_forward else (backward, forward)
+            next_frontier = []
+            meeting = None
+            for person_id in frontier:
+                for other, edge in self.adjacency.get(person_id, ()):
+                    if other in seen:
+                        continue
+                    seen[other] = (person_id, edge)
+                    if other in other_seen:
+                        meeting = other
+                        break
+                    next_frontier.append(other)
+                if meeting:
+                    break
+            if meeting:
+                return self._join(meeting, forward, backward)
+            if expand_forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+        return None
+
+    @staticmethod
+    def _join(meeting, forward, backward):
+        path = []
+        person_id, step = meeting, forward[meeting]
+        while step is not None:
+            previous, edge = step
+            path.append((person_id, edge))
+            person_id, step = previous, forward[previous]
+        path.append((person_id, None))
+        path.reverse()
+        person_id = meeting
+        while backward[person_id] is not None:
+            following, edge = backward[person_id]
+            path.append((following, edge))
+            person_id = following
+        return path
+
+    def depth(self):
+        """
+        Generaciones del DAG padre -> hijo: la cadena de ascendencia más
+        larga contando a sus dos extremos. Los ciclos (datos inconsistentes)
+        no se recorren.
+        """
+        if not self.nodes:
+            return 0
+        pending = {person_id: len(self.parents.get(person_id, ())) for person_id in self.nodes}
+        queue = deque(person_id for person_id, count in pending.items() if not count)
+        levels = dict.fromkeys(queue, 0)
+        while queue:
+            person_id = queue.popleft()
+            for child, steps in self.children.get(person_id, ()):
+                levels[child] = max(levels.get(child, 0), levels[person_id] + steps)
+                pending[child] -= 1
+                if not pending[child]:
+                    queue.append(child)
+        return max(levels.values(), default=0) + 1
+
+    def family_tree(self, root, depth):
+        """
+        Árbol de root por niveles: ancestros y descendientes hasta depth
+        generaciones, con las aristas padre -> hijo y de pareja entre las
+        personas incluidas
+        """
+        ancestors = self.ancestors(root, depth)
+        descendants = self.descendants(root, depth)
+        spouses = sorted(self.spouses.get(root, ()))
+        included = {root, *spouses}
+        for level in ancestors + descendants:
+            included.update(level)
+
+        parent_edges = [
+            {'parent': ancestor, 'child': person_id, 'generations': steps}
+            for person_id in included
+            for ancestor, steps in self.parents.get(person_id, ())
+            if ancestor in included
+        ]
+        spouse_edges = [
+            {'person1': person_id, 'person2': spouse}
+            for person_id in included
+            for spouse in self.spouses.get(person_id, ())
+            if spouse in included and person_id < spouse
+        ]
+        return {
+            'root': root,
+            'depth': depth,
+            'persons': {person_id: self.node(person_id) for person_id in sorted(included)},
+            'ancestors': ancestors,
+            'descendants': descendants,
+            'spouses': spouses,
+            'parent_edges': sorted(parent_edges, key=lambda edge: (edge['parent'], edge['child'])),
+            'spouse_edges': sorted(spouse_edges, key=lambda edge: (edge['person1'], edge['person2'])),
+        }
+
+
+def load_graph(vault_id):
+    """
+    Construye el grafo del cofre con una consulta de personas y otra de relaciones
+    """
+    nodes = {}
+    for row in Person.objects.filter(vault_id=vault_id).values(*PERSON_FIELDS):
+        node = _node(row)
+        nodes[node['id']] = node
+
+    edges = []
+    relations = Relation.objects.filter(vault_id=vault_id).values_list(
+        'id', 'person1_id', 'person2_id', 'relation_type'
+    )
+    for relation_id, person1_id, person2_id, relation_type in relations:
+        person1_id, person2_id = str(person1_id), str(person2_id)
+        # Relaciones con personas de otro cofre quedan fuera del grafo
+        if person1_id in nodes and person2_id in nodes:
+            edges.append({
+                'id': str(relation_id), 'person1': person1_id, 'person2': person2_id,
+                'relation_type': relation_type,
+            })
+    return FamilyGraph(nodes, edges)
+
+
+def _cache_key(vault_id, version):
+    return f'genealogy:graph:{GRAPH_FORMAT}:{vault_id}:{version}'
+
+
+def graph_version(vault_id):
+    """
+    Versión actual del grafo del cofre; la fila se crea la primera vez que
+    se pide el grafo
+    """
+    version = GraphVersion.objects.filter(vault_id=vault_id).values_list(
+        'version', flat=True
+    ).first()
+    if version is not None:
+        return version
+    try:
+        with transaction.atomic():
+            GraphVersion.objects.create(vault_id=vault_id)
+    except IntegrityError:
+        pass
+    return graph_version(vault_id)
+
+
+def bump_version(vault_ids):
+    """
+    Sube la versión del grafo de los cofres (dentro de la transacción en curso).
+
+    Sin fila todavía no hay grafo en caché que invalidar; tampoco se crea
+    aquí, porque durante el borrado en cascada de un cofre la fila nueva
+    quedaría apuntando a un cofre borrado.
+    """
+    vault_ids = {vault_id for vault_id in vault_ids if vault_id is not None}
+    if vault_ids:
+        GraphVersion.objects.filter(vault_id__in=vault_ids).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+
+
+def get_graph(vault_id):
+    """
+    Devuelve (grafo, versión) del cofre, desde la caché si ya se construyó
+    para la versión actual
+    """
+    version = graph_version(vault_id)
+    key = _cache_key(vault_id, version)
+    graph = cache.get(key)
+    if graph is None:
+        # Si otra escritura llega entre la versión y la carga, el grafo es
+        # más nuevo que la versión: nunca más viejo
+        graph = load_graph(vault_id)
+        cache.set(key, graph, settings.GENEALOGY_GRAPH_CACHE_TIMEOUT)
+    return graph, version
+
+
+def generation_depth(vault_id):
+    """
+    Generaciones del árbol del cofre, calculadas una vez por versión del grafo
+    """
+    key = f'genealogy:generations:{GRAPH_FORMAT}:{vault_id}:{graph_version(vault_id)}'
+    depth = cache.get(key)
+    if depth is None:
+        graph, version = get_graph(vault_id)
+        depth = graph.depth()
+        cache.set(key, depth, settings.GENEALOGY_GRAPH_CACHE_TIMEOUT)
+    return depth
@@ -0,0 +1,150 @@
+"""
+Parentesco entre dos personas del grafo familiar.
+
+El camino más corto (graph.shortest_path) se traduce a movimientos de
+generación: subir a un padre (U) o bajar a un hijo (D). Las relaciones
+laterales se descomponen según su significado (hermano = U D, primo = U U D
+D, tío = U U D) y, como entre hermanos se supone el mismo padre, un D de
+una relación lateral seguido de un U se cancela. Si el resultado tiene la
+forma U^u D^d, el parentesco es de sangre y sale de (u, d); un cónyuge al
+principio o al final del camino lo convierte en parentesco político.
+
+Las etiquetas están en masculino genérico: Person no registra el género.
+"""
+from .models import RelationType
+
+# Movimientos de person1 a person2 y de person2 a person1 (person1 es
+# <tipo> de person2)
+_MOVES = {
+    RelationType.PARENT: ('D', 'U'),
+    RelationType.CHILD: ('U', 'D'),
+    RelationType.GRANDPARENT: ('DD', 'UU'),
+    RelationType.GRANDCHILD: ('UU', 'DD'),
+    RelationType.SIBLING: ('UD', 'UD'),
+    RelationType.COUSIN: ('UUDD', 'UUDD'),
+    RelationType.UNCLE_AUNT: ('UDD', 'UUD'),
+    RelationType.NEPHEW_NIECE: ('UUD', 'UDD'),
+}
+
+_LATERAL = {
+    RelationType.SIBLING, RelationType.COUSIN, RelationType.UNCLE_AUNT,
+    RelationType.NEPHEW_NIECE,
+}
+
+_ANCESTORS = ['padre', 'abuelo', 'bisabuelo', 'tatarabuelo', 'trastatarabuelo']
+_DESCENDANTS = ['hijo', 'nieto', 'bisnieto', 'tataranieto', 'trastataranieto']
+_ORDINALS = [
+    'segundo', 'tercero', 'cuarto', 'quinto', 'sexto', 'séptimo', 'octavo', 'noveno', 'décimo',
+]
+
+# Parentescos políticos con nombre propio: (lado del cónyuge, etiqueta de sangre)
+_IN_LAWS = {
+    ('start', 'padre'): 'suegro',
+    ('start', 'hijo'): 'hijastro',
+    ('start', 'hermano'): 'cuñado',
+    ('start', 'abuelo'): 'abuelo político',
+    ('end', 'padre'): 'padrastro',
+    ('end', 'hijo'): 'yerno',
+    ('end', 'hermano'): 'cuñado',
+    ('end', 'tío'): 'tío político',
+}
+
+
+def _ordinal(number):
+    if number < 2:
+        return ''
+    if number - 2 < len(_ORDINALS):
+        return _ORDINALS[number - 2]
+    return f'de grado {number}'
+
+
+def _generation(names, steps, fallback):
+    if steps <= len(names):
+        return names[steps - 1]
+    return f'{fallback} de {steps} generaciones'
+
+
+def blood_label(up, down):
+    """
+    Etiqueta de quien está a up generaciones hacia arriba hasta el ancestro
+    común y down hacia abajo desde él
+    """
+    if up == 0 and down == 0:
+        return 'misma persona'
+    if down == 0:
+        return _generation(_ANCESTORS, up, 'ancestro')
+    if up == 0:
+        return _generation(_DESCENDANTS, down, 'descendiente')
+    if up == 1 and down == 1:
+        return 'hermano'
+    if up == down:
+        return 'primo hermano' if up == 2 else f'primo {_ordinal(up - 1)}'
+    if up > down:
+        # Hermano o primo de un ancestro
+        generations = up - down
+        suffix = '' if generations == 1 else ' ' + _generation(_ANCESTORS[1:], generations - 1, 'ancestro')
+        return f'tío{suffix} {_ordinal(down)}'.strip()
+    generations = down - up
+    suffix = '' if generations == 1 else ' ' + _generation(_DESCENDANTS[1:], generations - 1, 'descendiente')
+    return f'sobrino{suffix} {_ordinal(up)}'.strip()
+
+
+def _generations(moves):
+    """
+    (subidas, bajadas) de una secuencia de movimientos, o None si no tiene
+    la forma U^u D^d
+    """
+    stack = []
+    for move, lateral in moves:
+        if move == 'U' and stack and stack[-1][0] == 'D' and (lateral or stack[-1][1]):
+            stack.pop()
+        else:
+            stack.append((move, lateral))
+    sequence = ''.join(move for move, _ in stack)
+    up = len(sequence) - len(sequence.lstrip('U'))
+    if 'U' in sequence[up:]:
+        return None
+    return up, len(sequence) - up
+
+
+def kinship(path):
+    """
+    Etiqueta del parentesco del final del camino respecto del principio, o
+    'pariente' si el camino no se puede nombrar
+    """
+    steps = []
+    for index in range(1, len(path)):
+        person_id, edge = path[index]
+        steps.append((edge['relation_type'], edge['person2'] == person_id))
+
+    spouse_at = [index for index, (relation_type, _) in enumerate(steps)
+                 if relation_type == RelationType.SPOUSE]
+    if any(relation_type not in _MOVES for relation_type, _ in steps
+           if relation_type != RelationType.SPOUSE):
+        return 'pariente político' if spouse_at else 'pariente'
+
+    side = None
+    if spouse_at:
+        if len(spouse_at) > 1 or spouse_at[0] not in (0, len(steps) - 1):
+            return 'pariente político'
+        if len(steps) == 1:
+            return 'cónyuge'
+        side = 'start' if spouse_at[0] == 0 else 'end'
+        steps = steps[1:] if side == 'start' else steps[:-1]
+
+    moves = []
+    for relation_type, forward in steps:
+        sequence = _MOVES[relation_type][0 if forward else 1]
+        moves.extend((move, relation_type in _LATERAL) for move in sequence)
+    generations = _generations(moves)
+    if generations is None:
+        return 'pariente político' if side else 'pariente'
+
+    label = blood_label(*generations)
+    if side is None:
+        return label
+    if (side, label) in _IN_LAWS:
+        return _IN_LAWS[(side, label)]
+    if side == 'start':
+        return f'{label} político'
+    return f'cónyuge del {label}'
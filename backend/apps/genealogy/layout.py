@@ -0,0 +1,360 @@
+"""
+Disposición por generaciones del grafo familiar, calculada en el servidor.
+
+1. Los cónyuges se agrupan en una unidad (se dibujan juntos en la misma fila).
+2. Las aristas padre -> hijo entre unidades forman un DAG; si los datos
+   tienen ciclos (alguien figura como ancestro de sí mismo) se descartan las
+   aristas de retroceso de un DFS y se informan.
+3. La generación de cada unidad es el camino más largo desde las raíces;
+   después las raíces se bajan hasta quedar justo encima de su primer hijo,
+   para que la familia política no quede en la fila de los bisabuelos. Las
+   familias unidas solo por relaciones laterales (hermano, primo, tío) se
+   desplazan para quedar en la fila que esas relaciones indican.
+4. El orden dentro de cada fila sale de un DFS desde las raíces y se mejora
+   con barridos de baricentro hacia abajo y hacia arriba, quedándose con el
+   orden de menos cruces.
+5. Las coordenadas x centran cada unidad sobre sus hijos o bajo sus padres
+   sin solaparse; y es la generación.
+
+Las coordenadas están en anchos de nodo: el cliente solo escala y dibuja.
+Cada componente conexo se dispone por separado y se colocan uno al lado del
+otro. La disposición se guarda en caché bajo la versión del grafo, igual que
+el grafo.
+"""
+from collections import defaultdict, deque
+from django.conf import settings
+from django.core.cache import cache
+from .graph import get_graph
+from .models import RelationType
+
+# Sube cuando cambia el algoritmo, para no servir disposiciones viejas de la caché
+LAYOUT_FORMAT = 1
+
+UNIT_GAP = 0.5
+COMPONENT_GAP = 2.0
+SWEEPS = 4
+
+# Diferencia de generación de person2 respecto de person1 en relaciones laterales
+_LATERAL_OFFSETS = {
+    RelationType.SIBLING: 0,
+    RelationType.COUSIN: 0,
+    RelationType.UNCLE_AUNT: 1,
+    RelationType.NEPHEW_NIECE: -1,
+}
+
+
+class _UnionFind:
+    def __init__(self, items):
+        self.parents = {item: item for item in items}
+
+    def find(self, item):
+        while self.parents[item] != item:
+            self.parents[item] = self.parents[self.parents[item]]
+            item = self.parents[item]
+        return item
+
+    def union(self, first, second):
+        self.parents[self.find(first)] = self.find(second)
+
+
+def _count_inversions(values):
+    if len(values) < 2:
+        return 0, values
+    middle = len(values) // 2
+    left_count, left = _count_inversions(values[:middle])
+    right_count, right = _count_inversions(values[middle:])
+    merged, count, i, j = [], left_count + right_count, 0, 0
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            merged.append(left[i])
+            i += 1
+        else:
+            merged.append(right[j])
+            count += len(left) - i
+            j += 1
+    merged.extend(left[i:])
+    merged.extend(right[j:])
+    return count, merged
+
+
+class _Component:
+    """
+    Disposición de un componente conexo de unidades
+    """
+
+    def __init__(self, units, members, parents, children, names):
+        self.units = units
+        self.members = members
+        self.parents = parents
+        self.children = children
+        self.names = names
+
+    def order_rows(self, levels):
+        rows = defaultdict(list)
+        visited = set()
+
+        def visit(start):
+            stack = [start]
+            while stack:
+                unit = stack.pop()
+                if unit in visited:
+                    continue
+                visited.add(unit)
+                rows[levels[unit]].append(unit)
+                stack.extend(sorted(
+                    (child for child, _ in self.children[unit]), key=self.names.get, reverse=True
+                ))
+
+        sources = sorted((unit for unit in self.units if not self.parents[unit]), key=self.names.get)
+        for unit in sources + sorted(self.units, key=self.names.get):
+            visit(unit)
+
+        best_rows = {level: list(row) for level, row in rows.items()}
+        best_crossings = self.crossings(best_rows, levels)
+        ordered = sorted(rows)
+        for sweep in range(SWEEPS):
+            downward = sweep % 2 == 0
+            for level in (ordered[1:] if downward else list(reversed(ordered[:-1]))):
+                neighbours = self.parents if downward else self.children
+                positions = self._positions(rows)
+                current = {unit: index for index, unit in enumerate(rows[level])}
+
+                def barycenter(unit):
+                    around = [positions[other] for other, _ in neighbours[unit]]
+                    return sum(around) / len(around) if around else current[unit]
+
+                rows[level].sort(key=barycenter)
+            crossings = self.crossings(rows, levels)
+            if crossings < best_crossings:
+                best_rows = {level: list(row) for level, row in rows.items()}
+                best_crossings = crossings
+        return best_rows, best_crossings
+
+    @staticmethod
+    def _positions(rows):
+        return {unit: index for row in rows.values() for index, unit in enumerate(row)}
+
+    def crossings(self, rows, levels):
+        """
+        Cruces entre aristas de filas consecutivas (inversiones del orden)
+        """
+        positions = self._positions(rows)
+        total = 0
+        for level in rows:
+            pairs = sorted(
+                (positions[unit], positions[child])
+                for unit in rows[level]
+                for child, _ in self.children[unit]
+                if levels[child] == level + 1
+            )
+            total += _count_inversions([child for _, child in pairs])[0]
+        return total
+
+    def coordinates(self, rows):
+        """
+        x (borde izquierdo) de cada unidad: primero en orden, después centrada
+        respecto de padres e hijos sin solaparse ni alterar el orden
+        """
+        widths = {unit: len(self.members[unit]) for unit in self.units}
+        x = {}
+        for row in rows.values():
+            cursor = 0.0
+            for unit in row:
+                x[unit] = cursor
+                cursor += widths[unit] + UNIT_GAP
+
+        ordered = sorted(rows)
+        for sweep in range(SWEEPS):
+            downward = sweep % 2 == 0
+            for level in (ordered[1:] if downward else list(reversed(ordered[:-1]))):
+                neighbours = self.parents if downward else self.children
+                cursor = None
+                for unit in rows[level]:
+                    around = [x[other] + widths[other] / 2 for other, _ in neighbours[unit]]
+                    wanted = sum(around) / len(around) - widths[unit] / 2 if around else x[unit]
+                    x[unit] = wanted if cursor is None else max(wanted, cursor)
+                    cursor = x[unit] + widths[unit] + UNIT_GAP
+        return x
+
+
+def compute_layout(graph):
+    """
+    {'nodes': {persona: {'x', 'y', 'generation'}}, 'width', 'height',
+    'crossings', 'ignored_edges'} del grafo familiar
+    """
+    if not graph.nodes:
+        return {'nodes': {}, 'width': 0, 'height': 0, 'crossings': 0, 'ignored_edges': []}
+
+    names = {person_id: node['full_name'] for person_id, node in graph.nodes.items()}
+    spouses = _UnionFind(graph.nodes)
+    for person_id, others in graph.spouses.items():
+        for other in others:
+            spouses.union(person_id, other)
+    unit_of = {person_id: spouses.find(person_id) for person_id in graph.nodes}
+    members = defaultdict(list)
+    for person_id in sorted(graph.nodes, key=names.get):
+        members[unit_of[person_id]].append(person_id)
+    unit_names = {unit: names[people[0]] for unit, people in members.items()}
+
+    # Aristas entre unidades; las que quedan dentro de una unidad son ambiguas
+    parents = defaultdict(set)
+    children = defaultdict(set)
+    ignored = []
+    for child_id, ancestors in graph.parents.items():
+        for ancestor_id, steps in ancestors:
+            parent_unit, child_unit = unit_of[ancestor_id], unit_of[child_id]
+            if parent_unit == child_unit:
+                ignored.append({'parent': ancestor_id, 'child': child_id})
+                continue
+            parents[child_unit].add((parent_unit, steps))
+            children[parent_unit].add((child_unit, steps))
+
+    ignored += _break_cycles(members, parents, children, unit_names)
+    levels = _assign_levels(members, parents, children, unit_names)
+
+    # Familias (componentes por parentesco directo), alineadas después entre
+    # sí por las relaciones laterales
+    components = _UnionFind(members)
+    for unit, linked in children.items():
+        for child, _ in linked:
+            components.union(unit, child)
+    _align_lateral(graph, unit_of, levels, components)
+    for edge in graph.edges:
+        if edge['relation_type'] in _LATERAL_OFFSETS:
+            components.union(unit_of[edge['person1']], unit_of[edge['person2']])
+    grouped = defaultdict(list)
+    for unit in members:
+        grouped[components.find(unit)].append(unit)
+
+    nodes = {}
+    offset = 0.0
+    height = 0
+    total_crossings = 0
+    for units in sorted(grouped.values(), key=lambda units: (-len(units), min(map(unit_names.get, units)))):
+        lowest = min(levels[unit] for unit in units)
+        component_levels = {unit: levels[unit] - lowest for unit in units}
+        component = _Component(units, members, parents, children, unit_names)
+        rows, crossings = component.order_rows(component_levels)
+        total_crossings += crossings
+        x = component.coordinates(rows)
+        left = min(x.values())
+        right = max(x[unit] + len(members[unit]) for unit in units)
+        for unit in units:
+            for index, person_id in enumerate(members[unit]):
+                nodes[person_id] = {
+                    'x': round(offset + x[unit] - left + index, 3),
+                    'y': component_levels[unit],
+                    'generation': component_levels[unit],
+                }
+        offset += right - left + COMPONENT_GAP
+        height = max(height, max(component_levels.values()) + 1)
+
+    return {
+        'nodes': nodes,
+        'width': round(offset - COMPONENT_GAP, 3),
+        'height': height,
+        'crossings': total_crossings,
+        'ignored_edges': ignored,
+    }
+
+
+def _break_cycles(members, parents, children, names):
+    """
+    Quita las aristas de retroceso de un DFS (ciclos en los datos) y las devuelve
+    """
+    state = {}
+    removed = []
+    for start in sorted(members, key=names.get):
+        if start in state:
+            continue
+        state[start] = 'open'
+        stack = [(start, iter(sorted(children[start], key=lambda edge: names[edge[0]])))]
+        while stack:
+            unit, pending = stack[-1]
+            edge = next(pending, None)
+            if edge is None:
+                state[unit] = 'done'
+                stack.pop()
+                continue
+            child, steps = edge
+            if state.get(child) == 'open':
+                children[unit].discard(edge)
+                parents[child].discard((unit, steps))
+                removed.append({'parent': members[unit][0], 'child': members[child][0]})
+            elif child not in state:
+                state[child] = 'open'
+                stack.append((child, iter(sorted(children[child], key=lambda edge: names[edge[0]]))))
+    return removed
+
+
+def _assign_levels(members, parents, children, names):
+    pending = {unit: len(parents[unit]) for unit in members}
+    queue = deque(sorted((unit for unit, count in pending.items() if not count), key=names.get))
+    order = []
+    levels = {unit: 0 for unit in members}
+    while queue:
+        unit = queue.popleft()
+        order.append(unit)
+        for child, steps in children[unit]:
+            levels[child] = max(levels[child], levels[unit] + steps)
+            pending[child] -= 1
+            if not pending[child]:
+                queue.append(child)
+
+    # Las raíces bajan hasta quedar encima de su hijo más alto
+    for unit in reversed(order):
+        if not parents[unit] and children[unit]:
+            levels[unit] = min(levels[child] - steps for child, steps in children[unit])
+    return levels
+
+
+def _align_lateral(graph, unit_of, levels, components):
+    """
+    Desplaza cada familia para respetar las relaciones laterales que la unen
+    a otra (un hermano en la misma fila, un tío una fila más arriba),
+    empezando por la familia más grande
+    """
+    families = defaultdict(list)
+    for unit in levels:
+        families[components.find(unit)].append(unit)
+    lateral = defaultdict(list)
+    for edge in graph.edges:
+        offset = _LATERAL_OFFSETS.get(edge['relation_type'])
+        if offset is None:
+            continue
+        # person2 está offset generaciones por debajo de person1
+        first, second = unit_of[edge['person1']], unit_of[edge['person2']]
+        lateral[components.find(first)].append((first, second, offset))
+        lateral[components.find(second)].append((second, first, -offset))
+
+    shifts = {}
+    for start in sorted(families, key=lambda family: -len(families[family])):
+        if start in shifts:
+            continue
+        shifts[start] = 0
+        queue = deque([start])
+        while queue:
+            family = queue.popleft()
+            for unit, other, offset in lateral[family]:
+                other_family = components.find(other)
+                if other_family not in shifts:
+                    shifts[other_family] = levels[unit] + shifts[family] + offset - levels[other]
+                    queue.append(other_family)
+
+    for family, units in families.items():
+        for unit in units:
+            levels[unit] += shifts[family]
+
+
+def get_layout(vault_id):
+    """
+    Devuelve (grafo, disposición, versión) del cofre; la disposición se
+    calcula una vez por versión del grafo
+    """
+    graph, version = get_graph(vault_id)
+    key = f'genealogy:layout:{LAYOUT_FORMAT}:{vault_id}:{version}'
+    layout = cache.get(key)
+    if layout is None:
+        layout = compute_layout(graph)
+        cache.set(key, layout, settings.GENEALOGY_GRAPH_CACHE_TIMEOUT)
+    return graph, layout, version
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('genealogy', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['vault', 'last_name', 'first_name'], name='persons_vault_name_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('genealogy', '0004_sync_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='photo_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:58
+
+import apps.media.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('genealogy', '0005_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='person',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=apps.media.storage.content_addressed_storage, upload_to='genealogy/photos/'),
+        ),
+    ]
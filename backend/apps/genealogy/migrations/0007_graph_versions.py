@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_photo_renditions'),
+        ('genealogy', '0006_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphVersion',
+            fields=[
+                ('vault', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='graph_version', serialize=False, to='accounts.vault')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versión del Grafo',
+                'verbose_name_plural': 'Versiones del Grafo',
+                'db_table': 'genealogy_graph_versions',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_vault(apps, schema_editor):
+    Person = apps.get_model('genealogy', 'Person')
+    Relation = apps.get_model('genealogy', 'Relation')
+    # Una relación entre personas de cofres distintos aparecía en ambos; no
+    # hay un cofre correcto que elegir, así que se corrigen a mano antes
+    crossed = Relation.objects.exclude(person1__vault=F('person2__vault'))
+    crossed_ids = list(crossed.values_list('pk', flat=True)[:20])
+    if crossed_ids:
+        raise RuntimeError(
+            f'{crossed.count()} relaciones unen personas de cofres distintos '
+            f'(p. ej. {", ".join(str(pk) for pk in crossed_ids)}). '
+            'Bórralas o mueve a las personas al mismo cofre y vuelve a migrar.'
+        )
+    Relation.objects.filter(vault__isnull=True).update(vault_id=Subquery(
+        Person.objects.filter(pk=OuterRef('person1_id')).values('vault_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_photo_renditions'),
+        ('genealogy', '0007_graph_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relation',
+            name='vault',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='relations', to='accounts.vault'),
+        ),
+        migrations.RunPython(backfill_vault, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='relation',
+            name='vault',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='relations', to='accounts.vault'),
+        ),
+        migrations.AddIndex(
+            model_name='relation',
+            index=models.Index(fields=['vault', 'relation_type'], name='relations_vault_type_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 import uuid
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
 from apps.accounts.models import Vault
+from apps.media.storage import content_addressed_storage
 
 User = get_user_model()
 
@@ -40,7 +42,10 @@ class Person(models.Model):
     address = models.TextField(blank=True)
     
     # Archivos
-    photo = models.ImageField(upload_to='genealogy/photos/', null=True, blank=True)
+    photo = models.ImageField(
+        upload_to='genealogy/photos/', storage=content_addressed_storage, null=True, blank=True
+    )
+    photo_renditions = models.JSONField(default=dict, blank=True, editable=False)
     documents = models.JSONField(default=list, blank=True)  # Lista de documentos
     
     # Información adicional
@@ -61,6 +66,10 @@ class Person(models.Model):
         verbose_name = 'Persona'
         verbose_name_plural = 'Personas'
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['vault', 'last_name', 'first_name'], name='persons_vault_name_idx'),
+            models.Index(fields=['vault', 'updated_at'], name='persons_vault_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.full_name} - {self.vault.name}"
@@ -89,6 +98,10 @@ class Relation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     person1 = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='relations_from')
     person2 = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='relations_to')
+    # Copia del cofre de las dos personas: filtrar por cofre sin joins
+    vault = models.ForeignKey(
+        Vault, on_delete=models.CASCADE, related_name='relations', editable=False
+    )
     relation_type = models.CharField(max_length=20, choices=RelationType.choices)
     
     # Información adicional de la relación
@@ -105,9 +118,25 @@ class Relation(models.Model):
         verbose_name = 'Relación'
         verbose_name_plural = 'Relaciones'
         unique_together = ['person1', 'person2', 'relation_type']
+        indexes = [
+            models.Index(fields=['vault', 'relation_type'], name='relations_vault_type_idx'),
+        ]
     
     def __str__(self):
         return f"{self.person1.full_name} - {self.get_relation_type_display()} - {self.person2.full_name}"
+    
+    def clean(self):
+        super().clean()
+        if self.person1_id is None or self.person2_id is None:
+            return
+        vault_id = self.vault_id or self.person1.vault_id
+        if self.person1.vault_id != vault_id or self.person2.vault_id != vault_id:
+            raise ValidationError('Las dos personas deben pertenecer al vault de la relación')
+    
+    def save(self, *args, **kwargs):
+        if self.vault_id is None:
+            self.vault_id = self.person1.vault_id
+        super().save(*args, **kwargs)
 
 
 class PersonMemory(models.Model):
@@ -136,3 +165,23 @@ class PersonMemory(models.Model):
     
     def __str__(self):
         return f"{self.person.full_name} en {self.memory.title} ({self.role})"
+
+
+class GraphVersion(models.Model):
+    """
+    Versión del grafo genealógico de un cofre: sube con cada alta, cambio o
+    baja de una persona o relación e identifica la copia en caché del grafo
+    """
+    vault = models.OneToOneField(
+        Vault, on_delete=models.CASCADE, primary_key=True, related_name='graph_version'
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'genealogy_graph_versions'
+        verbose_name = 'Versión del Grafo'
+        verbose_name_plural = 'Versiones del Grafo'
+    
+    def __str__(self):
+        return f"{self.vault_id} v{self.version}"
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Person, Relation, PersonMemory
+from apps.accounts.access import has_vault_access
 from apps.accounts.serializers import UserSerializer
+from apps.media.fields import RenditionsField
 
 
 class PersonSerializer(serializers.ModelSerializer):
@@ -9,13 +11,14 @@ class PersonSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.name', read_only=True)
     vault_name = serializers.CharField(source='vault.name', read_only=True)
     memories_count = serializers.SerializerMethodField()
+    photo_renditions = RenditionsField()
     
     class Meta:
         model = Person
         fields = (
             'id', 'first_name', 'last_name', 'middle_name', 'full_name',
             'birth_date', 'death_date', 'birth_place', 'death_place',
-            'email', 'phone', 'address', 'photo', 'documents',
+            'email', 'phone', 'address', 'photo', 'photo_renditions', 'documents',
             'occupation', 'notes', 'is_living', 'age',
             'vault', 'vault_name', 'created_by', 'created_by_name',
             'memories_count', 'created_at', 'updated_at'
@@ -23,6 +26,9 @@ class PersonSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_by', 'created_at', 'updated_at')
     
     def get_memories_count(self, obj):
+        # El feed de sincronización anota memories_count con Count
+        if hasattr(obj, 'memories_count'):
+            return obj.memories_count
         return obj.memories.count()
     
     def create(self, validated_data):
@@ -54,7 +60,25 @@ class PersonUpdateSerializer(serializers.ModelSerializer):
         )
 
 
-class RelationSerializer(serializers.ModelSerializer):
+class RelationVaultMixin:
+    """
+    Las dos personas deben ser del mismo cofre, accesible para el usuario;
+    ese cofre se guarda en la relación
+    """
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        person1 = attrs.get('person1') or self.instance.person1
+        person2 = attrs.get('person2') or self.instance.person2
+        if person1.vault_id != person2.vault_id:
+            raise serializers.ValidationError('Las dos personas deben pertenecer al mismo vault')
+        if not has_vault_access(self.context['request'], person1.vault_id):
+            raise serializers.ValidationError('Vault no encontrado')
+        attrs['vault_id'] = person1.vault_id
+        return attrs
+
+
+class RelationSerializer(RelationVaultMixin, serializers.ModelSerializer):
     person1_name = serializers.CharField(source='person1.full_name', read_only=True)
     person2_name = serializers.CharField(source='person2.full_name', read_only=True)
     
@@ -62,13 +86,13 @@ class RelationSerializer(serializers.ModelSerializer):
         model = Relation
         fields = (
             'id', 'person1', 'person1_name', 'person2', 'person2_name',
-            'relation_type', 'start_date', 'end_date', 'notes',
+            'relation_type', 'vault', 'start_date', 'end_date', 'notes',
             'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'vault', 'created_at', 'updated_at')
 
 
-class RelationCreateSerializer(serializers.ModelSerializer):
+class RelationCreateSerializer(RelationVaultMixin, serializers.ModelSerializer):
     class Meta:
         model = Relation
         fields = ('person1', 'person2', 'relation_type', 'start_date', 'end_date', 'notes')
@@ -96,16 +120,3 @@ class PersonDetailSerializer(PersonSerializer):
     class Meta(PersonSerializer.Meta):
         fields = PersonSerializer.Meta.fields + ('relations_from', 'relations_to', 'memories')
 
-
-class GenealogyGraphSerializer(serializers.Serializer):
-    """
-    Serializer para el grafo completo del árbol genealógico
-    """
-    persons = PersonSerializer(many=True)
-    relations = RelationSerializer(many=True)
-    
-    def to_representation(self, instance):
-        return {
-            'persons': PersonSerializer(instance['persons'], many=True, context=self.context).data,
-            'relations': RelationSerializer(instance['relations'], many=True, context=self.context).data,
-        }
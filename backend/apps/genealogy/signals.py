@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .graph import bump_version
+from .models import Person, Relation
+
+
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Person)
+def bump_graph_on_person_change(sender, instance, **kwargs):
+    bump_version([instance.vault_id])
+
+
+@receiver(post_save, sender=Relation)
+@receiver(post_delete, sender=Relation)
+def bump_graph_on_relation_change(sender, instance, **kwargs):
+    bump_version([instance.vault_id])
@@ -0,0 +1,78 @@
+"""
+Estadísticas de un cofre calculadas en la base de datos.
+
+Las personas y las relaciones se cuentan con un agregado condicional cada
+una (Count con filter), en lugar de un COUNT por cifra. La edad se calcula
+en SQL igual que Person.age: días entre el nacimiento y la muerte (o hoy)
+divididos por 365.
+"""
+from datetime import date, timedelta
+from django.db.models import Count, DateField, DurationField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce
+from .graph import generation_depth
+from .models import Person, Relation, RelationType
+
+# (grupo, edad máxima exclusiva)
+AGE_BUCKETS = (
+    ('children', 18),
+    ('adults', 40),
+    ('middle_aged', 65),
+    ('seniors', None),
+)
+
+
+def _age_buckets():
+    conditions = {}
+    lower = None
+    for name, upper in AGE_BUCKETS:
+        condition = Q(lived__isnull=False)
+        if lower is not None:
+            condition &= Q(lived__gte=timedelta(days=365 * lower))
+        if upper is not None:
+            condition &= Q(lived__lt=timedelta(days=365 * upper))
+        conditions[name] = condition
+        lower = upper
+    return conditions
+
+
+def person_counts(vault_id):
+    """
+    Total, vivos, fallecidos y cantidad por grupo de edad, en una consulta
+    """
+    lived = ExpressionWrapper(
+        Coalesce(F('death_date'), Value(date.today(), output_field=DateField())) - F('birth_date'),
+        output_field=DurationField(),
+    )
+    buckets = _age_buckets()
+    counts = Person.objects.filter(vault_id=vault_id).annotate(lived=lived).aggregate(
+        total=Count('id'),
+        living=Count('id', filter=Q(is_living=True)),
+        deceased=Count('id', filter=Q(is_living=False)),
+        **{name: Count('id', filter=condition) for name, condition in buckets.items()},
+    )
+    return counts, {name: counts[name] for name in buckets if counts[name]}
+
+
+def relation_counts(vault_id):
+    """
+    Total de relaciones y cantidad por tipo, en una consulta
+    """
+    counts = Relation.objects.filter(vault_id=vault_id).aggregate(
+        total=Count('id'),
+        **{value: Count('id', filter=Q(relation_type=value)) for value in RelationType.values},
+    )
+    return counts['total'], {value: counts[value] for value in RelationType.values}
+
+
+def vault_stats(vault_id):
+    persons, by_age = person_counts(vault_id)
+    total_relations, by_relation_type = relation_counts(vault_id)
+    return {
+        'total_persons': persons['total'],
+        'living_persons': persons['living'],
+        'deceased_persons': persons['deceased'],
+        'total_relations': total_relations,
+        'by_relation_type': by_relation_type,
+        'by_generation': by_age,
+        'generations': generation_depth(vault_id),
+    }
@@ -0,0 +1,196 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.test import APITestCase
+from apps.accounts.models import Vault
+from apps.accounts.testing import QueryPlanTestCase
+from .kinship import blood_label
+from .models import Person, Relation, RelationType
+
+User = get_user_model()
+
+
+class BloodLabelTests(SimpleTestCase):
+    
+    def test_labels(self):
+        cases = {
+            (0, 0): 'misma persona',
+            (1, 0): 'padre',
+            (3, 0): 'bisabuelo',
+            (7, 0): 'ancestro de 7 generaciones',
+            (0, 2): 'nieto',
+            (1, 1): 'hermano',
+            (2, 2): 'primo hermano',
+            (3, 3): 'primo segundo',
+            (2, 1): 'tío',
+            (3, 1): 'tío abuelo',
+            (3, 2): 'tío segundo',
+            (1, 2): 'sobrino',
+            (1, 3): 'sobrino nieto',
+            (2, 3): 'sobrino segundo',
+        }
+        for (up, down), label in cases.items():
+            with self.subTest(up=up, down=down):
+                self.assertEqual(blood_label(up, down), label)
+
+
+class KinshipViewTests(APITestCase):
+    """
+    Familia de prueba (las relaciones se leen "person1 es <tipo> de person2"):
+    
+        abuelo ── padre ── yo ── cónyuge ── suegro
+               └─ tío ──── primo ── hijo del primo
+        yo ── hermano ── sobrino
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='nonna', email='nonna@example.com', password='secreta', name='Nonna'
+        )
+        self.vault = Vault.objects.create(name='Familia', owner=self.user)
+        self.client.force_authenticate(self.user)
+    
+        names = [
+            'abuelo', 'padre', 'tio', 'yo', 'hermano', 'sobrino', 'primo', 'hijo_primo',
+            'conyuge', 'suegro', 'extrano',
+        ]
+        self.people = {name: self.person(name) for name in names}
+        self.relate('abuelo', RelationType.PARENT, 'padre')
+        self.relate('tio', RelationType.CHILD, 'abuelo')
+        self.relate('padre', RelationType.PARENT, 'yo')
+        self.relate('tio', RelationType.PARENT, 'primo')
+        self.relate('primo', RelationType.PARENT, 'hijo_primo')
+        self.relate('hermano', RelationType.SIBLING, 'yo')
+        self.relate('hermano', RelationType.PARENT, 'sobrino')
+        self.relate('yo', RelationType.SPOUSE, 'conyuge')
+        self.relate('suegro', RelationType.PARENT, 'conyuge')
+    
+    def person(self, name, vault=None):
+        return Person.objects.create(
+            first_name=name, last_name='Rossi', vault=vault or self.vault, created_by=self.user
+        )
+    
+    def relate(self, first, relation_type, second):
+        Relation.objects.create(
+            person1=self.people[first], person2=self.people[second], relation_type=relation_type
+        )
+    
+    def kinship(self, first, second):
+        first, second = self.people[first].id, self.people[second].id
+        return self.client.get(f'/api/genealogy/persons/{first}/kinship/{second}/')
+    
+    def test_labels(self):
+        cases = [
+            ('yo', 'padre', 'padre'),
+            ('yo', 'abuelo', 'abuelo'),
+            ('yo', 'tio', 'tío'),
+            ('yo', 'primo', 'primo hermano'),
+            ('yo', 'hijo_primo', 'sobrino segundo'),
+            ('yo', 'hermano', 'hermano'),
+            ('yo', 'sobrino', 'sobrino'),
+            ('yo', 'conyuge', 'cónyuge'),
+            ('yo', 'suegro', 'suegro'),
+            ('padre', 'yo', 'hijo'),
+            ('abuelo', 'yo', 'nieto'),
+            ('tio', 'yo', 'sobrino'),
+            ('conyuge', 'padre', 'suegro'),
+            ('padre', 'conyuge', 'yerno'),
+            ('conyuge', 'hermano', 'cuñado'),
+            ('hijo_primo', 'yo', 'tío segundo'),
+        ]
+        for first, second, label in cases:
+            with self.subTest(first=first, second=second):
+                response = self.kinship(first, second)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['label'], label)
+    
+    def test_path_and_distance(self):
+        response = self.kinship('yo', 'primo')
+        self.assertEqual(response.data['distance'], 4)
+        people = [step['person']['id'] for step in response.data['path']]
+        self.assertEqual(people[0], str(self.people['yo'].id))
+        self.assertEqual(people[-1], str(self.people['primo'].id))
+    
+    def test_unrelated(self):
+        response = self.kinship('yo', 'extrano')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['related'])
+        self.assertIsNone(response.data['label'])
+    
+    def test_other_vault_is_not_found(self):
+        other = Vault.objects.create(name='Otra familia', owner=self.user)
+        self.people['vecino'] = self.person('vecino', vault=other)
+        self.assertEqual(self.kinship('yo', 'vecino').status_code, 404)
+
+
+class RelationVaultMigrationTests(TransactionTestCase):
+    before = [('genealogy', '0007_graph_versions')]
+    after = [('genealogy', '0008_relation_vault')]
+    
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.apps = executor.loader.project_state(self.before).apps
+        self.addCleanup(self.migrate_forward)
+    
+    def migrate_forward(self):
+        self.apps.get_model('genealogy', 'Relation').objects.all().delete()
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+    
+    def relate(self, same_vault):
+        User = self.apps.get_model('accounts', 'User')
+        Vault = self.apps.get_model('accounts', 'Vault')
+        Person = self.apps.get_model('genealogy', 'Person')
+        user = User.objects.create(username='nonna', email='nonna@example.com', name='Nonna')
+        vault = Vault.objects.create(name='Familia', owner=user)
+        other = vault if same_vault else Vault.objects.create(name='Otra familia', owner=user)
+        person1, person2 = (
+            Person.objects.create(first_name='Persona', last_name='Rossi', vault=target, created_by=user)
+            for target in (vault, other)
+        )
+        return self.apps.get_model('genealogy', 'Relation').objects.create(
+            person1=person1, person2=person2, relation_type='parent'
+        )
+    
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.after)
+    
+    def test_backfill_uses_shared_vault(self):
+        relation = self.relate(same_vault=True)
+        self.migrate()
+        self.assertEqual(Relation.objects.get(pk=relation.pk).vault_id, relation.person1.vault_id)
+    
+    def test_cross_vault_relation_aborts(self):
+        relation = self.relate(same_vault=False)
+        with self.assertRaisesMessage(RuntimeError, str(relation.pk)):
+            self.migrate()
+
+
+class PersonQueryPlanTests(QueryPlanTestCase):
+    
+    @classmethod
+    def seed(cls):
+        for vault, rows in cls.seeded_vaults:
+            Person.objects.bulk_create([
+                Person(
+                    first_name=f'Nombre {index}', last_name=f'Apellido {index % 100:02}',
+                    vault=vault, created_by=cls.user,
+                )
+                for index in range(rows)
+            ])
+    
+    def test_persons_merge_vaults(self):
+        response = self.assertRequestUsesIndexes('/api/genealogy/persons/', {'persons'})
+        self.assertEqual(response.data['count'], self.rows * 2)
+        expected = Person.objects.filter(vault_id__in=self.vault_ids).values_list(
+            'last_name', 'first_name'
+        )[:20]
+        names = [(person['last_name'], person['first_name']) for person in response.data['results']]
+        self.assertEqual(names, list(expected))
+    
+        self.assertRequestUsesIndexes('/api/genealogy/persons/', {'persons'}, {'page': 2})
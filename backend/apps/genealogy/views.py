@@ -2,13 +2,23 @@ from rest_framework import generics, status, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+from django.shortcuts import get_object_or_404
+from apps.accounts.access import accessible_vault_ids, has_vault_access, merge_vaults
+from apps.media import signing
+from apps.media.serving import etag_matches
+from .graph import MAX_TREE_DEPTH, get_graph, graph_version
+from .kinship import kinship
+from .layout import get_layout
 from .models import Person, Relation, PersonMemory
 from .serializers import (
     PersonSerializer, PersonCreateSerializer, PersonUpdateSerializer,
     PersonDetailSerializer, RelationSerializer, RelationCreateSerializer,
-    PersonMemorySerializer, GenealogyGraphSerializer
+    PersonMemorySerializer
 )
+from .stats import vault_stats
 
 
 class PersonListCreateView(generics.ListCreateAPIView):
@@ -28,10 +38,10 @@ class PersonListCreateView(generics.ListCreateAPIView):
         return PersonSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        return Person.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+        return Person.objects.filter(vault_id__in=accessible_vault_ids(self.request))
+    
+    def filter_queryset(self, queryset):
+        return merge_vaults(super().filter_queryset(queryset), accessible_vault_ids(self.request))
 
 
 class PersonDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -46,10 +56,7 @@ class PersonDetailView(generics.RetrieveUpdateDestroyAPIView):
         return PersonDetailSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        return Person.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+        return Person.objects.filter(vault_id__in=accessible_vault_ids(self.request))
 
 
 class RelationListCreateView(generics.ListCreateAPIView):
@@ -66,11 +73,7 @@ class RelationListCreateView(generics.ListCreateAPIView):
         return RelationSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        return Relation.objects.filter(
-            Q(person1__vault__owner=user) | Q(person1__vault__members__user=user) |
-            Q(person2__vault__owner=user) | Q(person2__vault__members__user=user)
-        ).distinct()
+        return Relation.objects.filter(vault_id__in=accessible_vault_ids(self.request))
 
 
 class RelationDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -81,11 +84,7 @@ class RelationDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        return Relation.objects.filter(
-            Q(person1__vault__owner=user) | Q(person1__vault__members__user=user) |
-            Q(person2__vault__owner=user) | Q(person2__vault__members__user=user)
-        ).distinct()
+        return Relation.objects.filter(vault_id__in=accessible_vault_ids(self.request))
 
 
 class PersonMemoryListCreateView(generics.ListCreateAPIView):
@@ -97,11 +96,16 @@ class PersonMemoryListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         person_id = self.kwargs['person_id']
-        return PersonMemory.objects.filter(person_id=person_id)
+        return PersonMemory.objects.filter(
+            person_id=person_id,
+            person__vault_id__in=accessible_vault_ids(self.request)
+        )
     
     def perform_create(self, serializer):
         person_id = self.kwargs['person_id']
-        person = Person.objects.get(id=person_id)
+        person = get_object_or_404(
+            Person, id=person_id, vault_id__in=accessible_vault_ids(self.request)
+        )
         serializer.save(person=person)
 
 
@@ -114,87 +118,155 @@ class PersonMemoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         person_id = self.kwargs['person_id']
-        return PersonMemory.objects.filter(person_id=person_id)
+        return PersonMemory.objects.filter(
+            person_id=person_id,
+            person__vault_id__in=accessible_vault_ids(self.request)
+        )
+
+
+def _graph_etag(vault_id, version):
+    # Las fotos van con URLs firmadas que cambian en cada ventana
+    window = signing.expiry() if settings.MEDIA_SIGNED_URLS else 0
+    return quote_etag(f'{vault_id}-{version}-{window}')
+
+
+def _not_modified(etag):
+    response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def genealogy_graph(request, vault_id):
     """
-    Vista para obtener el grafo completo del árbol genealógico
-    """
-    user = request.user
+    Vista para obtener el grafo completo del árbol genealógico.
     
+    Devuelve nodos y aristas compactos desde el grafo en caché; el ETag es la
+    versión del grafo, así que una petición repetida sin cambios recibe 304.
+    """
     # Verificar que el usuario tiene acceso al vault
-    from apps.accounts.models import Vault
-    vault = Vault.objects.filter(
-        id=vault_id
-    ).filter(
-        Q(owner=user) | Q(members__user=user)
-    ).first()
+    if not has_vault_access(request, vault_id):
+        return Response(
+            {'error': 'Vault no encontrado o sin permisos'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    etag = _graph_etag(vault_id, graph_version(vault_id))
+    if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+        return _not_modified(etag)
+    
+    graph, version = get_graph(vault_id)
+    response = Response({
+        'version': version,
+        'persons': [graph.node(person_id) for person_id in graph.nodes],
+        'relations': graph.edges,
+    })
+    response['ETag'] = _graph_etag(vault_id, version)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def genealogy_layout(request, vault_id):
+    """
+    Vista para obtener el grafo ya dispuesto por generaciones.
     
-    if not vault:
+    Cada persona trae sus coordenadas (x en anchos de nodo, y = generación),
+    así que el cliente solo dibuja. Mismo ETag y 304 que el grafo.
+    """
+    if not has_vault_access(request, vault_id):
         return Response(
             {'error': 'Vault no encontrado o sin permisos'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Obtener todas las personas y relaciones del vault
-    persons = Person.objects.filter(vault=vault)
-    relations = Relation.objects.filter(
-        Q(person1__vault=vault) | Q(person2__vault=vault)
-    ).distinct()
+    etag = _graph_etag(vault_id, graph_version(vault_id))
+    if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+        return _not_modified(etag)
     
-    data = {
+    graph, layout, version = get_layout(vault_id)
+    persons = []
+    for person_id, position in sorted(
+        layout['nodes'].items(), key=lambda item: (item[1]['y'], item[1]['x'])
+    ):
+        persons.append(dict(graph.node(person_id), **position))
+    response = Response({
+        'version': version,
+        'width': layout['width'],
+        'generations': layout['height'],
+        'crossings': layout['crossings'],
+        'ignored_edges': layout['ignored_edges'],
         'persons': persons,
-        'relations': relations
-    }
-    
-    serializer = GenealogyGraphSerializer(data, context={'request': request})
-    return Response(serializer.data)
+        'relations': graph.edges,
+    })
+    response['ETag'] = _graph_etag(vault_id, version)
+    return response
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def person_family_tree(request, person_id):
     """
-    Vista para obtener el árbol familiar de una persona específica
-    """
-    user = self.request.user
+    Vista para obtener el árbol familiar de una persona: ancestros y
+    descendientes hasta depth generaciones (por defecto 3), por niveles.
     
-    person = Person.objects.filter(
-        id=person_id
-    ).filter(
-        Q(vault__owner=user) | Q(vault__members__user=user)
-    ).first()
+    El grafo del cofre se carga con un número fijo de consultas y se recorre
+    en memoria.
+    """
+    try:
+        depth = int(request.query_params.get('depth', 3))
+    except ValueError:
+        return Response(
+            {'error': 'depth debe ser un número'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    depth = max(1, min(depth, MAX_TREE_DEPTH))
     
-    if not person:
+    vault_id = Person.objects.filter(
+        id=person_id, vault_id__in=accessible_vault_ids(request)
+    ).values_list('vault_id', flat=True).first()
+    if vault_id is None:
         return Response(
             {'error': 'Persona no encontrada'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Obtener familiares directos
-    family_relations = Relation.objects.filter(
-        Q(person1=person) | Q(person2=person)
-    )
-    
-    family_members = []
-    for relation in family_relations:
-        if relation.person1 == person:
-            family_members.append(relation.person2)
-        else:
-            family_members.append(relation.person1)
+    graph, _ = get_graph(vault_id)
+    return Response(graph.family_tree(str(person_id), depth))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def person_kinship(request, person_id, other_id):
+    """
+    Vista para saber cómo se relacionan dos personas del mismo cofre.
     
-    # Serializar datos
-    person_serializer = PersonDetailSerializer(person, context={'request': request})
-    family_serializer = PersonSerializer(family_members, many=True, context={'request': request})
-    relations_serializer = RelationSerializer(family_relations, many=True, context={'request': request})
+    Devuelve el camino más corto entre ambas y el parentesco de la segunda
+    respecto de la primera (p. ej. "primo segundo" o "tío abuelo").
+    """
+    vault_ids = dict(Person.objects.filter(
+        id__in=[person_id, other_id], vault_id__in=accessible_vault_ids(request)
+    ).values_list('id', 'vault_id'))
+    vault_id = vault_ids.get(person_id)
+    if vault_id is None or vault_ids.get(other_id) != vault_id:
+        return Response(
+            {'error': 'Persona no encontrada'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
     
+    graph, _ = get_graph(vault_id)
+    path = graph.shortest_path(str(person_id), str(other_id))
     return Response({
-        'person': person_serializer.data,
-        'family_members': family_serializer.data,
-        'relations': relations_serializer.data
+        'from': graph.node(str(person_id)),
+        'to': graph.node(str(other_id)),
+        'related': path is not None,
+        'label': kinship(path) if path else None,
+        'distance': len(path) - 1 if path else None,
+        'path': [
+            {'person': graph.node(step_person), 'relation': edge}
+            for step_person, edge in path or []
+        ],
     })
 
 
@@ -202,55 +274,15 @@ def person_family_tree(request, person_id):
 @permission_classes([permissions.IsAuthenticated])
 def genealogy_stats(request, vault_id):
     """
-    Vista para obtener estadísticas del árbol genealógico
-    """
-    user = request.user
+    Vista para obtener estadísticas del árbol genealógico.
     
+    by_generation agrupa por edad; generations es la profundidad real del árbol.
+    """
     # Verificar acceso al vault
-    from apps.accounts.models import Vault
-    vault = Vault.objects.filter(
-        id=vault_id
-    ).filter(
-        Q(owner=user) | Q(members__user=user)
-    ).first()
-    
-    if not vault:
+    if not has_vault_access(request, vault_id):
         return Response(
             {'error': 'Vault no encontrado'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    persons = Person.objects.filter(vault=vault)
-    relations = Relation.objects.filter(
-        Q(person1__vault=vault) | Q(person2__vault=vault)
-    ).distinct()
-    
-    stats = {
-        'total_persons': persons.count(),
-        'living_persons': persons.filter(is_living=True).count(),
-        'deceased_persons': persons.filter(is_living=False).count(),
-        'total_relations': relations.count(),
-        'by_relation_type': {},
-        'by_generation': {},
-    }
-    
-    # Estadísticas por tipo de relación
-    for relation_type, _ in Relation._meta.get_field('relation_type').choices:
-        count = relations.filter(relation_type=relation_type).count()
-        stats['by_relation_type'][relation_type] = count
-    
-    # Estadísticas por generación (aproximado por edad)
-    for person in persons:
-        if person.age is not None:
-            if person.age < 18:
-                generation = 'children'
-            elif person.age < 40:
-                generation = 'adults'
-            elif person.age < 65:
-                generation = 'middle_aged'
-            else:
-                generation = 'seniors'
-            
-            stats['by_generation'][generation] = stats['by_generation'].get(generation, 0) + 1
-    
-    return Response(stats)
+    return Response(vault_stats(vault_id))
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name', 'created_at')
+    search_fields = ('name', 'dedupe_key', 'last_error')
+    ordering = ('-created_at',)
+    readonly_fields = ('id', 'locked_by', 'locked_at', 'result', 'created_at', 'updated_at', 'finished_at')
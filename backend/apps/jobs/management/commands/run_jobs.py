@@ -0,0 +1,115 @@
+"""
+Worker de la cola de trabajos:
+
+    python manage.py run_jobs --workers 4
+    python manage.py run_jobs --processes --workers 4   # tareas de CPU
+    python manage.py run_jobs --once                    # vacía la cola y termina
+"""
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from apps.jobs import queue
+
+# Cada cuánto se recuperan trabajos huérfanos y se purgan los terminados
+MAINTENANCE_INTERVAL = 60
+
+
+def _init_worker():
+    # Con el método spawn cada proceso arranca Django desde cero
+    django.setup()
+
+
+def _execute(job_id):
+    try:
+        queue.execute(job_id)
+    except Exception:
+        # Un fallo de la propia cola (no de la tarea) no debe tumbar el worker;
+        # el trabajo queda en ejecución y requeue_stale lo recupera
+        queue.logger.exception('No se pudo ejecutar el trabajo %s', job_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos en segundo plano de la cola en un pool de hilos o procesos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOBS_WORKERS,
+            help='Trabajos ejecutados en paralelo'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Usar procesos en lugar de hilos (para tareas que usan mucha CPU)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+            help='Segundos de espera cuando la cola está vacía'
+        )
+        parser.add_argument('--once', action='store_true', help='Terminar cuando la cola quede vacía')
+    
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        
+        workers = max(options['workers'], 1)
+        worker = queue.worker_id()
+        if options['processes']:
+            # Los procesos hijos no deben heredar la conexión abierta del padre
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs')
+        
+        self.stdout.write(f'Worker {worker} con {workers} {"procesos" if options["processes"] else "hilos"}')
+        done = 0
+        running = set()
+        next_maintenance = 0
+        with pool:
+            while not self.stopping:
+                if time.monotonic() >= next_maintenance:
+                    self.maintenance()
+                    next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+                
+                free = workers - len(running)
+                claimed = queue.claim(worker, free) if free else []
+                for job_id in claimed:
+                    running.add(pool.submit(_execute, job_id))
+                
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                
+                # Con hilos libres se vuelve a mirar la cola cada poll_interval
+                # aunque siga corriendo un trabajo largo; solo con el pool
+                # lleno basta esperar a que termine alguno
+                finished, running = wait(
+                    running, timeout=None if len(running) >= workers else options['poll_interval'],
+                    return_when=FIRST_COMPLETED
+                )
+                for future in finished:
+                    future.result()
+                    done += 1
+            
+            # Al detenerse se esperan los trabajos en curso
+            wait(running)
+            done += len(running)
+        
+        self.stdout.write(self.style.SUCCESS(f'{done} trabajos ejecutados'))
+    
+    def maintenance(self):
+        requeued = queue.requeue_stale()
+        if requeued:
+            self.stdout.write(f'{requeued} trabajos huérfanos devueltos a la cola')
+        queue.prune()
+    
+    def stop(self, signum, frame):
+        self.stdout.write('Deteniendo; se esperan los trabajos en curso')
+        self.stopping = True
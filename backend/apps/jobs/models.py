@@ -0,0 +1,63 @@
+import uuid
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = 'queued', 'En cola'
+    RUNNING = 'running', 'En ejecución'
+    SUCCEEDED = 'succeeded', 'Completado'
+    FAILED = 'failed', 'Fallido'
+
+
+class Job(models.Model):
+    """
+    Trabajo en segundo plano: la tarea registrada name se ejecuta con payload
+    como argumentos en el worker de run_jobs
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    
+    # Solo puede haber un trabajo en cola por clave; uno en ejecución no bloquea
+    # encolar otro, porque el estado pudo cambiar después de que empezara
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    
+    # Reintentos
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    
+    # Ejecución
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'jobs'
+        verbose_name = 'Trabajo'
+        verbose_name_plural = 'Trabajos'
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=Q(status='queued'), name='jobs_queued_dedupe_key_uniq'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
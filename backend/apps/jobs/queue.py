@@ -0,0 +1,205 @@
+"""
+Cola de trabajos en segundo plano sobre la base de datos.
+
+Las apps registran funciones con @task en su tasks.py y las encolan con
+enqueue(); el comando run_jobs las reclama y ejecuta en un pool de hilos o
+procesos. No necesita broker: el reclamo es un UPDATE condicionado al estado
+(con SELECT ... FOR UPDATE SKIP LOCKED en PostgreSQL), así que funciona
+igual en SQLite y PostgreSQL con varios workers a la vez.
+
+enqueue() escribe dentro de la transacción en curso: el trabajo solo es
+visible para los workers si los datos que lo originan se confirman.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+Task = namedtuple('Task', ['name', 'func', 'max_attempts'])
+
+_tasks = {}
+
+
+def task(name, max_attempts=3):
+    """
+    Registra la función decorada como tarea; sus argumentos llegan por nombre
+    desde el payload del trabajo y deben ser serializables a JSON
+    """
+    def register(func):
+        _tasks[name] = Task(name=name, func=func, max_attempts=max_attempts)
+        return func
+    return register
+
+
+def get_task(name):
+    return _tasks.get(name)
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+
+
+def enqueue(name, payload=None, *, dedupe_key=None, delay=None, user=None):
+    """
+    Encola la tarea name y devuelve el trabajo.
+
+    Si ya hay un trabajo en cola con la misma dedupe_key se devuelve ese en
+    lugar de crear otro.
+    """
+    registered = get_task(name)
+    if registered is None:
+        raise LookupError(f'Tarea no registrada: {name}')
+
+    job = Job(
+        name=name,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        max_attempts=registered.max_attempts,
+        run_at=timezone.now() + (delay or timedelta()),
+        created_by=user,
+    )
+    try:
+        with transaction.atomic():
+            job.save(force_insert=True)
+    except IntegrityError:
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status=JobStatus.QUEUED).first()
+        if existing is None:
+            raise
+        return existing
+
+    if settings.JOBS_EAGER:
+        # Sin worker (desarrollo): se ejecuta al confirmar la transacción
+        transaction.on_commit(lambda: _run_eager(job.pk))
+    return job
+
+
+def _run_eager(job_id):
+    for claimed in claim('eager', ids=[job_id]):
+        execute(claimed)
+
+
+def claim(worker, limit=1, ids=None):
+    """
+    Marca como en ejecución hasta limit trabajos vencidos y devuelve sus ids
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status=JobStatus.QUEUED, run_at__lte=now)
+    if ids is not None:
+        candidates = candidates.filter(pk__in=ids)
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        pks = list(candidates.order_by('run_at').values_list('pk', flat=True)[:limit])
+        if not pks:
+            return []
+        # Si otro worker se adelantó, el filtro por estado lo deja fuera
+        Job.objects.filter(pk__in=pks, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1, updated_at=now,
+        )
+        return list(Job.objects.filter(
+            pk__in=pks, status=JobStatus.RUNNING, locked_by=worker, locked_at=now
+        ).values_list('pk', flat=True))
+
+
+def backoff(attempts):
+    """
+    Espera antes del siguiente intento: exponencial con un 10% de variación
+    """
+    delay = min(
+        settings.JOBS_RETRY_BACKOFF * 2 ** max(attempts - 1, 0), settings.JOBS_RETRY_BACKOFF_MAX
+    )
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def _jsonable(value):
+    return value if isinstance(value, (dict, list, str, int, float, bool, type(None))) else None
+
+
+def _finish(job, **fields):
+    now = timezone.now()
+    fields.setdefault('locked_by', '')
+    fields.setdefault('locked_at', None)
+    try:
+        with transaction.atomic():
+            return Job.objects.filter(pk=job.pk, status=JobStatus.RUNNING).update(
+                updated_at=now, **fields
+            )
+    except IntegrityError:
+        # Volver a la cola chocaría con otro trabajo ya encolado con la misma
+        # clave, que hará el mismo trabajo
+        return Job.objects.filter(pk=job.pk, status=JobStatus.RUNNING).update(
+            status=JobStatus.FAILED, last_error='Reemplazado por otro trabajo en cola',
+            finished_at=now, updated_at=now, locked_by='', locked_at=None,
+        )
+
+
+def _retry_or_fail(job, error):
+    if job.attempts < job.max_attempts:
+        return _finish(
+            job, status=JobStatus.QUEUED, last_error=error,
+            run_at=timezone.now() + backoff(job.attempts),
+        )
+    return _finish(job, status=JobStatus.FAILED, last_error=error, finished_at=timezone.now())
+
+
+def execute(job_id):
+    """
+    Ejecuta un trabajo ya reclamado y registra el resultado o el error
+    """
+    job = Job.objects.filter(pk=job_id, status=JobStatus.RUNNING).first()
+    if job is None:
+        return
+    registered = get_task(job.name)
+    if registered is None:
+        _finish(
+            job, status=JobStatus.FAILED, last_error=f'Tarea no registrada: {job.name}',
+            finished_at=timezone.now(),
+        )
+        return
+    try:
+        result = registered.func(**job.payload)
+    except Exception:
+        logger.exception('Falló el trabajo %s (%s), intento %s', job.pk, job.name, job.attempts)
+        _retry_or_fail(job, traceback.format_exc(limit=20))
+    else:
+        _finish(
+            job, status=JobStatus.SUCCEEDED, result=_jsonable(result), last_error='',
+            finished_at=timezone.now(),
+        )
+
+
+def requeue_stale(timeout=None):
+    """
+    Devuelve a la cola los trabajos de workers que murieron a mitad
+    """
+    timeout = timeout or timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=JobStatus.RUNNING, locked_at__lt=timezone.now() - timeout)
+    count = 0
+    for job in stale.iterator():
+        count += _retry_or_fail(job, f'Worker {job.locked_by} sin respuesta')
+    return count
+
+
+def prune(retention=None):
+    """
+    Borra los trabajos terminados hace más de retention
+    """
+    retention = retention or timedelta(days=settings.JOBS_RETENTION_DAYS)
+    finished = Job.objects.filter(
+        status__in=[JobStatus.SUCCEEDED, JobStatus.FAILED],
+        finished_at__lt=timezone.now() - retention,
+    )
+    return finished.delete()[0]
@@ -0,0 +1,209 @@
+import threading
+from contextlib import nullcontext
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from . import queue
+from .models import Job, JobStatus
+
+User = get_user_model()
+
+# El trabajo largo espera a que otro trabajo, encolado mientras corre, lo libere
+_released = threading.Event()
+
+
+@queue.task('tests.noop')
+def _noop(**payload):
+    return payload
+
+
+@queue.task('tests.fail', max_attempts=3)
+def _fail():
+    raise RuntimeError('falla siempre')
+
+
+@queue.task('tests.long', max_attempts=1)
+def _long():
+    queue.enqueue('tests.release')
+    return _released.wait(timeout=5)
+
+
+@queue.task('tests.release')
+def _release():
+    _released.set()
+
+
+def _make_due(job):
+    Job.objects.filter(pk=job.pk).update(run_at=timezone.now() - timedelta(seconds=1))
+
+
+class ClaimTests(TestCase):
+    
+    def test_job_is_claimed_once(self):
+        job = queue.enqueue('tests.noop')
+        self.assertEqual(queue.claim('a', ids=[job.pk]), [job.pk])
+        self.assertEqual(queue.claim('b', ids=[job.pk]), [])
+    
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), (JobStatus.RUNNING, 'a', 1))
+    
+    def test_claim_lost_between_select_and_update(self):
+        job = queue.enqueue('tests.noop')
+        stolen = []
+    
+        # Otro worker reclama el trabajo justo antes del UPDATE de este
+        def steal(execute, sql, params, many, context):
+            if not stolen and sql.startswith('UPDATE "jobs"'):
+                stolen.append(True)
+                Job.objects.filter(pk=job.pk).update(status=JobStatus.RUNNING, locked_by='b')
+            return execute(sql, params, many, context)
+    
+        with connection.execute_wrapper(steal):
+            self.assertEqual(queue.claim('a', ids=[job.pk]), [])
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.attempts), ('b', 0))
+    
+    def test_future_jobs_are_not_claimed(self):
+        job = queue.enqueue('tests.noop', delay=timedelta(minutes=5))
+        self.assertEqual(queue.claim('a', limit=10), [])
+        _make_due(job)
+        self.assertEqual(queue.claim('a', limit=10), [job.pk])
+
+
+class RetryTests(TestCase):
+    
+    def run_once(self, job):
+        _make_due(job)
+        with self.assertLogs(queue.logger, 'ERROR') if job.name == 'tests.fail' else nullcontext():
+            for job_id in queue.claim('a', ids=[job.pk]):
+                queue.execute(job_id)
+        job.refresh_from_db()
+        return job
+    
+    def test_retries_with_backoff_until_max_attempts(self):
+        job = queue.enqueue('tests.fail')
+        before = timezone.now()
+    
+        job = self.run_once(job)
+        self.assertEqual((job.status, job.attempts), (JobStatus.QUEUED, 1))
+        self.assertIn('falla siempre', job.last_error)
+        self.assertGreater(job.run_at, before + queue.backoff(1) * 0.8)
+        self.assertEqual(queue.claim('a'), [])
+    
+        job = self.run_once(job)
+        self.assertEqual((job.status, job.attempts), (JobStatus.QUEUED, 2))
+        job = self.run_once(job)
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.locked_by, '')
+    
+    @override_settings(JOBS_RETRY_BACKOFF=30, JOBS_RETRY_BACKOFF_MAX=100)
+    def test_backoff_doubles_up_to_max(self):
+        for attempts, seconds in ((1, 30), (2, 60), (3, 100), (10, 100)):
+            delay = queue.backoff(attempts).total_seconds()
+            self.assertGreaterEqual(delay, seconds * 0.9)
+            self.assertLessEqual(delay, seconds * 1.1)
+    
+    def test_success_stores_result(self):
+        job = self.run_once(queue.enqueue('tests.noop', {'valor': 1}))
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {'valor': 1})
+
+
+class DedupeTests(TestCase):
+    
+    def test_enqueue_returns_queued_job_with_same_key(self):
+        first = queue.enqueue('tests.noop', dedupe_key='clave')
+        self.assertEqual(queue.enqueue('tests.noop', dedupe_key='clave').pk, first.pk)
+        self.assertNotEqual(queue.enqueue('tests.noop', dedupe_key='otra').pk, first.pk)
+    
+    def test_running_job_does_not_block_enqueue(self):
+        first = queue.enqueue('tests.noop', dedupe_key='clave')
+        queue.claim('a', ids=[first.pk])
+        second = queue.enqueue('tests.noop', dedupe_key='clave')
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(second.status, JobStatus.QUEUED)
+    
+    def test_retry_collides_with_queued_job(self):
+        running = queue.enqueue('tests.fail', dedupe_key='clave')
+        queue.claim('a', ids=[running.pk])
+        queued = queue.enqueue('tests.fail', dedupe_key='clave')
+    
+        with self.assertLogs(queue.logger, 'ERROR'):
+            queue.execute(running.pk)
+        running.refresh_from_db()
+        queued.refresh_from_db()
+        self.assertEqual(running.status, JobStatus.FAILED)
+        self.assertEqual(running.last_error, 'Reemplazado por otro trabajo en cola')
+        self.assertEqual(queued.status, JobStatus.QUEUED)
+
+
+class RequeueStaleTests(TestCase):
+    
+    def running(self, locked_ago, attempts=1):
+        job = queue.enqueue('tests.fail')
+        Job.objects.filter(pk=job.pk).update(
+            status=JobStatus.RUNNING, locked_by='muerto', attempts=attempts,
+            locked_at=timezone.now() - locked_ago,
+        )
+        return job
+    
+    def test_stale_jobs_are_requeued_or_failed(self):
+        stale = self.running(timedelta(hours=2))
+        exhausted = self.running(timedelta(hours=2), attempts=3)
+        fresh = self.running(timedelta(seconds=5))
+    
+        self.assertEqual(queue.requeue_stale(timeout=timedelta(hours=1)), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[stale.pk], JobStatus.QUEUED)
+        self.assertEqual(statuses[exhausted.pk], JobStatus.FAILED)
+        self.assertEqual(statuses[fresh.pk], JobStatus.RUNNING)
+        self.assertIn('muerto', Job.objects.get(pk=stale.pk).last_error)
+
+
+class JobDetailTests(APITestCase):
+    
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='nonna', email='nonna@example.com', password='secreta', name='Nonna'
+        )
+        self.job = queue.enqueue('tests.noop', user=self.owner)
+        self.url = f'/api/jobs/{self.job.pk}/'
+    
+    def user(self, name, **fields):
+        return User.objects.create_user(
+            username=name, email=f'{name}@example.com', password='secreta', name=name, **fields
+        )
+    
+    def test_owner_and_staff_can_see_job(self):
+        for user in (self.owner, self.user('admin', is_staff=True)):
+            self.client.force_authenticate(user)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['status'], JobStatus.QUEUED)
+    
+    def test_other_users_get_not_found(self):
+        self.client.force_authenticate(self.user('vecino'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+    
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class RunJobsTests(TransactionTestCase):
+    
+    def test_free_workers_claim_jobs_while_a_long_job_runs(self):
+        _released.clear()
+        long_job = queue.enqueue('tests.long')
+        call_command('run_jobs', workers=2, poll_interval=0.05, once=True, stdout=StringIO())
+    
+        long_job.refresh_from_db()
+        self.assertEqual(long_job.status, JobStatus.SUCCEEDED)
+        # El trabajo largo solo termina bien si otro hilo corrió el que lo libera
+        self.assertIs(long_job.result, True)
+        self.assertEqual(Job.objects.get(name='tests.release').status, JobStatus.SUCCEEDED)
@@ -0,0 +1,26 @@
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from .models import Job
+from .serializers import JobSerializer
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def job_detail(request, job_id):
+    """
+    Vista para consultar el estado de un trabajo en segundo plano
+    """
+    jobs = Job.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(created_by=request.user)
+    
+    try:
+        job = jobs.get(id=job_id)
+    except Job.DoesNotExist:
+        return Response(
+            {'error': 'Trabajo no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response(JobSerializer(job).data)
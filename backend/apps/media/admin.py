@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import Blob, UploadSession
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'target', 'received', 'total_size', 'status', 'created_at')
+    list_filter = ('status', 'target', 'created_at')
+    search_fields = ('filename', 'user__name', 'user__email')
+    ordering = ('-created_at',)
+    readonly_fields = ('id', 'received', 'created_at', 'updated_at')
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at', 'updated_at')
+    search_fields = ('sha256', 'name')
+    ordering = ('-created_at',)
+    readonly_fields = ('name', 'sha256', 'size', 'ref_count', 'created_at', 'updated_at')
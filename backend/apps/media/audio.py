@@ -0,0 +1,424 @@
+"""
+Análisis de los audios de frases y recuerdos.
+
+Por cada audio de SOURCES se calcula la duración leyendo la cabecera del
+contenedor (WAV, MP3 y MP4/M4A sin dependencias; el resto con ffprobe si
+está instalado) y un vector de picos para dibujar la forma de onda, con
+NumPy sobre las muestras leídas por bloques. Si hay ffmpeg, además se genera
+una versión normalizada en volumen y de menor bitrate en
+derivatives/<ruta del original>/audio.m4a.
+
+El resultado se guarda en el campo JSON audio_analysis del modelo y, en las
+frases, la duración también en audio_duration.
+"""
+import json
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import wave
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+import numpy as np
+from apps.jobs.queue import enqueue
+from . import derivatives
+
+logger = logging.getLogger(__name__)
+
+# (modelo, campo de audio, campo JSON con el análisis, campo de duración o None)
+SOURCES = [
+    ('conversation.Phrase', 'audio_file', 'audio_analysis', 'audio_duration'),
+    ('memories.Memory', 'audio', 'audio_analysis', None),
+]
+
+# Cantidad de picos de la forma de onda (valores entre 0 y 1)
+PEAKS_COUNT = 200
+
+# Frecuencia a la que ffmpeg entrega las muestras para calcular los picos
+DECODE_SAMPLE_RATE = 8000
+
+VARIANT_NAME = 'audio.m4a'
+
+_BLOCK_FRAMES = 64 * 1024
+
+# Bitrates en kbps de MPEG-1 y MPEG-2/2.5 capa III
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def source_for(model, field_name):
+    """
+    Devuelve (campo de análisis, campo de duración) del par (modelo, campo) o None
+    """
+    label = model._meta.label
+    for source_label, source_field, analysis_field, duration_field in SOURCES:
+        if source_label == label and source_field == field_name:
+            return analysis_field, duration_field
+    return None
+
+
+def ffmpeg_binary(name='ffmpeg'):
+    """
+    Ruta del ejecutable de ffmpeg/ffprobe o None si no está disponible
+    """
+    configured = getattr(settings, f'MEDIA_{name.upper()}_BINARY', name)
+    return shutil.which(configured) if configured else None
+
+
+# Duración según el contenedor
+
+def _wav_duration(path):
+    try:
+        with wave.open(path, 'rb') as reader:
+            return reader.getnframes() / reader.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+def _mp3_duration(path):
+    size = os.path.getsize(path)
+    with open(path, 'rb') as source:
+        head = source.read(10)
+        offset = 0
+        if head[:3] == b'ID3' and len(head) == 10:
+            # Tamaño de la etiqueta ID3v2 en enteros de 7 bits
+            offset = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+        source.seek(offset)
+        data = source.read(64 * 1024)
+
+    for index in range(len(data) - 4):
+        if data[index] != 0xFF or (data[index + 1] & 0xE0) != 0xE0:
+            continue
+        header = struct.unpack('>I', data[index:index + 4])[0]
+        version = (header >> 19) & 0x3
+        layer = (header >> 17) & 0x3
+        bitrate_index = (header >> 12) & 0xF
+        rate_index = (header >> 10) & 0x3
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+        samples_per_frame = 1152 if version == 3 else 576
+        mono = ((header >> 6) & 0x3) == 3
+
+        # Las cabeceras Xing/Info (y VBRI) de los VBR indican el total de tramas
+        side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+        xing = index + 4 + side_info
+        if data[xing:xing + 4] in (b'Xing', b'Info') and data[xing + 7] & 0x1:
+            frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+            return frames * samples_per_frame / sample_rate
+        vbri = index + 4 + 32
+        if data[vbri:vbri + 4] == b'VBRI':
+            frames = struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+            return frames * samples_per_frame / sample_rate
+        # Bitrate constante
+        return (size - offset - index) * 8 / bitrate
+    return None
+
+
+def _mp4_duration(path):
+    def atoms(source, end):
+        while source.tell() + 8 <= end:
+            start = source.tell()
+            size, kind = struct.unpack('>I4s', source.read(8))
+            header = 8
+            if size == 1:
+                size = struct.unpack('>Q', source.read(8))[0]
+                header = 16
+            elif size == 0:
+                size = end - start
+            if size < header:
+                return
+            yield kind, start + header, start + size
+            source.seek(start + size)
+
+    with open(path, 'rb') as source:
+        end = os.path.getsize(path)
+        for kind, body, atom_end in atoms(source, end):
+            if kind != b'moov':
+                continue
+            source.seek(body)
+            for child, child_body, _ in atoms(source, atom_end):
+                if child != b'mvhd':
+                    continue
+                source.seek(child_body)
+                version = source.read(1)[0]
+                source.seek(3, os.SEEK_CUR)
+                if version == 1:
+                    _, _, timescale, length = struct.unpack('>QQIQ', source.read(28))
+                else:
+                    _, _, timescale, length = struct.unpack('>IIII', source.read(16))
+                return length / timescale if timescale else None
+    return None
+
+
+def _ffprobe_duration(path):
+    ffprobe = ffmpeg_binary('ffprobe')
+    if not ffprobe:
+        return None
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path],
+        capture_output=True, timeout=60,
+    )
+    try:
+        return float(json.loads(result.stdout)['format']['duration'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+_PARSERS = {
+    '.wav': _wav_duration,
+    '.mp3': _mp3_duration,
+    '.m4a': _mp4_duration,
+    '.mp4': _mp4_duration,
+    '.mov': _mp4_duration,
+}
+
+
+def duration(path):
+    """
+    Duración en segundos leyendo solo la cabecera, o None si no se reconoce
+    """
+    parser = _PARSERS.get(os.path.splitext(path)[1].lower())
+    value = None
+    if parser:
+        try:
+            value = parser(path)
+        except (OSError, struct.error, IndexError):
+            value = None
+    if value is None:
+        value = _ffprobe_duration(path)
+    return round(value, 3) if value else value
+
+
+# Forma de onda
+
+def _wav_blocks(path):
+    """
+    Devuelve (total de muestras, generador de bloques mono en [-1, 1])
+    """
+    reader = wave.open(path, 'rb')
+    channels = reader.getnchannels()
+    width = reader.getsampwidth()
+    total = reader.getnframes()
+
+    def blocks():
+        with reader:
+            while True:
+                raw = reader.readframes(_BLOCK_FRAMES)
+                if not raw:
+                    break
+                if width == 1:
+                    samples = np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128
+                    scale = 128.0
+                elif width == 3:
+                    # 24 bits: se completa cada muestra a 32 bits con signo
+                    packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+                    padded = np.zeros((len(packed), 4), dtype=np.uint8)
+                    padded[:, 1:] = packed
+                    samples = padded.view('<i4').ravel().astype(np.float32)
+                    scale = 2.0 ** 31
+                else:
+                    dtype = {2: '<i2', 4: '<i4'}[width]
+                    samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+                    scale = 2.0 ** (8 * width - 1)
+                samples = np.abs(samples.reshape(-1, channels)).max(axis=1)
+                yield samples / scale
+
+    return total, blocks()
+
+
+def _ffmpeg_blocks(path, seconds):
+    ffmpeg = ffmpeg_binary('ffmpeg')
+    if not ffmpeg or not seconds:
+        return 0, iter(())
+    total = int(seconds * DECODE_SAMPLE_RATE)
+
+    def blocks():
+        process = subprocess.Popen(
+            [
+                ffmpeg, '-v', 'error', '-i', path, '-vn', '-ac', '1',
+                '-ar', str(DECODE_SAMPLE_RATE), '-f', 's16le', '-',
+            ],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while True:
+                raw = process.stdout.read(_BLOCK_FRAMES * 2)
+                if not raw:
+                    break
+                samples = np.frombuffer(raw[:len(raw) // 2 * 2], dtype='<i2')
+                yield np.abs(samples.astype(np.float32)) / 32768.0
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    return total, blocks()
+
+
+def peaks(total, blocks, count=PEAKS_COUNT):
+    """
+    Máximo absoluto de cada uno de los count tramos del audio.
+
+    Las muestras llegan por bloques y cada una se asigna a su tramo por su
+    posición, así que nunca se carga el audio completo en memoria.
+    """
+    result = np.zeros(count, dtype=np.float32)
+    if total <= 0:
+        return []
+    position = 0
+    for block in blocks:
+        indexes = (np.arange(position, position + len(block), dtype=np.int64) * count) // total
+        # La duración de ffmpeg es una estimación: lo que sobra va al último tramo
+        np.minimum(indexes, count - 1, out=indexes)
+        np.maximum.at(result, indexes, block)
+        position += len(block)
+    return [round(float(value), 3) for value in np.clip(result, 0, 1)]
+
+
+def waveform(path, seconds):
+    if os.path.splitext(path)[1].lower() == '.wav':
+        try:
+            return peaks(*_wav_blocks(path))
+        except (wave.Error, EOFError, KeyError):
+            pass
+    return peaks(*_ffmpeg_blocks(path, seconds))
+
+
+# Versión comprimida
+
+def render_variant(path, name, storage=None):
+    """
+    Genera con ffmpeg una versión AAC mono normalizada; devuelve su ruta o None
+    """
+    storage = storage or derivatives.default_storage
+    ffmpeg = ffmpeg_binary('ffmpeg')
+    if not ffmpeg:
+        return None
+    with tempfile.NamedTemporaryFile(suffix='.m4a') as output:
+        result = subprocess.run(
+            [
+                ffmpeg, '-v', 'error', '-y', '-i', path, '-vn', '-ac', '1',
+                '-af', 'loudnorm=I=-16:TP=-1.5:LRA=11',
+                '-c:a', 'aac', '-b:a', settings.MEDIA_AUDIO_VARIANT_BITRATE,
+                '-movflags', '+faststart', output.name,
+            ],
+            capture_output=True, timeout=600,
+        )
+        if result.returncode != 0:
+            logger.warning('ffmpeg no pudo comprimir %s: %s', name, result.stderr[-500:])
+            return None
+        variant = f'{derivatives.derivative_dir(name)}/{VARIANT_NAME}'
+        if storage.exists(variant):
+            storage.delete(variant)
+        with open(output.name, 'rb') as content:
+            return storage.save(variant, File(content))
+
+
+def analyze(path, name):
+    """
+    Analiza el archivo local path y devuelve el dict a guardar en el modelo
+    """
+    seconds = duration(path)
+    analysis = {'source': name, 'duration': seconds, 'peaks': waveform(path, seconds)}
+    variant = render_variant(path, name)
+    if variant:
+        analysis['variant'] = variant
+    return analysis
+
+
+def shared_analysis(name):
+    """
+    Análisis ya hecho del mismo archivo por otro objeto (blobs compartidos)
+    """
+    for label, field_name, analysis_field, _ in SOURCES:
+        candidates = apps.get_model(label).objects.filter(**{field_name: name}).exclude(
+            **{analysis_field: {}}
+        ).values_list(analysis_field, flat=True)[:5]
+        for analysis in candidates:
+            if analysis and analysis.get('source') == name:
+                return analysis
+    return None
+
+
+def release_analysis(analysis, storage=None):
+    """
+    Borra la versión comprimida si ningún objeto sigue usando su original
+    """
+    storage = storage or derivatives.default_storage
+    variant = (analysis or {}).get('variant')
+    if not variant:
+        return
+    source = analysis.get('source')
+    in_use = any(
+        apps.get_model(label).objects.filter(**{field_name: source}).exists()
+        for label, field_name, _, _ in SOURCES
+    )
+    if not in_use and storage.exists(variant):
+        storage.delete(variant)
+
+
+def generate(label, pk, field_name):
+    """
+    Analiza y guarda el audio actual de un objeto.
+
+    Si el audio cambió mientras se procesaba, el resultado se descarta.
+    """
+    model = apps.get_model(label)
+    analysis_field, duration_field = source_for(model, field_name)
+    instance = model.objects.filter(pk=pk).only(field_name).first()
+    if instance is None:
+        return False
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return False
+
+    try:
+        path = field_file.storage.path(field_file.name)
+        temporary = None
+    except NotImplementedError:
+        # Storage remoto: se descarga a un archivo temporal
+        extension = os.path.splitext(field_file.name)[1]
+        temporary = tempfile.NamedTemporaryFile(suffix=extension)
+        with field_file.open('rb') as source:
+            shutil.copyfileobj(source, temporary)
+        temporary.flush()
+        path = temporary.name
+    try:
+        analysis = analyze(path, field_file.name)
+    finally:
+        if temporary is not None:
+            temporary.close()
+
+    updates = {analysis_field: analysis}
+    if duration_field:
+        updates[duration_field] = analysis['duration']
+    if any(field.name == 'updated_at' for field in model._meta.fields):
+        updates['updated_at'] = timezone.now()
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**updates)
+    if not updated:
+        release_analysis(analysis)
+        return False
+    return True
+
+
+def schedule(instance, field_name):
+    """
+    Encola el análisis en segundo plano (ver tasks.py)
+    """
+    label = instance._meta.label
+    enqueue(
+        'media.audio', {'label': label, 'pk': str(instance.pk), 'field_name': field_name},
+        dedupe_key=f'media.audio:{label}:{instance.pk}:{field_name}',
+    )
@@ -0,0 +1,121 @@
+"""
+Conteo de referencias de los blobs del almacenamiento direccionado por contenido.
+
+Las señales de signals.py suman y restan referencias cuando cambia o se borra
+un campo de BLOB_FIELDS. Los blobs que quedan sin referencias no se borran
+al momento (otra subida del mismo contenido podría estar en curso): lo hace
+collect_blobs pasado un margen.
+"""
+from collections import Counter
+from datetime import timedelta
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from apps.accounts.access import accessible_vault_ids
+from .models import Blob
+from .storage import content_addressed, digest_from_name
+
+# (modelo, campo) con storage=content_addressed_storage
+BLOB_FIELDS = [
+    ('memories.Memory', 'photo'),
+    ('memories.Memory', 'audio'),
+    ('memories.Memory', 'video'),
+    ('genealogy.Person', 'photo'),
+    ('conversation.Phrase', 'audio_file'),
+]
+
+
+def blob_fields_by_model():
+    fields = {}
+    for label, field_name in BLOB_FIELDS:
+        fields.setdefault(apps.get_model(label), []).append(field_name)
+    return fields
+
+
+def retain(names):
+    """
+    Suma una referencia por cada aparición de un nombre de blob
+    """
+    for name, count in Counter(name for name in names if digest_from_name(name)).items():
+        blobs = Blob.objects.filter(name=name)
+        if blobs.update(ref_count=F('ref_count') + count, updated_at=timezone.now()):
+            continue
+        size = content_addressed.size(name) if content_addressed.exists(name) else 0
+        try:
+            with transaction.atomic():
+                Blob.objects.create(
+                    name=name, sha256=digest_from_name(name), size=size, ref_count=count
+                )
+        except IntegrityError:
+            blobs.update(ref_count=F('ref_count') + count, updated_at=timezone.now())
+
+
+def release(names):
+    """
+    Resta una referencia por cada aparición de un nombre de blob
+    """
+    for name, count in Counter(name for name in names if digest_from_name(name)).items():
+        Blob.objects.filter(name=name).update(
+            ref_count=Greatest(F('ref_count') - count, 0), updated_at=timezone.now()
+        )
+
+
+def accessible_blobs(request, digests):
+    """
+    Nombres de blob por sha256 que ya están en algún cofre del usuario.
+
+    Solo se confirman blobs de sus cofres para no revelar qué contenido
+    han subido otras familias.
+    """
+    names = dict(
+        Blob.objects.filter(sha256__in=digests, ref_count__gt=0).values_list('name', 'sha256')
+    )
+    if not names:
+        return {}
+    vault_ids = accessible_vault_ids(request)
+    found = {}
+    for model, field_names in blob_fields_by_model().items():
+        for field_name in field_names:
+            rows = model.objects.filter(
+                **{f'{field_name}__in': list(names)}, vault_id__in=vault_ids
+            ).values_list(field_name, flat=True).distinct()
+            for name in rows:
+                found.setdefault(names[name], name)
+    return found
+
+
+def recount():
+    """
+    Recalcula ref_count desde los campos de archivo
+    """
+    counts = Counter()
+    for model, field_names in blob_fields_by_model().items():
+        for field_name in field_names:
+            rows = model.objects.filter(
+                **{f'{field_name}__startswith': content_addressed.name_prefix}
+            ).values_list(field_name, flat=True)
+            counts.update(rows.iterator())
+
+    with transaction.atomic():
+        Blob.objects.exclude(name__in=list(counts)).update(ref_count=0)
+        for name, count in counts.items():
+            updated = Blob.objects.filter(name=name).update(ref_count=count)
+            if not updated and digest_from_name(name):
+                retain([name] * count)
+    return len(counts)
+
+
+def collect(grace=timedelta(hours=1)):
+    """
+    Borra los blobs sin referencias desde hace más de grace
+    """
+    cutoff = timezone.now() - grace
+    removed = 0
+    for blob in Blob.objects.filter(ref_count=0, updated_at__lt=cutoff).iterator():
+        # Se vuelve a comprobar al borrar por si alguien lo referenció mientras tanto
+        if Blob.objects.filter(pk=blob.pk, ref_count=0).delete()[0]:
+            content_addressed.delete(blob.name)
+            removed += 1
+    return removed
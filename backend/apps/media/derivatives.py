@@ -0,0 +1,187 @@
+"""
+Versiones reducidas (renditions) de las fotos subidas.
+
+Por cada imagen de SOURCES se generan copias WebP y JPEG a los tamaños de
+RENDITION_SIZES, giradas según la orientación EXIF y sin metadatos. Se
+guardan junto al original en derivatives/<ruta del original>/ y el campo
+JSON de renditions del modelo registra las rutas y el original del que
+salieron, para detectar cuándo hay que regenerarlas.
+"""
+import os
+from io import BytesIO
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+from apps.jobs.queue import enqueue
+
+# Lado mayor en píxeles de cada versión
+RENDITION_SIZES = {
+    'thumb': 160,
+    'small': 480,
+    'medium': 1080,
+}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+# (modelo, campo de imagen, campo JSON con las versiones)
+SOURCES = [
+    ('memories.Memory', 'photo', 'photo_renditions'),
+    ('genealogy.Person', 'photo', 'photo_renditions'),
+    ('accounts.User', 'avatar', 'avatar_renditions'),
+]
+
+DERIVATIVES_DIR = 'derivatives'
+
+
+def source_for(model, field_name):
+    """
+    Devuelve el campo JSON de versiones del par (modelo, campo) o None
+    """
+    label = model._meta.label
+    for source_label, source_field, renditions_field in SOURCES:
+        if source_label == label and source_field == field_name:
+            return renditions_field
+    return None
+
+
+def derivative_dir(name):
+    root, _ = os.path.splitext(name)
+    return f'{DERIVATIVES_DIR}/{root}'
+
+
+def _prepare(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG no admite transparencia: se compone sobre blanco
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode in ('RGBA', 'LA'):
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        return background
+    if fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return image
+
+
+def render(source_file, storage=None, name=None):
+    """
+    Genera las versiones de una imagen y devuelve el dict a guardar en el modelo
+    """
+    storage = storage or default_storage
+    name = name or source_file.name
+    directory = derivative_dir(name)
+    largest = max(RENDITION_SIZES.values())
+
+    with Image.open(source_file) as original:
+        # En JPEG draft decodifica directamente a una escala reducida
+        original.draft('RGB', (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    sizes = {}
+    for size_name, max_side in sorted(RENDITION_SIZES.items(), key=lambda item: -item[1]):
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt, options in FORMATS.items():
+            buffer = BytesIO()
+            # Sin exif= ni icc_profile=, Pillow no copia metadatos al guardar
+            _prepare(resized, fmt).save(buffer, **options)
+            path = f'{directory}/{size_name}.{fmt}'
+            if storage.exists(path):
+                storage.delete(path)
+            entry[fmt] = storage.save(path, ContentFile(buffer.getvalue()))
+        sizes[size_name] = entry
+        # La siguiente versión, más pequeña, parte de esta
+        image = resized
+
+    return {'source': name, 'sizes': sizes}
+
+
+def shared_renditions(name):
+    """
+    Versiones ya generadas para el mismo original por otro objeto.
+
+    Con el almacenamiento direccionado por contenido varios objetos pueden
+    compartir imagen y, con ella, sus versiones.
+    """
+    for label, field_name, renditions_field in SOURCES:
+        model = apps.get_model(label)
+        candidates = model.objects.filter(**{field_name: name}).exclude(
+            **{renditions_field: {}}
+        ).values_list(renditions_field, flat=True)[:5]
+        for renditions in candidates:
+            if renditions and renditions.get('source') == name:
+                return renditions
+    return None
+
+
+def source_in_use(name):
+    return any(
+        apps.get_model(label).objects.filter(**{field_name: name}).exists()
+        for label, field_name, _ in SOURCES
+    )
+
+
+def release_renditions(renditions):
+    """
+    Borra las versiones si ningún objeto sigue usando su original
+    """
+    if renditions and not source_in_use(renditions.get('source')):
+        remove_renditions(renditions)
+
+
+def remove_renditions(renditions, storage=None):
+    storage = storage or default_storage
+    for entry in (renditions or {}).get('sizes', {}).values():
+        for fmt in FORMATS:
+            path = entry.get(fmt)
+            if path and storage.exists(path):
+                storage.delete(path)
+
+
+def generate(label, pk, field_name):
+    """
+    Genera y guarda las versiones de la imagen actual de un objeto.
+
+    Si la imagen cambió mientras se procesaba, el resultado se descarta.
+    """
+    model = apps.get_model(label)
+    renditions_field = source_for(model, field_name)
+    instance = model.objects.filter(pk=pk).only(field_name, renditions_field).first()
+    if instance is None:
+        return False
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return False
+
+    # Las versiones van al storage por defecto aunque el original sea un blob
+    with field_file.open('rb') as source_file:
+        renditions = render(source_file, name=field_file.name)
+
+    updates = {renditions_field: renditions}
+    if any(field.name == 'updated_at' for field in model._meta.fields):
+        updates['updated_at'] = timezone.now()
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**updates)
+    if not updated:
+        # Las rutas dependen solo del original: otro objeto con el mismo blob
+        # puede estar usando estas mismas versiones
+        release_renditions(renditions)
+        return False
+    return True
+
+
+def schedule(instance, field_name):
+    """
+    Encola la generación en segundo plano (ver tasks.py)
+    """
+    label = instance._meta.label
+    enqueue(
+        'media.renditions', {'label': label, 'pk': str(instance.pk), 'field_name': field_name},
+        dedupe_key=f'media.renditions:{label}:{instance.pk}:{field_name}',
+    )
@@ -0,0 +1,51 @@
+from rest_framework import serializers
+from . import audio, derivatives
+
+
+class RenditionsField(serializers.Field):
+    """
+    Expone las versiones reducidas de una imagen como
+    {tamaño: {'width', 'height', 'webp': url, 'jpeg': url}}
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        storage = derivatives.default_storage
+        sizes = {}
+        for size_name, entry in (value or {}).get('sizes', {}).items():
+            urls = {'width': entry.get('width'), 'height': entry.get('height')}
+            for fmt in derivatives.FORMATS:
+                if entry.get(fmt):
+                    url = storage.url(entry[fmt])
+                    urls[fmt] = request.build_absolute_uri(url) if request else url
+            sizes[size_name] = urls
+        return sizes
+
+
+class AudioAnalysisField(serializers.Field):
+    """
+    Expone el análisis de un audio como {'duration', 'peaks', 'compressed': url}
+    para que el reproductor dibuje la forma de onda sin descargar el archivo
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        value = value or {}
+        compressed = None
+        if value.get('variant'):
+            request = self.context.get('request')
+            compressed = audio.derivatives.default_storage.url(value['variant'])
+            if request:
+                compressed = request.build_absolute_uri(compressed)
+        return {
+            'duration': value.get('duration'),
+            'peaks': value.get('peaks', []),
+            'compressed': compressed,
+        }
@@ -0,0 +1,75 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apps.media import audio, derivatives
+
+GENERATORS = {
+    'photo': derivatives.generate,
+    'audio': audio.generate,
+}
+
+
+def _init_worker():
+    # Con el método spawn cada proceso arranca Django desde cero
+    django.setup()
+
+
+def _generate(task):
+    kind, label, pk, field_name = task
+    try:
+        return task, GENERATORS[kind](label, pk, field_name), None
+    except Exception as exc:
+        return task, False, str(exc)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera las versiones reducidas de las fotos y el análisis de los audios '
+        'existentes en un pool de procesos'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Procesos en paralelo')
+        parser.add_argument('--force', action='store_true', help='Regenerar aunque ya existan')
+        parser.add_argument('--model', help='Limitar a un modelo, p. ej. memories.Memory')
+        parser.add_argument('--kind', choices=sorted(GENERATORS), help='Solo fotos o solo audios')
+    
+    def handle(self, *args, **options):
+        sources = [('photo',) + source for source in derivatives.SOURCES]
+        sources += [('audio',) + source[:3] for source in audio.SOURCES]
+        
+        tasks = []
+        for kind, label, field_name, json_field in sources:
+            if (options['model'] and options['model'] != label) or options['kind'] not in (None, kind):
+                continue
+            model = apps.get_model(label)
+            rows = model.objects.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            ).values_list('pk', field_name, json_field)
+            for pk, name, generated in rows.iterator():
+                if options['force'] or (generated or {}).get('source') != name:
+                    tasks.append((kind, label, pk, field_name))
+        
+        if not tasks:
+            self.stdout.write(self.style.SUCCESS('No hay archivos pendientes'))
+            return
+        
+        # Los procesos hijos no deben heredar la conexión abierta del padre
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            for (_, label, pk, _), ok, error in pool.map(_generate, tasks, chunksize=16):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{label} {pk}: {error}')
+                elif ok:
+                    done += 1
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{done} archivos procesados, {failed} con errores, {len(tasks) - done - failed} omitidos'
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.media.uploads import clean_expired
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas caducadas y sus archivos temporales'
+    
+    def handle(self, *args, **options):
+        total = clean_expired()
+        self.stdout.write(self.style.SUCCESS(f'{total} subidas eliminadas'))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from apps.media import blobs
+
+
+class Command(BaseCommand):
+    help = 'Borra los blobs sin referencias del almacenamiento por contenido'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Minutos que un blob debe llevar sin referencias antes de borrarlo'
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Recalcular antes los contadores de referencias desde los modelos'
+        )
+    
+    def handle(self, *args, **options):
+        if options['recount']:
+            total = blobs.recount()
+            self.stdout.write(f'{total} blobs referenciados')
+        
+        removed = blobs.collect(timedelta(minutes=options['grace_minutes']))
+        self.stdout.write(self.style.SUCCESS(f'{removed} blobs eliminados'))
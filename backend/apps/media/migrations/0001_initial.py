@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('total_size', models.BigIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('received', models.BigIntegerField(default=0)),
+                ('target', models.CharField(choices=[('memory.photo', 'Foto de recuerdo'), ('memory.audio', 'Audio de recuerdo'), ('memory.video', 'Video de recuerdo'), ('phrase.audio_file', 'Audio de frase')], max_length=30)),
+                ('target_id', models.UUIDField()),
+                ('status', models.CharField(choices=[('pending', 'En curso'), ('complete', 'Completada'), ('aborted', 'Cancelada')], default='pending', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Subida',
+                'verbose_name_plural': 'Subidas',
+                'db_table': 'upload_sessions',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='upload_sessions_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+import os
+import uuid
+from django.conf import settings
+from django.db import models
+
+
+class UploadTarget(models.TextChoices):
+    MEMORY_PHOTO = 'memory.photo', 'Foto de recuerdo'
+    MEMORY_AUDIO = 'memory.audio', 'Audio de recuerdo'
+    MEMORY_VIDEO = 'memory.video', 'Video de recuerdo'
+    PHRASE_AUDIO = 'phrase.audio_file', 'Audio de frase'
+
+
+class UploadStatus(models.TextChoices):
+    PENDING = 'pending', 'En curso'
+    COMPLETE = 'complete', 'Completada'
+    ABORTED = 'aborted', 'Cancelada'
+
+
+class UploadSession(models.Model):
+    """
+    Subida reanudable: los fragmentos se escriben en un archivo temporal y al
+    finalizar se verifica el checksum y se adjunta el archivo al destino
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions'
+    )
+    
+    # Archivo esperado
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.BigIntegerField(default=0)  # Bytes confirmados (offset para reanudar)
+    
+    # Destino
+    target = models.CharField(max_length=30, choices=UploadTarget.choices)
+    target_id = models.UUIDField()
+    
+    status = models.CharField(max_length=20, choices=UploadStatus.choices, default=UploadStatus.PENDING)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'upload_sessions'
+        verbose_name = 'Subida'
+        verbose_name_plural = 'Subidas'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='upload_sessions_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.total_size})"
+    
+    @property
+    def temp_path(self):
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f'{self.id.hex}.part')
+    
+    @property
+    def is_complete(self):
+        return self.received >= self.total_size
+
+
+class Blob(models.Model):
+    """
+    Contenido guardado una sola vez en el almacenamiento direccionado por
+    contenido; ref_count cuenta los campos de archivo que lo referencian
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'media_blobs'
+        verbose_name = 'Blob'
+        verbose_name_plural = 'Blobs'
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at'], name='media_blobs_unused_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
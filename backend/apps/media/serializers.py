@@ -0,0 +1,63 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import UploadSession, UploadTarget
+
+
+def validate_sha256(value):
+    value = value.lower()
+    if len(value) != 64 or any(char not in '0123456789abcdef' for char in value):
+        raise serializers.ValidationError('sha256 debe ser un hash hexadecimal de 64 caracteres')
+    return value
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+    
+    class Meta:
+        model = UploadSession
+        fields = (
+            'id', 'filename', 'content_type', 'total_size', 'sha256', 'offset',
+            'target', 'target_id', 'status', 'expires_at', 'created_at', 'updated_at'
+        )
+        read_only_fields = fields
+
+
+class UploadSessionCreateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ('filename', 'content_type', 'total_size', 'sha256', 'target', 'target_id')
+    
+    def validate_filename(self, value):
+        # Solo el nombre, sin rutas del dispositivo
+        value = value.replace('\\', '/').rsplit('/', 1)[-1].strip()
+        if not value:
+            raise serializers.ValidationError('Nombre de archivo inválido')
+        return value
+    
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('El tamaño debe ser mayor que cero')
+        if value > settings.UPLOAD_SESSION_MAX_SIZE:
+            raise serializers.ValidationError('El archivo supera el tamaño máximo permitido')
+        return value
+    
+    def validate_sha256(self, value):
+        return validate_sha256(value)
+
+
+class BlobLookupSerializer(serializers.Serializer):
+    sha256 = serializers.ListField(
+        child=serializers.CharField(validators=[validate_sha256]), max_length=500
+    )
+    
+    def validate_sha256(self, value):
+        return [digest.lower() for digest in value]
+
+
+class BlobAttachSerializer(serializers.Serializer):
+    sha256 = serializers.CharField()
+    target = serializers.ChoiceField(choices=UploadTarget.choices)
+    target_id = serializers.UUIDField()
+    
+    def validate_sha256(self, value):
+        return validate_sha256(value)
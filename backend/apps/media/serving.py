@@ -0,0 +1,211 @@
+"""
+Entrega de archivos de MEDIA_ROOT con control de acceso.
+
+Cada ruta se resuelve al objeto que la referencia (o a la imagen original,
+si es una versión reducida) y se comprueba el acceso a su cofre, salvo que
+la URL venga firmada (ver signing.py): entonces basta con la firma. La
+respuesta admite Range/206, ETag fuerte con If-None-Match e If-Range, y con
+MEDIA_SENDFILE delega la transferencia al servidor frontal mediante
+X-Accel-Redirect (nginx) o X-Sendfile (apache).
+"""
+import hashlib
+import mimetypes
+import re
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+from apps.accounts.access import accessible_vault_ids
+from . import audio, derivatives
+
+# Campos de archivo servidos por la vista de medios
+FILE_FIELDS = [
+    ('memories.Memory', 'photo'),
+    ('memories.Memory', 'audio'),
+    ('memories.Memory', 'video'),
+    ('genealogy.Person', 'photo'),
+    ('conversation.Phrase', 'audio_file'),
+    ('accounts.User', 'avatar'),
+]
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _field(label, field_name):
+    model = apps.get_model(label)
+    return model, model._meta.get_field(field_name)
+
+
+def _prefixes(field):
+    # Los campos deduplicados guardan en blobs/ aunque conserven upload_to
+    # para los archivos anteriores
+    prefixes = [field.upload_to if isinstance(field.upload_to, str) else '']
+    name_prefix = getattr(field.storage, 'name_prefix', None)
+    if name_prefix:
+        prefixes.append(name_prefix)
+    return tuple(prefixes)
+
+
+def is_safe_name(name):
+    parts = name.split('/')
+    return bool(name) and not name.startswith('/') and '..' not in parts and '' not in parts
+
+
+def _owners(name):
+    """
+    Consultas de los objetos que pueden referenciar la ruta: (modelo, queryset, comprobación)
+    """
+    prefix = f'{derivatives.DERIVATIVES_DIR}/'
+    if name.startswith(prefix):
+        # derivatives/<original sin extensión>/<tamaño>.<formato>
+        root = name[len(prefix):].rsplit('/', 1)[0]
+        directory = f'{prefix}{root}'
+        sources = [source[:2] for source in derivatives.SOURCES + audio.SOURCES]
+        for label, field_name in sources:
+            model, field = _field(label, field_name)
+            if root.startswith(_prefixes(field)):
+                queryset = model.objects.filter(**{f'{field_name}__startswith': f'{root}.'})
+                yield model, queryset.values_list(field_name, flat=True), (
+                    lambda value, directory=directory: derivatives.derivative_dir(value) == directory
+                )
+        return
+
+    for label, field_name in FILE_FIELDS:
+        model, field = _field(label, field_name)
+        if name.startswith(_prefixes(field)):
+            queryset = model.objects.filter(**{field_name: name})
+            yield model, queryset.values_list(field_name, flat=True), None
+
+
+def can_access(request, name):
+    """
+    Indica si el usuario puede ver el archivo: debe pertenecer a un objeto de
+    uno de sus cofres. Los avatares son visibles para cualquier usuario autenticado.
+    """
+    for model, values, check in _owners(name):
+        if not any(field.name == 'vault' for field in model._meta.fields):
+            if request.user.is_authenticated and _matches(values, check):
+                return True
+            continue
+        if _matches(values.filter(vault_id__in=accessible_vault_ids(request)), check):
+            return True
+    return False
+
+
+def _matches(values, check):
+    if check is None:
+        return values.exists()
+    return any(check(value) for value in values)
+
+
+def make_etag(name, size, modified):
+    digest = hashlib.sha256(f'{name}:{size}:{modified.timestamp()}'.encode()).hexdigest()
+    return quote_etag(digest[:32])
+
+
+def parse_range(header, size):
+    """
+    Devuelve (inicio, fin) de un Range de un solo tramo, None si no aplica o
+    False si no se puede satisfacer
+    """
+    match = _RANGE_RE.match(header or '')
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: los últimos N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _stream(storage, name, start, length):
+    with storage.open(name, 'rb') as source:
+        source.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = source.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [value.strip() for value in header.split(',')]
+
+
+def serve(request, name, storage=None, cache_control=None):
+    """
+    Respuesta HTTP para el archivo name (el acceso ya está comprobado)
+    """
+    storage = storage or default_storage
+    size = storage.size(name)
+    modified = storage.get_modified_time(name)
+    etag = make_etag(name, size, modified)
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(modified.timestamp()),
+        'Cache-Control': cache_control or f'private, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable',
+        'Accept-Ranges': 'bytes',
+    }
+
+    if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+        response = HttpResponse(status=304)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE:
+        # El servidor frontal atiende Range y transfiere los bytes
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_SENDFILE == 'nginx':
+            response['X-Accel-Redirect'] = f'{settings.MEDIA_SENDFILE_PREFIX.rstrip("/")}/{name}'
+        else:
+            response['X-Sendfile'] = storage.path(name)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range == etag:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(storage.open(name, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _stream(storage, name, start, length), status=206, content_type=content_type
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
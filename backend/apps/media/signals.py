@@ -0,0 +1,110 @@
+from django.apps import apps
+from django.db.models.signals import pre_save, post_save, post_delete
+from apps.jobs.queue import enqueue
+from . import audio, blobs, derivatives
+
+
+def _connect_renditions(label, field_name, renditions_field):
+    model = apps.get_model(label)
+
+    def refresh_renditions(sender, instance, **kwargs):
+        name = getattr(instance, field_name).name or ''
+        renditions = getattr(instance, renditions_field) or {}
+        if name and renditions.get('source') == name:
+            return
+        updates = {}
+        if renditions:
+            # Las versiones son de una imagen anterior
+            updates[renditions_field] = {}
+            enqueue('media.release_renditions', {'renditions': renditions})
+        shared = derivatives.shared_renditions(name) if name else None
+        if shared:
+            updates[renditions_field] = shared
+        if updates:
+            sender.objects.filter(pk=instance.pk).update(**updates)
+            setattr(instance, renditions_field, updates[renditions_field])
+        if name and not shared:
+            derivatives.schedule(instance, field_name)
+
+    def delete_renditions(sender, instance, **kwargs):
+        renditions = getattr(instance, renditions_field) or {}
+        if renditions:
+            enqueue('media.release_renditions', {'renditions': renditions})
+
+    uid = f'media:{label}.{field_name}'
+    post_save.connect(refresh_renditions, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(delete_renditions, sender=model, weak=False, dispatch_uid=uid)
+
+
+def _connect_audio(label, field_name, analysis_field, duration_field):
+    model = apps.get_model(label)
+
+    def refresh_analysis(sender, instance, **kwargs):
+        name = getattr(instance, field_name).name or ''
+        analysis = getattr(instance, analysis_field) or {}
+        if name and analysis.get('source') == name:
+            return
+        updates = {}
+        if analysis:
+            # El análisis es de un audio anterior
+            updates[analysis_field] = {}
+            enqueue('media.release_analysis', {'analysis': analysis})
+        shared = audio.shared_analysis(name) if name else None
+        if shared:
+            updates[analysis_field] = shared
+        if duration_field and (shared or analysis):
+            updates[duration_field] = shared['duration'] if shared else None
+        if updates:
+            sender.objects.filter(pk=instance.pk).update(**updates)
+            for field, value in updates.items():
+                setattr(instance, field, value)
+        if name and not shared:
+            audio.schedule(instance, field_name)
+
+    def delete_analysis(sender, instance, **kwargs):
+        analysis = getattr(instance, analysis_field) or {}
+        if analysis:
+            enqueue('media.release_analysis', {'analysis': analysis})
+
+    uid = f'media:audio:{label}.{field_name}'
+    post_save.connect(refresh_analysis, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(delete_analysis, sender=model, weak=False, dispatch_uid=uid)
+
+
+def _connect_blobs(model, field_names):
+    def remember_blob_names(sender, instance, **kwargs):
+        instance._previous_blob_names = {}
+        if not instance._state.adding:
+            instance._previous_blob_names = sender.objects.filter(pk=instance.pk).values(
+                *field_names
+            ).first() or {}
+
+    def count_blob_references(sender, instance, **kwargs):
+        previous = getattr(instance, '_previous_blob_names', {})
+        added, removed = [], []
+        for field_name in field_names:
+            old = previous.get(field_name) or ''
+            new = getattr(instance, field_name).name or ''
+            if old != new:
+                added.append(new)
+                removed.append(old)
+        blobs.retain(added)
+        blobs.release(removed)
+
+    def release_blob_references(sender, instance, **kwargs):
+        blobs.release(getattr(instance, field_name).name or '' for field_name in field_names)
+
+    uid = f'media:blobs:{model._meta.label}'
+    pre_save.connect(remember_blob_names, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(count_blob_references, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(release_blob_references, sender=model, weak=False, dispatch_uid=uid)
+
+
+for label, field_name, renditions_field in derivatives.SOURCES:
+    _connect_renditions(label, field_name, renditions_field)
+
+for label, field_name, analysis_field, duration_field in audio.SOURCES:
+    _connect_audio(label, field_name, analysis_field, duration_field)
+
+for model, field_names in blobs.blob_fields_by_model().items():
+    _connect_blobs(model, field_names)
@@ -0,0 +1,50 @@
+"""
+URLs firmadas y con vencimiento para los archivos de media.
+
+La firma es un HMAC (derivado de SECRET_KEY) de la ruta y el vencimiento,
+así que la vista de medios puede validarla sin autenticar al usuario ni
+consultar la base de datos: quien recibe la URL en una respuesta de la API
+ya pasó el control de acceso al cofre. El vencimiento se redondea al final
+de la ventana MEDIA_SIGNED_URL_WINDOW, de modo que la misma ruta produce la
+misma URL durante toda la ventana y los cachés del cliente y de proxies la
+reutilizan.
+"""
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+_SALT = 'apps.media.signing'
+SIGNATURE_LENGTH = 32
+
+
+def expiry(now=None):
+    """
+    Vencimiento (timestamp) de las URLs firmadas ahora: al menos
+    MEDIA_SIGNED_URL_TTL segundos, constante dentro de cada ventana
+    """
+    now = int(time.time() if now is None else now)
+    window = settings.MEDIA_SIGNED_URL_WINDOW
+    return (now // window + 1) * window + settings.MEDIA_SIGNED_URL_TTL
+
+
+def signature(name, expires):
+    return salted_hmac(_SALT, f'{name}:{expires}', algorithm='sha256').hexdigest()[:SIGNATURE_LENGTH]
+
+
+def sign_url(url, name, now=None):
+    expires = expiry(now)
+    return f'{url}?{urlencode({"expires": expires, "signature": signature(name, expires)})}'
+
+
+def verify(name, expires, given, now=None):
+    """
+    Indica si given es la firma de name y el vencimiento no pasó
+    """
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < (time.time() if now is None else now):
+        return False
+    return constant_time_compare(signature(name, expires), given or '')
@@ -0,0 +1,126 @@
+"""
+Almacenamiento direccionado por contenido.
+
+Los archivos se guardan como blobs/<ab>/<sha256><ext>, de modo que un mismo
+contenido subido a varios recuerdos o cofres ocupa disco una sola vez. El
+hash se calcula mientras se copia el archivo (o llega ya calculado desde los
+upload handlers de uploadhandlers.py) y los blobs se cuentan en Blob (ver
+blobs.py); un blob sin referencias lo borra el comando collect_blobs.
+"""
+import hashlib
+import os
+import uuid
+from django.conf import settings
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from . import signing
+
+BLOB_PREFIX = 'blobs/'
+_SPOOL_DIR = f'{BLOB_PREFIX}tmp'
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest}{extension.lower()}'
+
+
+def digest_from_name(name):
+    """
+    sha256 de un nombre de blob, o None si el nombre no es de un blob
+    """
+    if not name or not name.startswith(BLOB_PREFIX):
+        return None
+    digest = os.path.splitext(os.path.basename(name))[0]
+    return digest if len(digest) == 64 else None
+
+
+class HashedFile(File):
+    """
+    Archivo temporal con su sha256 ya calculado: ContentAddressedStorage lo
+    mueve a su ruta definitiva sin volver a leerlo
+    """
+
+    def __init__(self, file, sha256, name=None):
+        super().__init__(file, name)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class SignedFileSystemStorage(FileSystemStorage):
+    """
+    FileSystemStorage cuyas URLs van firmadas y con vencimiento (ver signing.py)
+    """
+
+    def url(self, name):
+        url = super().url(name)
+        if settings.MEDIA_SIGNED_URLS and name:
+            return signing.sign_url(url, name)
+        return url
+
+
+class ContentAddressedStorage(SignedFileSystemStorage):
+    """
+    FileSystemStorage que nombra cada archivo por el sha256 de su contenido
+    """
+    name_prefix = BLOB_PREFIX
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide el contenido en _save
+        return name
+
+    def _spool(self, content):
+        directory = self.path(_SPOOL_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        with open(path, 'wb') as target:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                digest.update(chunk)
+                target.write(chunk)
+        return path, digest.hexdigest()
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1]
+        digest = getattr(content, 'sha256', None)
+        if digest and hasattr(content, 'temporary_file_path'):
+            # Archivo temporal con hash ya calculado: se mueve sin releerlo
+            source, owned = content.temporary_file_path(), False
+        else:
+            source, digest = self._spool(content)
+            owned = True
+
+        name = blob_name(digest, extension)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            if owned:
+                os.remove(source)
+            return name
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            file_move_safe(source, full_path)
+        except FileExistsError:
+            # Otro proceso guardó el mismo contenido a la vez
+            if owned:
+                os.remove(source)
+            return name
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+content_addressed = ContentAddressedStorage()
+
+
+def content_addressed_storage():
+    """
+    Storage de los FileField deduplicados (callable para que las migraciones
+    no serialicen la instancia)
+    """
+    return content_addressed
@@ -0,0 +1,26 @@
+"""
+Tareas en segundo plano de media (ver apps.jobs)
+"""
+from apps.jobs.queue import task
+from . import audio, derivatives
+
+
+@task('media.renditions')
+def build_renditions(label, pk, field_name):
+    return derivatives.generate(label, pk, field_name)
+
+
+@task('media.audio')
+def analyze_audio(label, pk, field_name):
+    return audio.generate(label, pk, field_name)
+
+
+@task('media.release_renditions')
+def release_renditions(renditions):
+    derivatives.release_renditions(renditions)
+
+
+@task('media.release_analysis')
+def release_analysis(analysis):
+    audio.release_analysis(analysis)
+
@@ -0,0 +1,263 @@
+import hashlib
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+from apps.accounts.models import Vault
+from apps.conversation.models import Phrase
+from apps.memories.models import Memory
+from . import blobs, derivatives, signing
+from .models import Blob, UploadSession, UploadStatus
+from .storage import content_addressed
+
+User = get_user_model()
+
+
+class MediaTestCase(APITestCase):
+    """
+    Usuario con un cofre y un recuerdo; MEDIA_ROOT y las subidas van a un
+    directorio temporal
+    """
+    
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        media_settings = override_settings(
+            MEDIA_ROOT=directory, UPLOAD_SESSION_DIR=f'{directory}/uploads'
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+    
+        self.user = User.objects.create_user(
+            username='nonna', email='nonna@example.com', password='secreta', name='Nonna'
+        )
+        self.vault = Vault.objects.create(name='Familia', owner=self.user)
+        self.memory = Memory.objects.create(
+            title='Canción de cuna', type='audio', vault=self.vault, created_by=self.user
+        )
+        self.client.force_authenticate(self.user)
+
+
+class ChunkedUploadTests(MediaTestCase):
+    content = b'0123456789abcdefghij'
+    
+    def setUp(self):
+        super().setUp()
+        response = self.client.post('/api/uploads/', {
+            'filename': 'nana.mp3',
+            'content_type': 'audio/mpeg',
+            'total_size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+            'target': 'memory.audio',
+            'target_id': str(self.memory.id),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.url = f"/api/uploads/{response.data['id']}/"
+    
+    def put(self, start, end, body=None):
+        return self.client.put(
+            self.url, body if body is not None else self.content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}',
+        )
+    
+    def test_overlapping_chunk_is_rejected(self):
+        self.assertEqual(self.put(0, 9).status_code, 200)
+    
+        response = self.put(5, 14)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '10')
+        # Repetir un fragmento ya confirmado tampoco lo vuelve a escribir
+        self.assertEqual(self.put(0, 9).status_code, 409)
+        self.assertEqual(self.put(10, 19).status_code, 200)
+        self.assertEqual(self.client.get(self.url)['Upload-Offset'], '20')
+    
+    def test_gap_and_out_of_range(self):
+        self.assertEqual(self.put(5, 9).status_code, 409)
+        self.assertEqual(self.put(10, 25).status_code, 416)
+        self.assertEqual(self.client.get(self.url)['Upload-Offset'], '0')
+    
+    def test_complete_requires_every_byte(self):
+        self.put(0, 9)
+        self.assertEqual(self.client.post(f'{self.url}complete/').status_code, 409)
+    
+        self.put(10, 19)
+        response = self.client.post(f'{self.url}complete/')
+        self.assertEqual(response.status_code, 200)
+        self.memory.refresh_from_db()
+        self.assertEqual(self.memory.audio.read(), self.content)
+    
+        # Una subida finalizada no admite más fragmentos ni otro cierre
+        self.assertEqual(self.put(0, 9).status_code, 409)
+        self.assertEqual(self.client.post(f'{self.url}complete/').status_code, 409)
+    
+    def test_checksum_mismatch(self):
+        self.put(0, 19, b'X' * 20)
+        self.assertEqual(self.client.post(f'{self.url}complete/').status_code, 422)
+        session = UploadSession.objects.get()
+        self.assertEqual(session.status, UploadStatus.PENDING)
+
+
+class BlobRefcountTests(MediaTestCase):
+    
+    def attach(self, instance, field_name, content):
+        getattr(instance, field_name).save('archivo.mp3', ContentFile(content), save=True)
+        return getattr(instance, field_name).name
+    
+    def refs(self, name):
+        return Blob.objects.get(name=name).ref_count
+    
+    def test_same_content_is_stored_once(self):
+        other = Memory.objects.create(title='Otra', vault=self.vault, created_by=self.user)
+        phrase = Phrase.objects.create(text='Buenas noches', vault=self.vault, created_by=self.user)
+        name = self.attach(self.memory, 'audio', b'nana')
+        self.assertEqual(self.attach(other, 'audio', b'nana'), name)
+        self.assertEqual(self.attach(phrase, 'audio_file', b'nana'), name)
+    
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(self.refs(name), 3)
+    
+    def test_replace_and_delete_release(self):
+        old = self.attach(self.memory, 'audio', b'primera')
+        new = self.attach(self.memory, 'audio', b'segunda')
+        self.assertEqual(self.refs(old), 0)
+        self.assertEqual(self.refs(new), 1)
+    
+        # Guardar sin cambiar el archivo no suma otra referencia
+        self.memory.title = 'Otro título'
+        self.memory.save()
+        self.assertEqual(self.refs(new), 1)
+    
+        self.memory.delete()
+        self.assertEqual(self.refs(new), 0)
+    
+    def test_release_never_goes_negative(self):
+        name = self.attach(self.memory, 'audio', b'nana')
+        blobs.release([name, name])
+        self.assertEqual(self.refs(name), 0)
+    
+    def test_collect_only_removes_unreferenced(self):
+        kept = self.attach(self.memory, 'audio', b'se queda')
+        other = Memory.objects.create(title='Otra', vault=self.vault, created_by=self.user)
+        removed = self.attach(other, 'audio', b'se va')
+        other.delete()
+    
+        self.assertEqual(blobs.collect(grace=timedelta(hours=1)), 0)
+        self.assertEqual(blobs.collect(grace=timedelta(0)), 1)
+        self.assertFalse(Blob.objects.filter(name=removed).exists())
+        self.assertFalse(content_addressed.exists(removed))
+        self.assertTrue(content_addressed.exists(kept))
+    
+    def test_recount_repairs_counts(self):
+        name = self.attach(self.memory, 'audio', b'nana')
+        Blob.objects.update(ref_count=7)
+        blobs.recount()
+        self.assertEqual(self.refs(name), 1)
+
+
+class SignedUrlTests(MediaTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.memory.audio.save('nana.mp3', ContentFile(b'nana'), save=True)
+        self.name = self.memory.audio.name
+        self.path = f'/media/{self.name}'
+        # Las URLs firmadas no necesitan JWT
+        self.client.force_authenticate(None)
+    
+    def get(self, expires, signature):
+        return self.client.get(self.path, {'expires': expires, 'signature': signature})
+    
+    def test_field_url_is_signed_and_served(self):
+        url = self.memory.audio.url
+        self.assertTrue(url.startswith(f'{self.path}?expires='))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'nana')
+        self.assertTrue(response['Cache-Control'].startswith('public'))
+    
+    def test_url_is_stable_within_window(self):
+        now = time.time()
+        start = now - now % settings.MEDIA_SIGNED_URL_WINDOW
+        self.assertEqual(
+            signing.sign_url(self.path, self.name, now=start),
+            signing.sign_url(self.path, self.name, now=start + settings.MEDIA_SIGNED_URL_WINDOW - 1),
+        )
+        self.assertNotEqual(
+            signing.sign_url(self.path, self.name, now=start),
+            signing.sign_url(self.path, self.name, now=start + settings.MEDIA_SIGNED_URL_WINDOW),
+        )
+    
+    def test_expired_url_is_rejected(self):
+        expires = int(time.time()) - 1
+        response = self.get(expires, signing.signature(self.name, expires))
+        self.assertEqual(response.status_code, 403)
+    
+    def test_tampered_urls_are_rejected(self):
+        expires = signing.expiry()
+        valid = signing.signature(self.name, expires)
+        self.assertEqual(self.get(expires, valid).status_code, 200)
+    
+        tampered = ('0' if valid[0] != '0' else '1') + valid[1:]
+        self.assertEqual(self.get(expires, tampered).status_code, 403)
+        # Alargar el vencimiento invalida la firma
+        self.assertEqual(self.get(expires + 3600, valid).status_code, 403)
+        self.assertEqual(self.get('nunca', valid).status_code, 403)
+        self.assertEqual(self.get(expires, '').status_code, 403)
+    
+        # La firma de un archivo no sirve para otro
+        other = Memory.objects.create(title='Otra', vault=self.vault, created_by=self.user)
+        other.audio.save('otra.mp3', ContentFile(b'otra'), save=True)
+        response = self.client.get(
+            f'/media/{other.audio.name}', {'expires': expires, 'signature': valid}
+        )
+        self.assertEqual(response.status_code, 403)
+    
+    def test_unsigned_requires_authentication(self):
+        self.assertEqual(self.client.get(self.path).status_code, 401)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.path).status_code, 200)
+
+
+def _png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue())
+
+
+class RenditionTests(MediaTestCase):
+    
+    def test_stale_job_keeps_renditions_of_shared_blob(self):
+        other = Memory.objects.create(title='Copia', vault=self.vault, created_by=self.user)
+        self.memory.photo.save('foto.png', _png('red'), save=True)
+        other.photo.save('foto.png', _png('red'), save=True)
+        self.assertEqual(self.memory.photo.name, other.photo.name)
+    
+        # La foto cambia mientras se generan las versiones
+        real_render = derivatives.render
+    
+        def render_then_replace(*args, **kwargs):
+            renditions = real_render(*args, **kwargs)
+            Memory.objects.filter(pk=self.memory.pk).update(photo='blobs/otra.png')
+            return renditions
+    
+        with mock.patch.object(derivatives, 'render', render_then_replace):
+            self.assertFalse(derivatives.generate('memories.Memory', self.memory.pk, 'photo'))
+    
+        path = f'{derivatives.derivative_dir(other.photo.name)}/thumb.webp'
+        self.assertTrue(default_storage.exists(path))
+    
+        # Sin nadie que use el original, las versiones sí se borran
+        renditions = {'source': other.photo.name, 'sizes': {'thumb': {'webp': path}}}
+        other.delete()
+        derivatives.release_renditions(renditions)
+        self.assertFalse(default_storage.exists(path))
@@ -0,0 +1,183 @@
+"""
+Subidas reanudables por fragmentos.
+
+Cada PUT trae un rango de bytes (Content-Range) que se copia del cuerpo de
+la petición al archivo temporal en bloques de CHUNK_SIZE, sin cargarlo en
+memoria. received solo avanza con un UPDATE condicionado al offset anterior,
+así dos PUT concurrentes del mismo rango no pueden confirmarse ambos. Si la
+conexión se corta a mitad, se confirma lo que llegó y el cliente reanuda
+desde ahí.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.accounts.access import accessible_vault_ids
+from .models import UploadSession, UploadStatus, UploadTarget
+from .storage import HashedFile
+
+CHUNK_SIZE = 64 * 1024
+
+# Destino -> (modelo, campo de archivo)
+TARGETS = {
+    UploadTarget.MEMORY_PHOTO: ('memories.Memory', 'photo'),
+    UploadTarget.MEMORY_AUDIO: ('memories.Memory', 'audio'),
+    UploadTarget.MEMORY_VIDEO: ('memories.Memory', 'video'),
+    UploadTarget.PHRASE_AUDIO: ('conversation.Phrase', 'audio_file'),
+}
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """
+    Error de una subida con el código HTTP que corresponde
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_target(request, target, target_id):
+    """
+    Objeto destino de la subida si el usuario tiene acceso a su cofre
+    """
+    label, _ = TARGETS[target]
+    model = apps.get_model(label)
+    return model.objects.filter(
+        pk=target_id, vault_id__in=accessible_vault_ids(request)
+    ).first()
+
+
+def create_session(user, **fields):
+    session = UploadSession.objects.create(
+        user=user,
+        expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_EXPIRATION_HOURS),
+        **fields
+    )
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    open(session.temp_path, 'wb').close()
+    return session
+
+
+def parse_content_range(header, total_size):
+    """
+    Devuelve (inicio, fin) de un Content-Range 'bytes inicio-fin/total'
+    """
+    match = _CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError('Content-Range inválido')
+    start, end, total = (int(value) for value in match.groups())
+    if total != total_size or start > end or end >= total:
+        raise UploadError('Content-Range fuera del tamaño declarado', 416)
+    return start, end
+
+
+def write_chunk(session, stream, start, end):
+    """
+    Escribe en disco el rango [start, end] leyendo el cuerpo por bloques
+    """
+    if session.status != UploadStatus.PENDING:
+        raise UploadError('La subida ya no admite fragmentos', 409)
+    if session.expires_at <= timezone.now():
+        raise UploadError('La subida ha caducado', 410)
+    if start != session.received:
+        raise UploadError('El fragmento no empieza en el offset actual', 409)
+    if stream is None:
+        raise UploadError('Fragmento vacío')
+
+    expected = end - start + 1
+    written = 0
+    with open(session.temp_path, 'r+b') as target:
+        target.seek(start)
+        while written < expected:
+            try:
+                block = stream.read(min(CHUNK_SIZE, expected - written))
+            except OSError:
+                break
+            if not block:
+                break
+            target.write(block)
+            written += len(block)
+        target.truncate(start + written)
+
+    if written and not UploadSession.objects.filter(
+        pk=session.pk, received=start, status=UploadStatus.PENDING
+    ).update(received=start + written, updated_at=timezone.now()):
+        raise UploadError('Otro fragmento se confirmó a la vez', 409)
+    session.received = start + written
+    if written < expected:
+        raise UploadError('Fragmento incompleto; reanudar desde el offset', 400)
+    return written
+
+
+def _checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize(request, session):
+    """
+    Verifica el archivo ensamblado y lo adjunta al destino
+    """
+    if session.status != UploadStatus.PENDING:
+        raise UploadError('La subida ya fue finalizada o cancelada', 409)
+    if not session.is_complete:
+        raise UploadError('Faltan bytes por subir', 409)
+    if _checksum(session.temp_path) != session.sha256:
+        raise UploadError('El checksum no coincide', 422)
+
+    target = get_target(request, session.target, session.target_id)
+    if target is None:
+        raise UploadError('Destino no encontrado', 404)
+
+    _, field_name = TARGETS[session.target]
+    with transaction.atomic():
+        if not UploadSession.objects.filter(
+            pk=session.pk, status=UploadStatus.PENDING
+        ).update(status=UploadStatus.COMPLETE, updated_at=timezone.now()):
+            raise UploadError('La subida ya fue finalizada o cancelada', 409)
+        with open(session.temp_path, 'rb') as assembled:
+            # Checksum ya verificado: el storage por contenido no vuelve a leer el archivo
+            assembled_file = HashedFile(assembled, session.sha256)
+            getattr(target, field_name).save(session.filename, assembled_file, save=True)
+    session.status = UploadStatus.COMPLETE
+    discard_file(session)
+    return target
+
+
+def discard_file(session):
+    try:
+        os.remove(session.temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def abort(session):
+    UploadSession.objects.filter(pk=session.pk).update(
+        status=UploadStatus.ABORTED, updated_at=timezone.now()
+    )
+    session.status = UploadStatus.ABORTED
+    discard_file(session)
+
+
+def clean_expired(now=None):
+    """
+    Borra las subidas caducadas y sus archivos temporales
+    """
+    now = now or timezone.now()
+    sessions = UploadSession.objects.filter(expires_at__lte=now)
+    total = 0
+    for session in sessions.iterator():
+        discard_file(session)
+        total += 1
+    sessions.delete()
+    return total
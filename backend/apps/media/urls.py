@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.upload_session_create, name='upload_session_create'),
+    path('<uuid:session_id>/', views.upload_session_detail, name='upload_session_detail'),
+    path('<uuid:session_id>/complete/', views.upload_session_complete, name='upload_session_complete'),
+    path('blobs/lookup/', views.blob_lookup, name='blob_lookup'),
+    path('blobs/attach/', views.blob_attach, name='blob_attach'),
+]
@@ -0,0 +1,210 @@
+import time
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from . import blobs, serving, signing, uploads
+from .models import UploadSession
+from .serializers import (
+    UploadSessionSerializer, UploadSessionCreateSerializer, BlobLookupSerializer,
+    BlobAttachSerializer
+)
+
+
+def _error(exc):
+    return Response({'error': str(exc)}, status=exc.status_code)
+
+
+def _session_response(session, status_code=status.HTTP_200_OK):
+    response = Response(UploadSessionSerializer(session).data, status=status_code)
+    response['Upload-Offset'] = str(session.received)
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_create(request):
+    """
+    Vista para iniciar una subida reanudable hacia un recuerdo o una frase
+    """
+    serializer = UploadSessionCreateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    data = serializer.validated_data
+    if uploads.get_target(request, data['target'], data['target_id']) is None:
+        return Response(
+            {'error': 'Destino no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    session = uploads.create_session(request.user, **data)
+    return _session_response(session, status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_detail(request, session_id):
+    """
+    Vista para consultar el offset (GET), subir un fragmento (PUT con
+    Content-Range) o cancelar (DELETE) una subida
+    """
+    try:
+        session = UploadSession.objects.get(id=session_id, user=request.user)
+    except UploadSession.DoesNotExist:
+        return Response(
+            {'error': 'Subida no encontrada'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if request.method == 'GET':
+        return _session_response(session)
+    
+    if request.method == 'DELETE':
+        uploads.abort(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    try:
+        start, end = uploads.parse_content_range(
+            request.META.get('HTTP_CONTENT_RANGE'), session.total_size
+        )
+        # Se lee el cuerpo como flujo; request.data lo cargaría entero en memoria
+        uploads.write_chunk(session, request.stream, start, end)
+    except uploads.UploadError as exc:
+        response = _error(exc)
+        response['Upload-Offset'] = str(session.received)
+        return response
+    
+    return _session_response(session)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_complete(request, session_id):
+    """
+    Vista para finalizar una subida: verifica el checksum y adjunta el archivo
+    """
+    try:
+        session = UploadSession.objects.get(id=session_id, user=request.user)
+    except UploadSession.DoesNotExist:
+        return Response(
+            {'error': 'Subida no encontrada'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        target = uploads.finalize(request, session)
+    except uploads.UploadError as exc:
+        return _error(exc)
+    
+    _, field_name = uploads.TARGETS[session.target]
+    file_field = getattr(target, field_name)
+    data = UploadSessionSerializer(session).data
+    data['file'] = request.build_absolute_uri(file_field.url)
+    return Response(data)
+
+
+@require_safe
+def serve_media(request, name):
+    """
+    Vista para descargar archivos de media.
+    
+    Con una URL firmada (las que devuelve la API) solo se validan la firma y
+    el vencimiento, sin autenticar ni consultar la base de datos; sin firma
+    se exige JWT y acceso al cofre.
+    """
+    if 'signature' not in request.GET:
+        return serve_media_authenticated(request, name)
+    
+    expires = request.GET.get('expires')
+    if not serving.is_safe_name(name) or not signing.verify(name, expires, request.GET['signature']):
+        return JsonResponse(
+            {'error': 'Enlace vencido o inválido'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    storage = serving.default_storage
+    if not storage.exists(name):
+        return JsonResponse(
+            {'error': 'Archivo no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # La URL cambia en cada ventana: los cachés compartidos pueden guardarla
+    # hasta que vence
+    max_age = max(0, min(int(expires) - int(time.time()), settings.MEDIA_CACHE_MAX_AGE))
+    return serving.serve(request, name, storage, cache_control=f'public, max-age={max_age}')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def serve_media_authenticated(request, name):
+    """
+    Vista para descargar archivos de media con control de acceso por cofre.
+    
+    Admite Range para reproducir audio y video con saltos sin descargar todo.
+    """
+    if not serving.is_safe_name(name) or not serving.can_access(request, name):
+        return Response(
+            {'error': 'Archivo no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    storage = serving.default_storage
+    if not storage.exists(name):
+        return Response(
+            {'error': 'Archivo no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return serving.serve(request, name, storage)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def blob_lookup(request):
+    """
+    Vista para saber qué contenidos (por sha256) ya están en los cofres del
+    usuario, para no volver a subirlos
+    """
+    serializer = BlobLookupSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    digests = serializer.validated_data['sha256']
+    found = blobs.accessible_blobs(request, digests)
+    return Response({'found': {digest: digest in found for digest in digests}})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def blob_attach(request):
+    """
+    Vista para adjuntar a un recuerdo o frase un contenido que ya está en el servidor
+    """
+    serializer = BlobAttachSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    data = serializer.validated_data
+    name = blobs.accessible_blobs(request, [data['sha256']]).get(data['sha256'])
+    if name is None:
+        return Response(
+            {'error': 'Contenido no encontrado; hay que subirlo'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    target = uploads.get_target(request, data['target'], data['target_id'])
+    if target is None:
+        return Response(
+            {'error': 'Destino no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    _, field_name = uploads.TARGETS[data['target']]
+    setattr(target, field_name, name)
+    target.save()
+    return Response({
+        'target': data['target'],
+        'target_id': target.pk,
+        'file': request.build_absolute_uri(getattr(target, field_name).url),
+    })
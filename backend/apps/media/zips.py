@@ -0,0 +1,32 @@
+"""
+Límites para los zips que suben los usuarios (importación de cofres e
+ingesta de fotos).
+
+Se comprueban los tamaños declarados en el directorio central antes de
+descomprimir nada. zipfile no entrega más bytes que el file_size declarado
+de cada entrada (y falla el CRC si el contenido no coincide), así que un zip
+bomba no puede escribir en disco más de lo que estos límites permiten.
+"""
+from django.conf import settings
+
+
+class ZipLimitError(ValueError):
+    """
+    Zip con demasiados archivos o demasiado grande descomprimido
+    """
+
+
+def check_limits(entries):
+    """
+    Lanza ZipLimitError si las entradas (ZipInfo) superan la cantidad, el
+    tamaño por archivo o el tamaño total descomprimido permitidos
+    """
+    total = 0
+    for count, entry in enumerate(entries, 1):
+        if count > settings.ZIP_MAX_ENTRIES:
+            raise ZipLimitError(f'El zip tiene más de {settings.ZIP_MAX_ENTRIES} archivos')
+        if entry.file_size > settings.ZIP_MAX_ENTRY_SIZE:
+            raise ZipLimitError(f'{entry.filename} supera el tamaño máximo por archivo')
+        total += entry.file_size
+        if total > settings.ZIP_MAX_TOTAL_SIZE:
+            raise ZipLimitError('El contenido del zip supera el tamaño máximo descomprimido')
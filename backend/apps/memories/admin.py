@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Memory, MemoryComment, MemoryLike, MemoryShare
+from .models import Memory, MemoryComment, MemoryLike, MemoryShare, MemoryRollup
 
 
 @admin.register(Memory)
@@ -36,3 +36,11 @@ class MemoryShareAdmin(admin.ModelAdmin):
     search_fields = ('memory__title', 'shared_by__name', 'shared_with__name')
     ordering = ('-created_at',)
     readonly_fields = ('id', 'created_at',)
+
+
+@admin.register(MemoryRollup)
+class MemoryRollupAdmin(admin.ModelAdmin):
+    list_display = ('vault', 'type', 'year', 'memories_count', 'likes_count', 'comments_count')
+    list_filter = ('type', 'year')
+    search_fields = ('vault__name',)
+    ordering = ('vault', '-year', 'type')
@@ -0,0 +1,195 @@
+"""
+Altas, cambios y bajas de recuerdos por lotes.
+
+bulk_create y bulk_update no disparan señales, así que aquí se mantienen a
+mano los agregados de estadísticas, el índice de texto completo, el índice
+de etiquetas y el hash perceptual de las fotos. Las bajas pasan por delete()
+y las señales se encargan.
+"""
+import uuid
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from . import duplicates
+from .models import Memory, MemoryTag
+from .search import index_memories
+from .serializers import MemoryBulkCreateSerializer, MemoryBulkUpdateSerializer
+from .stats import apply_rollup_delta, memory_bucket
+from .tags import sync_tags
+
+MAX_BATCH_SIZE = 200
+
+
+class BatchError(Exception):
+    """
+    Lote mal formado en su conjunto (no un error de un elemento concreto)
+    """
+
+
+def _bucket(memory):
+    return memory_bucket(memory.vault_id, memory.type, memory.date_taken)
+
+
+def _apply_rollup_deltas(deltas):
+    for bucket, (memories, likes, comments) in deltas.items():
+        apply_rollup_delta(bucket, memories=memories, likes=likes, comments=comments)
+
+
+def bulk_create_memories(memories):
+    """
+    Inserta los recuerdos y actualiza agregados, búsqueda y etiquetas
+    """
+    if not memories:
+        return []
+    for memory in memories:
+        if memory.photo and memory.photo_hash is None:
+            for field, value in duplicates.compute(memory).items():
+                setattr(memory, field, value)
+    with transaction.atomic():
+        memories = Memory.objects.bulk_create(memories)
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for memory in memories:
+            deltas[_bucket(memory)][0] += 1
+        _apply_rollup_deltas(deltas)
+        index_memories(memories)
+        sync_tags(MemoryTag, 'memory', memories)
+    return memories
+
+
+def bulk_update_memories(changes):
+    """
+    Guarda los cambios de (recuerdo, campos, bucket anterior) en una sola pasada
+    """
+    if not changes:
+        return []
+    now = timezone.now()
+    fields = {'updated_at'}
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for memory, changed_fields, previous_bucket in changes:
+        memory.updated_at = now
+        fields.update(changed_fields)
+        bucket = _bucket(memory)
+        if bucket != previous_bucket:
+            for key, sign in ((previous_bucket, -1), (bucket, 1)):
+                deltas[key][0] += sign
+                deltas[key][1] += sign * memory.likes_count
+                deltas[key][2] += sign * memory.comments_count
+
+    memories = [memory for memory, _, _ in changes]
+    with transaction.atomic():
+        Memory.objects.bulk_update(memories, sorted(fields))
+        _apply_rollup_deltas(deltas)
+        index_memories(memories)
+        sync_tags(MemoryTag, 'memory', memories)
+    return memories
+
+
+def _client_ids(items, results):
+    """
+    Empareja cada elemento con su client_id, que debe ser único en el lote
+    """
+    valid = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise BatchError('Cada elemento del lote debe ser un objeto')
+        client_id = item.get('client_id')
+        if client_id in (None, ''):
+            raise BatchError('Todos los elementos necesitan client_id')
+        client_id = str(client_id)
+        if client_id in results:
+            raise BatchError(f'client_id repetido: {client_id}')
+        results[client_id] = None
+        valid.append((client_id, item))
+    return valid
+
+
+def process_batch(request, payload, vault_ids):
+    """
+    Valida y aplica un lote {'create': [...], 'update': [...], 'delete': [...]}.
+
+    Devuelve (resultados por client_id, ids de recuerdos creados o modificados).
+    Los elementos inválidos se informan sin impedir que el resto se aplique.
+    """
+    if not isinstance(payload, dict):
+        raise BatchError('El lote debe ser un objeto con create, update y delete')
+    sections = {}
+    for section in ('create', 'update', 'delete'):
+        items = payload.get(section) or []
+        if not isinstance(items, list):
+            raise BatchError(f'{section} debe ser una lista')
+        sections[section] = items
+    if sum(len(items) for items in sections.values()) > MAX_BATCH_SIZE:
+        raise BatchError(f'El lote no puede tener más de {MAX_BATCH_SIZE} elementos')
+
+    results = {}
+    creates = _client_ids(sections['create'], results)
+    updates = _client_ids(sections['update'], results)
+    deletes = _client_ids(sections['delete'], results)
+
+    def fail(client_id, errors):
+        results[client_id] = {'status': 'error', 'errors': errors}
+
+    # Los recuerdos a modificar o borrar se cargan con una sola consulta
+    targets = {}
+    for client_id, item in updates + deletes:
+        try:
+            targets[client_id] = uuid.UUID(str(item.get('id')))
+        except ValueError:
+            fail(client_id, {'id': ['id inválido']})
+    existing = Memory.objects.filter(id__in=targets.values(), vault_id__in=vault_ids).in_bulk()
+
+    seen = set()
+    for client_id, memory_id in list(targets.items()):
+        if memory_id not in existing:
+            fail(client_id, {'id': ['Recuerdo no encontrado']})
+            del targets[client_id]
+        elif memory_id in seen:
+            fail(client_id, {'id': ['Recuerdo repetido en el lote']})
+            del targets[client_id]
+        else:
+            seen.add(memory_id)
+
+    context = {'request': request, 'vault_ids': vault_ids}
+    to_create = []
+    for client_id, item in creates:
+        serializer = MemoryBulkCreateSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            fail(client_id, serializer.errors)
+            continue
+        data = dict(serializer.validated_data)
+        memory = Memory(vault_id=data.pop('vault'), created_by=request.user, **data)
+        to_create.append((client_id, memory))
+
+    to_update = []
+    for client_id, item in updates:
+        if client_id not in targets:
+            continue
+        memory = existing[targets[client_id]]
+        serializer = MemoryBulkUpdateSerializer(memory, data=item, partial=True, context=context)
+        if not serializer.is_valid():
+            fail(client_id, serializer.errors)
+            continue
+        previous_bucket = _bucket(memory)
+        for field, value in serializer.validated_data.items():
+            setattr(memory, field, value)
+        to_update.append((client_id, (memory, serializer.validated_data.keys(), previous_bucket)))
+
+    to_delete = [
+        (client_id, existing[targets[client_id]]) for client_id, _ in deletes if client_id in targets
+    ]
+
+    with transaction.atomic():
+        bulk_create_memories([memory for _, memory in to_create])
+        bulk_update_memories([change for _, change in to_update])
+        if to_delete:
+            Memory.objects.filter(id__in=[memory.id for _, memory in to_delete]).delete()
+
+    for client_id, memory in to_create:
+        results[client_id] = {'status': 'created', 'id': memory.id}
+    for client_id, (memory, _, _) in to_update:
+        results[client_id] = {'status': 'updated', 'id': memory.id}
+    for client_id, memory in to_delete:
+        results[client_id] = {'status': 'deleted', 'id': memory.id}
+
+    written = [memory.id for _, memory in to_create] + [change[0].id for _, change in to_update]
+    return results, written
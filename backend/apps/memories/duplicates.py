@@ -0,0 +1,192 @@
+"""
+Detección de fotos casi duplicadas con hashes perceptuales.
+
+Cada foto se resume en un dHash de 64 bits: se reduce a 9x8 en escala de
+grises y cada bit indica si un píxel es más claro que su vecino de la
+derecha. La misma foto escaneada a otra resolución o recomprimida da un hash
+a pocos bits de distancia (Hamming).
+
+Para no comparar contra todo el cofre, el hash se parte en HASH_CHUNKS
+trozos de 16 bits guardados en columnas indexadas (multi-index hashing): si
+dos hashes están a distancia <= d, al menos un trozo está a distancia
+<= d // HASH_CHUNKS. Basta con buscar por índice los recuerdos con algún
+trozo en ese vecindario y calcular la distancia exacta solo sobre ellos.
+"""
+from collections import defaultdict
+from itertools import combinations
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+HASH_BITS = 64
+HASH_CHUNKS = 4
+CHUNK_BITS = HASH_BITS // HASH_CHUNKS
+CHUNK_FIELDS = [f'photo_hash_{index}' for index in range(HASH_CHUNKS)]
+
+# Con trozos de 16 bits, vecindarios de radio 2 (137 valores por trozo)
+MAX_DISTANCE = 3 * HASH_CHUNKS - 1
+
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def dhash(file):
+    """
+    dHash de 64 bits (entero sin signo) de la imagen file, o None si no se
+    puede leer
+    """
+    try:
+        with Image.open(file) as image:
+            # JPEG: decodifica directamente a escala reducida
+            image.draft('L', (64, 64))
+            image = ImageOps.exif_transpose(image).convert('L').resize(
+                (9, 8), Image.Resampling.LANCZOS
+            )
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+    pixels = np.asarray(image, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def to_signed(value):
+    # BigIntegerField es con signo
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def chunks(value):
+    value = to_unsigned(value)
+    return [(value >> (CHUNK_BITS * index)) & _CHUNK_MASK for index in range(HASH_CHUNKS)]
+
+
+def hash_fields(value):
+    """
+    Valores de photo_hash y sus trozos para asignar a un recuerdo
+    """
+    if value is None:
+        return dict({'photo_hash': None}, **{field: None for field in CHUNK_FIELDS})
+    return dict({'photo_hash': to_signed(value)}, **dict(zip(CHUNK_FIELDS, chunks(value))))
+
+
+def distance(first, second):
+    return (to_unsigned(first) ^ to_unsigned(second)).bit_count()
+
+
+def _flips(radius):
+    masks = []
+    for flipped in range(radius + 1):
+        for bits in combinations(range(CHUNK_BITS), flipped):
+            masks.append(sum(1 << bit for bit in bits))
+    return masks
+
+
+def neighborhood(chunk, radius):
+    """
+    Trozos a distancia <= radius de chunk
+    """
+    return [chunk ^ mask for mask in _flips(radius)]
+
+
+def clamp_distance(value):
+    return max(0, min(int(value), MAX_DISTANCE))
+
+
+def similar(queryset, value, max_distance=None, exclude=None):
+    """
+    [(recuerdo, distancia)] de queryset con el hash a distancia <= max_distance
+    de value, de más a menos parecido
+    """
+    max_distance = clamp_distance(
+        settings.MEMORY_DUPLICATE_DISTANCE if max_distance is None else max_distance
+    )
+    radius = max_distance // HASH_CHUNKS
+    condition = Q()
+    for field, chunk in zip(CHUNK_FIELDS, chunks(value)):
+        condition |= Q(**{f'{field}__in': neighborhood(chunk, radius)})
+    candidates = queryset.filter(condition)
+    if exclude is not None:
+        candidates = candidates.exclude(pk=exclude)
+
+    matches = []
+    for memory in candidates:
+        memory_distance = distance(value, memory.photo_hash)
+        if memory_distance <= max_distance:
+            matches.append((memory, memory_distance))
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+def duplicate_groups(hashes, max_distance=None):
+    """
+    Agrupa los pares (id, hash) que están a distancia <= max_distance
+    (directamente o encadenados). Devuelve listas de ids con dos o más
+    elementos.
+
+    Los trozos se indexan en memoria, así que cada hash solo se compara con
+    los que comparten algún trozo cercano.
+    """
+    max_distance = clamp_distance(
+        settings.MEMORY_DUPLICATE_DISTANCE if max_distance is None else max_distance
+    )
+    masks = _flips(max_distance // HASH_CHUNKS)
+    hashes = [(pk, to_unsigned(value)) for pk, value in hashes]
+    tables = [defaultdict(list) for _ in range(HASH_CHUNKS)]
+    for position, (_, value) in enumerate(hashes):
+        for table, chunk in zip(tables, chunks(value)):
+            table[chunk].append(position)
+
+    parents = list(range(len(hashes)))
+
+    def find(position):
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
+
+    for position, (_, value) in enumerate(hashes):
+        candidates = set()
+        for table, chunk in zip(tables, chunks(value)):
+            for mask in masks:
+                candidates.update(table.get(chunk ^ mask, ()))
+        for other in candidates:
+            if other > position and (value ^ hashes[other][1]).bit_count() <= max_distance:
+                parents[find(other)] = find(position)
+
+    groups = defaultdict(list)
+    for position, (pk, _) in enumerate(hashes):
+        groups[find(position)].append(pk)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def compute(memory):
+    """
+    Campos de hash para la foto actual del recuerdo; si otro recuerdo ya
+    tiene el mismo archivo (blob deduplicado) se reutiliza su hash
+    """
+    name = memory.photo.name if memory.photo else ''
+    if not name:
+        return hash_fields(None)
+    shared = type(memory).objects.filter(photo=name, photo_hash__isnull=False).exclude(
+        pk=memory.pk
+    ).values_list('photo_hash', flat=True).first()
+    if shared is not None:
+        return hash_fields(shared)
+    try:
+        with memory.photo.storage.open(name, 'rb') as source:
+            return hash_fields(dhash(source))
+    except OSError:
+        return hash_fields(None)
+
+
+def refresh(memory):
+    """
+    Recalcula y guarda el hash de la foto del recuerdo
+    """
+    fields = compute(memory)
+    type(memory).objects.filter(pk=memory.pk).update(**fields)
+    for field, value in fields.items():
+        setattr(memory, field, value)
@@ -0,0 +1,268 @@
+"""
+Ingesta masiva de fotos desde un zip o una carpeta.
+
+Cada foto se vuelca a disco (las entradas del zip se copian por bloques, sin
+cargarlas en memoria) y un pool de procesos calcula su sha256 y su hash
+perceptual y lee del EXIF la fecha de captura, la orientación y la posición
+GPS. Con eso se guardan en
+el almacenamiento direccionado por contenido (moviendo el archivo temporal,
+sin releerlo) y se crean los recuerdos con bulk_create_memories por lotes.
+Las versiones reducidas se generan después en segundo plano, ya giradas
+según la orientación.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from apps.media import blobs, derivatives, zips
+from apps.media.storage import HashedFile
+from . import duplicates
+from .bulk import MAX_BATCH_SIZE, bulk_create_memories
+from .models import Memory, MemoryType
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.tif', '.tiff', '.heic'}
+
+_COPY_BLOCK_SIZE = 64 * 1024
+
+# Etiquetas EXIF
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_DATETIME = 306
+_ORIENTATION = 274
+_DATETIME_ORIGINAL = 36867
+_OFFSET_TIME_ORIGINAL = 36881
+_EXIF_DATE_FORMAT = '%Y:%m:%d %H:%M:%S'
+
+
+class IngestError(Exception):
+    """
+    Origen que no se puede ingerir (no es un zip ni una carpeta)
+    """
+
+
+def _is_image(name):
+    base = os.path.basename(name)
+    return not base.startswith('.') and os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS
+
+
+def _parse_offset(value):
+    # '+02:00' / '-03:00'
+    try:
+        sign = -1 if value[0] == '-' else 1
+        hours, minutes = value.strip()[1:].split(':')
+        return dt_timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+    except (ValueError, IndexError):
+        return None
+
+
+def _parse_datetime(value, offset=None):
+    if isinstance(value, bytes):
+        value = value.decode('ascii', 'ignore')
+    try:
+        taken = datetime.strptime(str(value).strip('\x00 '), _EXIF_DATE_FORMAT)
+    except ValueError:
+        return None
+    tz = _parse_offset(offset) if offset else None
+    if tz is not None:
+        return taken.replace(tzinfo=tz)
+    return taken
+
+
+def _degrees(value, ref):
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60 + seconds / 3600
+    if isinstance(ref, bytes):
+        ref = ref.decode('ascii', 'ignore')
+    return -result if ref in ('S', 'W') else result
+
+
+def extract_exif(path):
+    """
+    sha256, dHash y metadatos de la foto en path: {'sha256', 'dhash',
+    'date_taken', 'orientation', 'latitude', 'longitude'} o {'error'} si no
+    es una imagen.
+
+    Se ejecuta en los procesos del pool: solo recibe y devuelve valores
+    serializables y no toca la base de datos.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(_COPY_BLOCK_SIZE), b''):
+            digest.update(block)
+    info = {'sha256': digest.hexdigest(), 'date_taken': None, 'orientation': 1,
+            'latitude': None, 'longitude': None}
+
+    try:
+        with Image.open(path) as image:
+            exif = image.getexif()
+    except (UnidentifiedImageError, OSError):
+        return {'error': 'No es una imagen válida'}
+
+    details = exif.get_ifd(_EXIF_IFD)
+    info['date_taken'] = (
+        _parse_datetime(details[_DATETIME_ORIGINAL], details.get(_OFFSET_TIME_ORIGINAL))
+        if _DATETIME_ORIGINAL in details else
+        _parse_datetime(exif[_DATETIME]) if _DATETIME in exif else None
+    )
+    try:
+        info['orientation'] = int(exif.get(_ORIENTATION, 1))
+    except (TypeError, ValueError):
+        pass
+
+    gps = exif.get_ifd(_GPS_IFD)
+    if 2 in gps and 4 in gps:
+        latitude = _degrees(gps[2], gps.get(1))
+        longitude = _degrees(gps[4], gps.get(3))
+        if latitude is not None and longitude is not None:
+            info['latitude'], info['longitude'] = round(latitude, 6), round(longitude, 6)
+    info['dhash'] = duplicates.dhash(path)
+    return info
+
+
+def check_archive(archive):
+    """
+    Lanza IngestError si las imágenes del zip superan los límites de tamaño
+    """
+    try:
+        zips.check_limits(entry for entry in archive.infolist()
+                          if not entry.is_dir() and _is_image(entry.filename))
+    except zips.ZipLimitError as exc:
+        raise IngestError(str(exc))
+
+
+def _zip_entries(archive, spool_dir):
+    """
+    (nombre, ruta temporal) de cada imagen del zip, copiada por bloques
+    """
+    for entry in archive.infolist():
+        if entry.is_dir() or not _is_image(entry.filename):
+            continue
+        handle, path = tempfile.mkstemp(dir=spool_dir, suffix=os.path.splitext(entry.filename)[1])
+        with os.fdopen(handle, 'wb') as target, archive.open(entry) as source:
+            shutil.copyfileobj(source, target, _COPY_BLOCK_SIZE)
+        yield entry.filename, path
+
+
+def _folder_entries(folder):
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for filename in sorted(files):
+            if _is_image(filename):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, folder), path
+
+
+def _batches(entries, size):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _title(name):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem.replace('_', ' ').strip()[:200] or 'Foto'
+
+
+def _build(name, path, info, vault, user, tags, description, temporary):
+    date_taken = info['date_taken']
+    if date_taken is not None and timezone.is_naive(date_taken):
+        date_taken = timezone.make_aware(date_taken)
+    location = ''
+    if info['latitude'] is not None:
+        location = f"{info['latitude']}, {info['longitude']}"
+
+    memory = Memory(
+        title=_title(name), description=description, type=MemoryType.PHOTO,
+        date_taken=date_taken, location=location, tags=list(tags),
+        vault=vault, created_by=user, **duplicates.hash_fields(info['dhash']),
+    )
+    field = Memory._meta.get_field('photo')
+    upload_name = field.generate_filename(memory, os.path.basename(name))
+    if temporary:
+        # Hash ya calculado en el pool: el storage mueve el temporal
+        with open(path, 'rb') as source:
+            memory.photo = field.storage.save(upload_name, HashedFile(source, info['sha256']))
+    else:
+        # Los originales de la carpeta no se tocan: el storage copia
+        with open(path, 'rb') as source:
+            memory.photo = field.storage.save(upload_name, File(source))
+    return memory
+
+
+def ingest_photos(source, vault, user, tags=(), description='', workers=None,
+                  batch_size=MAX_BATCH_SIZE):
+    """
+    Crea un recuerdo de tipo foto por cada imagen de source (ruta de un zip o
+    de una carpeta) en vault. Devuelve el resultado de cada archivo:
+    [{'name', 'id', 'date_taken', 'location', 'orientation'} | {'name', 'error'}].
+    """
+    workers = workers or settings.PHOTO_INGEST_WORKERS
+    os.makedirs(settings.PHOTO_INGEST_DIR, exist_ok=True)
+    results = []
+
+    with tempfile.TemporaryDirectory(dir=settings.PHOTO_INGEST_DIR) as spool_dir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        if os.path.isdir(source):
+            archive = None
+            entries = _folder_entries(source)
+        else:
+            try:
+                archive = zipfile.ZipFile(source)
+            except (zipfile.BadZipFile, OSError):
+                raise IngestError('El archivo no es un zip válido')
+            entries = _zip_entries(archive, spool_dir)
+        temporary = archive is not None
+
+        try:
+            if archive is not None:
+                check_archive(archive)
+            for batch in _batches(entries, batch_size):
+                infos = pool.map(extract_exif, [path for _, path in batch])
+                memories = []
+                for (name, path), info in zip(batch, infos):
+                    if 'error' in info:
+                        results.append({'name': name, 'error': info['error']})
+                        continue
+                    memory = _build(name, path, info, vault, user, tags, description, temporary)
+                    memories.append(memory)
+                    results.append({
+                        'name': name, 'memory': memory, 'orientation': info['orientation'],
+                    })
+
+                # bulk_create no dispara señales: referencias de blobs y
+                # versiones reducidas se registran aquí
+                bulk_create_memories(memories)
+                blobs.retain(memory.photo.name for memory in memories)
+                for memory in memories:
+                    derivatives.schedule(memory, 'photo')
+                # Temporales que no se movieron (imágenes inválidas)
+                for path in (path for _, path in batch if temporary and os.path.exists(path)):
+                    os.remove(path)
+        finally:
+            if archive is not None:
+                archive.close()
+
+    for result in results:
+        memory = result.pop('memory', None)
+        if memory is not None:
+            result.update({
+                'id': str(memory.id),
+                'date_taken': memory.date_taken.isoformat() if memory.date_taken else None,
+                'location': memory.location,
+            })
+    return results
@@ -0,0 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apps.memories.duplicates import dhash, hash_fields
+from apps.memories.models import Memory
+
+
+def _hash(path):
+    return dhash(path) if os.path.exists(path) else None
+
+
+class Command(BaseCommand):
+    help = 'Calcula el hash perceptual de las fotos de recuerdos que aún no lo tienen'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Procesos en paralelo')
+        parser.add_argument('--force', action='store_true', help='Recalcular aunque ya exista')
+        parser.add_argument('--vault', help='Limitar a un cofre')
+    
+    def handle(self, *args, **options):
+        memories = Memory.objects.exclude(photo='').exclude(photo__isnull=True)
+        if options['vault']:
+            memories = memories.filter(vault_id=options['vault'])
+        if not options['force']:
+            memories = memories.filter(photo_hash__isnull=True)
+        
+        # Un blob compartido por varios recuerdos se lee una sola vez
+        names = sorted(set(memories.values_list('photo', flat=True)))
+        if not names:
+            self.stdout.write(self.style.SUCCESS('No hay fotos pendientes'))
+            return
+        
+        storage = Memory._meta.get_field('photo').storage
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            hashes = dict(zip(names, pool.map(_hash, [storage.path(name) for name in names], chunksize=32)))
+        
+        updated = failed = 0
+        for name, value in hashes.items():
+            if value is None:
+                failed += 1
+                self.stderr.write(f'{name}: no se pudo leer la imagen')
+                continue
+            updated += memories.filter(photo=name).update(**hash_fields(value))
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} recuerdos actualizados, {failed} fotos con errores'
+        ))
@@ -0,0 +1,40 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounts.models import User, Vault
+from apps.memories.ingest import IngestError, ingest_photos
+
+
+class Command(BaseCommand):
+    help = 'Crea un recuerdo de tipo foto por cada imagen de un zip o una carpeta'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Ruta del zip o de la carpeta')
+        parser.add_argument('--vault', required=True, help='Id del cofre')
+        parser.add_argument('--user', required=True, help='Email del autor de los recuerdos')
+        parser.add_argument('--tags', default='', help='Etiquetas separadas por comas')
+        parser.add_argument('--description', default='', help='Descripción de todos los recuerdos')
+        parser.add_argument('--workers', type=int, help='Procesos que leen el EXIF')
+    
+    def handle(self, *args, **options):
+        try:
+            vault = Vault.objects.get(pk=options['vault'])
+            user = User.objects.get(email=options['user'])
+        except (Vault.DoesNotExist, User.DoesNotExist, ValidationError):
+            raise CommandError('Cofre o usuario no encontrado')
+        
+        tags = [tag.strip() for tag in options['tags'].split(',') if tag.strip()]
+        try:
+            results = ingest_photos(
+                options['source'], vault, user, tags=tags,
+                description=options['description'], workers=options['workers'],
+            )
+        except IngestError as exc:
+            raise CommandError(str(exc))
+        
+        for result in results:
+            if 'error' in result:
+                self.stderr.write(f"{result['name']}: {result['error']}")
+        created = sum(1 for result in results if 'id' in result)
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} recuerdos creados, {len(results) - created} archivos omitidos'
+        ))
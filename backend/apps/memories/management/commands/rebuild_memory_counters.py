@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from apps.jobs.queue import enqueue
+from apps.memories.models import Memory
+from apps.memories.stats import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de likes/comentarios y los agregados de estadísticas'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--vault', help='Limitar el recálculo a un cofre')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Encolar el recálculo para el worker de run_jobs en lugar de hacerlo ahora'
+        )
+    
+    def handle(self, *args, **options):
+        if options['background']:
+            job = enqueue(
+                'memories.rebuild_counters', {'vault_id': options['vault']},
+                dedupe_key=f"memories.rebuild_counters:{options['vault'] or '*'}",
+            )
+            self.stdout.write(self.style.SUCCESS(f'Recálculo encolado: trabajo {job.id}'))
+            return
+        
+        memories = Memory.objects.all()
+        if options['vault']:
+            memories = memories.filter(vault_id=options['vault'])
+        
+        updated = memories.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados en {updated} recuerdos'))
+        
+        rebuild_rollups([options['vault']] if options['vault'] else None)
+        self.stdout.write(self.style.SUCCESS('Agregados de estadísticas reconstruidos'))
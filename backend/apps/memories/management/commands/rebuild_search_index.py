@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from apps.memories.search import is_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice de texto completo de los recuerdos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--vault', help='Limitar la regeneración a un cofre')
+    
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write(self.style.WARNING('El motor de base de datos no tiene índice de texto completo'))
+            return
+        
+        vault_ids = [options['vault']] if options['vault'] else None
+        total = rebuild_index(vault_ids)
+        self.stdout.write(self.style.SUCCESS(f'{total} recuerdos indexados'))
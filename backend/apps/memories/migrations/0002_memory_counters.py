@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Memory = apps.get_model('memories', 'Memory')
+    MemoryLike = apps.get_model('memories', 'MemoryLike')
+    MemoryComment = apps.get_model('memories', 'MemoryComment')
+    
+    likes = MemoryLike.objects.filter(memory=OuterRef('pk')).values('memory').annotate(
+        total=Count('id')
+    ).values('total')
+    comments = MemoryComment.objects.filter(memory=OuterRef('pk')).values('memory').annotate(
+        total=Count('id')
+    ).values('total')
+    Memory.objects.update(
+        likes_count=Coalesce(Subquery(likes), 0),
+        comments_count=Coalesce(Subquery(comments), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memory',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='memory',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
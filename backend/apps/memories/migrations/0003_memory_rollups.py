@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, ExtractYear
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    Memory = apps.get_model('memories', 'Memory')
+    MemoryRollup = apps.get_model('memories', 'MemoryRollup')
+    
+    rows = Memory.objects.order_by().values('vault_id', 'type').annotate(
+        year=Coalesce(ExtractYear('date_taken'), 0),
+    ).values('vault_id', 'type', 'year').annotate(
+        memories=Count('id'),
+        likes=Sum('likes_count'),
+        comments=Sum('comments_count'),
+    )
+    MemoryRollup.objects.bulk_create([
+        MemoryRollup(
+            vault_id=row['vault_id'],
+            type=row['type'],
+            year=row['year'],
+            memories_count=row['memories'],
+            likes_count=row['likes'] or 0,
+            comments_count=row['comments'] or 0,
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_vault_id'),
+        ('memories', '0002_memory_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('photo', 'Foto'), ('audio', 'Audio'), ('video', 'Video'), ('recipe', 'Receta'), ('note', 'Nota'), ('story', 'Historia')], max_length=20)),
+                ('year', models.PositiveSmallIntegerField(default=0)),
+                ('memories_count', models.IntegerField(default=0)),
+                ('likes_count', models.IntegerField(default=0)),
+                ('comments_count', models.IntegerField(default=0)),
+                ('vault', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memory_rollups', to='accounts.vault')),
+            ],
+            options={
+                'verbose_name': 'Agregado de Recuerdos',
+                'verbose_name_plural': 'Agregados de Recuerdos',
+                'db_table': 'memory_rollups',
+                'unique_together': {('vault', 'type', 'year')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5("
+            "memory_id UNINDEXED, vault_id UNINDEXED, title, description, tags, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE IF NOT EXISTS memory_search ('
+            'memory_id uuid PRIMARY KEY REFERENCES memories (id) ON DELETE CASCADE, '
+            'vault_id uuid NOT NULL, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS memory_search_document_idx '
+            'ON memory_search USING GIN (document)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS memory_search_vault_idx ON memory_search (vault_id)'
+        )
+    else:
+        return
+    
+    # Indexar los recuerdos existentes
+    from apps.memories.search import index_memories
+    Memory = apps.get_model('memories', 'Memory')
+    memories = Memory.objects.only('id', 'vault_id', 'title', 'description', 'tags').order_by()
+    batch = []
+    for memory in memories.iterator(chunk_size=500):
+        batch.append(memory)
+        if len(batch) >= 500:
+            index_memories(batch)
+            batch = []
+    index_memories(batch)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS memories_fts')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS memory_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0003_memory_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
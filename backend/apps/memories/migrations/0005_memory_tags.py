@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_tags(apps, schema_editor):
+    Memory = apps.get_model('memories', 'Memory')
+    MemoryTag = apps.get_model('memories', 'MemoryTag')
+    
+    rows = []
+    for memory_id, vault_id, tags in Memory.objects.values_list('id', 'vault_id', 'tags').iterator():
+        seen = set()
+        for tag in tags if isinstance(tags, list) else []:
+            tag = str(tag).strip().lower()[:100]
+            if tag and tag not in seen:
+                seen.add(tag)
+                rows.append(MemoryTag(memory_id=memory_id, vault_id=vault_id, tag=tag))
+    MemoryTag.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_vault_id'),
+        ('memories', '0004_memory_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100)),
+                ('memory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_index', to='memories.memory')),
+                ('vault', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memory_tags', to='accounts.vault')),
+            ],
+            options={
+                'verbose_name': 'Etiqueta de Recuerdo',
+                'verbose_name_plural': 'Etiquetas de Recuerdos',
+                'db_table': 'memory_tags',
+                'indexes': [models.Index(fields=['vault', 'tag'], name='memory_tags_vault_tag_idx')],
+                'unique_together': {('memory', 'tag')},
+            },
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+def create_timeline_nulls_last_index(apps, schema_editor):
+    # La línea de tiempo ordena con NULLS LAST; en PostgreSQL un índice DESC
+    # deja los nulos primero, así que se necesita uno propio. SQLite ya
+    # ordena los nulos al final en DESC y usa memories_vault_timeline_idx.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS memories_vault_timeline_nl_idx ON memories '
+        '(vault_id, date_taken DESC NULLS LAST, created_at DESC, id DESC)'
+    )
+
+
+def drop_timeline_nulls_last_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS memories_vault_timeline_nl_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0005_memory_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', '-date_taken', '-created_at', '-id'], name='memories_vault_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', 'type'], name='memories_vault_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memorycomment',
+            index=models.Index(fields=['memory', '-created_at'], name='memory_comments_recent_idx'),
+        ),
+        migrations.RunPython(create_timeline_nulls_last_index, drop_timeline_nulls_last_index),
+    ]
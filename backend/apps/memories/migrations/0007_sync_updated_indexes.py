@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', 'updated_at'], name='memories_vault_updated_idx'),
+        ),
+    ]
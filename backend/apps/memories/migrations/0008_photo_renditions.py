@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0007_sync_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memory',
+            name='photo_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:58
+
+import apps.media.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0008_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='memory',
+            name='audio',
+            field=models.FileField(blank=True, null=True, storage=apps.media.storage.content_addressed_storage, upload_to='memories/audio/'),
+        ),
+        migrations.AlterField(
+            model_name='memory',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=apps.media.storage.content_addressed_storage, upload_to='memories/photos/'),
+        ),
+        migrations.AlterField(
+            model_name='memory',
+            name='video',
+            field=models.FileField(blank=True, null=True, storage=apps.media.storage.content_addressed_storage, upload_to='memories/videos/'),
+        ),
+    ]
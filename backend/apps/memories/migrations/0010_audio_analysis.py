@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0009_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memory',
+            name='audio_analysis',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0010_audio_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memory',
+            name='photo_hash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='memory',
+            name='photo_hash_0',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='memory',
+            name='photo_hash_1',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='memory',
+            name='photo_hash_2',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='memory',
+            name='photo_hash_3',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', 'photo_hash_0'], name='memories_photo_hash_0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', 'photo_hash_1'], name='memories_photo_hash_1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', 'photo_hash_2'], name='memories_photo_hash_2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', 'photo_hash_3'], name='memories_photo_hash_3_idx'),
+        ),
+    ]
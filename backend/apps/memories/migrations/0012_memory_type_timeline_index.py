@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memories', '0011_photo_hashes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='memory',
+            name='memories_vault_type_idx',
+        ),
+        migrations.AddIndex(
+            model_name='memory',
+            index=models.Index(fields=['vault', 'type', '-date_taken', '-created_at', '-id'], name='memories_vault_type_time_idx'),
+        ),
+    ]
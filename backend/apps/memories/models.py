@@ -1,7 +1,10 @@
 import uuid
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from apps.accounts.models import Vault
+from apps.media.storage import content_addressed_storage
 
 User = get_user_model()
 
@@ -15,6 +18,37 @@ class MemoryType(models.TextChoices):
     STORY = 'story', 'Historia'
 
 
+class MemoryQuerySet(models.QuerySet):
+    def with_user_state(self, user):
+        """
+        Precarga vault/autor y anota is_liked para el usuario.
+        
+        El cofre va en una consulta aparte (prefetch): con el join, SQLite
+        elige recorrer vaults primero y ya no puede ordenar por
+        memories_vault_timeline_idx.
+        """
+        return self.select_related('created_by').prefetch_related('vault').annotate(
+            is_liked=Exists(
+                MemoryLike.objects.filter(memory=OuterRef('pk'), user=user)
+            )
+        )
+    
+    def rebuild_counters(self):
+        """
+        Recalcula likes_count y comments_count desde las tablas de likes y comentarios
+        """
+        likes = MemoryLike.objects.filter(memory=OuterRef('pk')).values('memory').annotate(
+            total=Count('id')
+        ).values('total')
+        comments = MemoryComment.objects.filter(memory=OuterRef('pk')).values('memory').annotate(
+            total=Count('id')
+        ).values('total')
+        return self.update(
+            likes_count=Coalesce(Subquery(likes), 0),
+            comments_count=Coalesce(Subquery(comments), 0),
+        )
+
+
 class Memory(models.Model):
     """
     Modelo para recuerdos familiares
@@ -25,15 +59,33 @@ class Memory(models.Model):
     type = models.CharField(max_length=20, choices=MemoryType.choices, default=MemoryType.PHOTO)
     
     # Archivos multimedia
-    photo = models.ImageField(upload_to='memories/photos/', null=True, blank=True)
-    audio = models.FileField(upload_to='memories/audio/', null=True, blank=True)
-    video = models.FileField(upload_to='memories/videos/', null=True, blank=True)
+    photo = models.ImageField(
+        upload_to='memories/photos/', storage=content_addressed_storage, null=True, blank=True
+    )
+    photo_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    # dHash de la foto y sus trozos de 16 bits indexados (ver duplicates.py)
+    photo_hash = models.BigIntegerField(null=True, blank=True, editable=False)
+    photo_hash_0 = models.IntegerField(null=True, blank=True, editable=False)
+    photo_hash_1 = models.IntegerField(null=True, blank=True, editable=False)
+    photo_hash_2 = models.IntegerField(null=True, blank=True, editable=False)
+    photo_hash_3 = models.IntegerField(null=True, blank=True, editable=False)
+    audio = models.FileField(
+        upload_to='memories/audio/', storage=content_addressed_storage, null=True, blank=True
+    )
+    audio_analysis = models.JSONField(default=dict, blank=True, editable=False)
+    video = models.FileField(
+        upload_to='memories/videos/', storage=content_addressed_storage, null=True, blank=True
+    )
     
     # Metadatos
     date_taken = models.DateTimeField(null=True, blank=True)
     location = models.CharField(max_length=200, blank=True)
     tags = models.JSONField(default=list, blank=True)
     
+    # Contadores desnormalizados (mantenidos por las vistas de likes y comentarios)
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    
     # Relaciones
     vault = models.ForeignKey(Vault, on_delete=models.CASCADE, related_name='memories')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_memories')
@@ -42,11 +94,28 @@ class Memory(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MemoryQuerySet.as_manager()
+    
     class Meta:
         db_table = 'memories'
         verbose_name = 'Recuerdo'
         verbose_name_plural = 'Recuerdos'
         ordering = ['-date_taken', '-created_at']
+        indexes = [
+            models.Index(
+                fields=['vault', '-date_taken', '-created_at', '-id'],
+                name='memories_vault_timeline_idx',
+            ),
+            models.Index(
+                fields=['vault', 'type', '-date_taken', '-created_at', '-id'],
+                name='memories_vault_type_time_idx',
+            ),
+            models.Index(fields=['vault', 'updated_at'], name='memories_vault_updated_idx'),
+            models.Index(fields=['vault', 'photo_hash_0'], name='memories_photo_hash_0_idx'),
+            models.Index(fields=['vault', 'photo_hash_1'], name='memories_photo_hash_1_idx'),
+            models.Index(fields=['vault', 'photo_hash_2'], name='memories_photo_hash_2_idx'),
+            models.Index(fields=['vault', 'photo_hash_3'], name='memories_photo_hash_3_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.vault.name}"
@@ -68,6 +137,9 @@ class MemoryComment(models.Model):
         verbose_name = 'Comentario'
         verbose_name_plural = 'Comentarios'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['memory', '-created_at'], name='memory_comments_recent_idx'),
+        ]
     
     def __str__(self):
         return f"Comentario de {self.user.name} en {self.memory.title}"
@@ -111,3 +183,46 @@ class MemoryShare(models.Model):
     
     def __str__(self):
         return f"{self.memory.title} compartido por {self.shared_by.name} con {self.shared_with.name}"
+
+
+class MemoryRollup(models.Model):
+    """
+    Modelo de agregados incrementales de recuerdos por cofre, tipo y año
+    """
+    vault = models.ForeignKey(Vault, on_delete=models.CASCADE, related_name='memory_rollups')
+    type = models.CharField(max_length=20, choices=MemoryType.choices)
+    year = models.PositiveSmallIntegerField(default=0)  # 0 = sin fecha
+    
+    memories_count = models.IntegerField(default=0)
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'memory_rollups'
+        unique_together = ['vault', 'type', 'year']
+        verbose_name = 'Agregado de Recuerdos'
+        verbose_name_plural = 'Agregados de Recuerdos'
+    
+    def __str__(self):
+        return f"{self.vault_id} {self.type} {self.year}: {self.memories_count}"
+
+
+class MemoryTag(models.Model):
+    """
+    Índice normalizado de las etiquetas de cada recuerdo (espejo de Memory.tags)
+    """
+    memory = models.ForeignKey(Memory, on_delete=models.CASCADE, related_name='tag_index')
+    vault = models.ForeignKey(Vault, on_delete=models.CASCADE, related_name='memory_tags')
+    tag = models.CharField(max_length=100)
+    
+    class Meta:
+        db_table = 'memory_tags'
+        unique_together = ['memory', 'tag']
+        indexes = [
+            models.Index(fields=['vault', 'tag'], name='memory_tags_vault_tag_idx'),
+        ]
+        verbose_name = 'Etiqueta de Recuerdo'
+        verbose_name_plural = 'Etiquetas de Recuerdos'
+    
+    def __str__(self):
+        return f"{self.tag} ({self.memory_id})"
@@ -0,0 +1,123 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from apps.accounts.access import merge_vaults
+
+
+def encode_cursor(payload):
+    """
+    Codifica un cursor opaco (JSON en base64 url-safe)
+    """
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(encoded):
+    """
+    Decodifica un cursor generado por encode_cursor; lanza ValueError si es inválido
+    """
+    raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+    return json.loads(raw)
+
+
+class TimelineCursorPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre (date_taken, created_at, id).
+
+    El cursor es opaco para el cliente y no depende de offsets, así que las
+    páginas siguen siendo estables aunque se creen recuerdos nuevos.
+    Los recuerdos sin fecha van al final de la línea de tiempo. Con
+    vault_ids cada cofre se lee por separado y se mezcla (ver merge_vaults).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Cursor inválido'
+
+    ordering = (
+        F('date_taken').desc(nulls_last=True),
+        F('created_at').desc(),
+        F('id').desc(),
+    )
+
+    def paginate_queryset(self, queryset, request, view=None, vault_ids=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.after_cursor(*cursor))
+        if vault_ids is not None:
+            queryset = merge_vaults(queryset, vault_ids)
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = self.encode_cursor(last.date_taken, last.created_at, last.id)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.base_url, self.cursor_query_param)
+
+    @staticmethod
+    def after_cursor(date_taken, created_at, pk):
+        """
+        Condición para las filas posteriores al cursor en orden descendente
+        """
+        same_date_after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        if date_taken is None:
+            return Q(date_taken__isnull=True) & same_date_after
+        return (
+            Q(date_taken__lt=date_taken)
+            | (Q(date_taken=date_taken) & same_date_after)
+            | Q(date_taken__isnull=True)
+        )
+
+    def encode_cursor(self, date_taken, created_at, pk):
+        return encode_cursor([
+            date_taken.isoformat() if date_taken else None,
+            created_at.isoformat(),
+            str(pk),
+        ])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            date_taken, created_at, pk = decode_cursor(encoded)
+            return (
+                datetime.fromisoformat(date_taken) if date_taken else None,
+                datetime.fromisoformat(created_at),
+                uuid.UUID(pk),
+            )
+        except (TypeError, ValueError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
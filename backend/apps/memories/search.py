@@ -0,0 +1,317 @@
+"""
+Índice de texto completo de recuerdos.
+
+En SQLite se usa una tabla virtual FTS5 (memories_fts) y en PostgreSQL una
+tabla con tsvector e índice GIN (memory_search). El índice se mantiene desde
+signals.py y las operaciones masivas, y se puede regenerar con el comando
+rebuild_search_index. Con otros motores se recurre a icontains.
+"""
+import re
+import unicodedata
+import uuid
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from rest_framework import filters
+
+SQLITE_TABLE = 'memories_fts'
+POSTGRES_TABLE = 'memory_search'
+
+# Pesos de relevancia por campo: título, descripción, etiquetas
+SQLITE_WEIGHTS = (10.0, 4.0, 6.0)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_SUFFIXES = (
+    'amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'uciones',
+    'idades', 'acion', 'ucion', 'mente', 'idad', 'ismos', 'istas', 'ables',
+    'ibles', 'ismo', 'ista', 'able', 'ible', 'ados', 'idos', 'adas', 'idas',
+    'ando', 'iendo', 'ado', 'ido', 'ada', 'ida', 'ar', 'er', 'ir',
+    'es', 'os', 'as', 's', 'a', 'o', 'e',
+)
+_MIN_STEM = 3
+
+
+def fold(text):
+    """
+    Pasa a minúsculas y elimina tildes y diéresis
+    """
+    normalized = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in normalized if not unicodedata.combining(char)).lower()
+
+
+def stem(word):
+    """
+    Stemmer ligero para español: recorta sufijos flexivos frecuentes
+    """
+    word = fold(word)
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def query_stems(query):
+    """
+    Devuelve las raíces de los términos de una búsqueda, sin repetir
+    """
+    stems = []
+    for word in _WORD_RE.findall(fold(query)):
+        word_stem = stem(word)
+        if word_stem not in stems:
+            stems.append(word_stem)
+    return stems
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _tags_text(tags):
+    return ' '.join(str(tag) for tag in tags) if isinstance(tags, (list, tuple)) else ''
+
+
+def _as_uuid(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def _sqlite_rowid(memory_id):
+    # rowid estable derivado del UUID para borrar/actualizar sin recorrer la tabla
+    return _as_uuid(memory_id).int >> 65
+
+
+def _sqlite_match(stems):
+    return ' AND '.join(f'"{word_stem}"*' for word_stem in stems)
+
+
+def _postgres_tsquery(stems):
+    return ' & '.join(f'{word_stem}:*' for word_stem in stems)
+
+
+def index_memories(memories):
+    """
+    Inserta o actualiza recuerdos en el índice
+    """
+    memories = list(memories)
+    if not memories or not is_supported():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s',
+                [(_sqlite_rowid(memory.pk),) for memory in memories],
+            )
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_TABLE} '
+                '(rowid, memory_id, vault_id, title, description, tags) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [
+                    (
+                        _sqlite_rowid(memory.pk), _as_uuid(memory.pk).hex,
+                        _as_uuid(memory.vault_id).hex,
+                        memory.title, memory.description, _tags_text(memory.tags),
+                    )
+                    for memory in memories
+                ],
+            )
+        else:
+            cursor.executemany(
+                f'INSERT INTO {POSTGRES_TABLE} (memory_id, vault_id, document) '
+                "VALUES (%s::uuid, %s::uuid, setweight(to_tsvector('spanish', %s), 'A') || "
+                "setweight(to_tsvector('spanish', %s), 'B') || "
+                "setweight(to_tsvector('spanish', %s), 'C')) "
+                'ON CONFLICT (memory_id) DO UPDATE SET '
+                'vault_id = EXCLUDED.vault_id, document = EXCLUDED.document',
+                [
+                    (
+                        str(memory.pk), str(memory.vault_id), fold(memory.title),
+                        fold(memory.description), fold(_tags_text(memory.tags)),
+                    )
+                    for memory in memories
+                ],
+            )
+
+
+def index_memory(memory):
+    index_memories([memory])
+
+
+def remove_memories(memory_ids):
+    """
+    Elimina recuerdos del índice
+    """
+    memory_ids = list(memory_ids)
+    if not memory_ids or not is_supported():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s',
+                [(_sqlite_rowid(memory_id),) for memory_id in memory_ids],
+            )
+        else:
+            cursor.execute(
+                f'DELETE FROM {POSTGRES_TABLE} WHERE memory_id = ANY(%s::uuid[])',
+                [[str(memory_id) for memory_id in memory_ids]],
+            )
+
+
+def rebuild_index(vault_ids=None, batch_size=500):
+    """
+    Regenera el índice completo o el de los cofres indicados
+    """
+    from .models import Memory
+
+    if not is_supported():
+        return 0
+
+    with connection.cursor() as cursor:
+        table = SQLITE_TABLE if connection.vendor == 'sqlite' else POSTGRES_TABLE
+        if vault_ids is None:
+            cursor.execute(f'DELETE FROM {table}')
+        else:
+            for vault_id in vault_ids:
+                if connection.vendor == 'sqlite':
+                    cursor.execute(
+                        f'DELETE FROM {table} WHERE vault_id = %s', [_as_uuid(vault_id).hex]
+                    )
+                else:
+                    cursor.execute(
+                        f'DELETE FROM {table} WHERE vault_id = %s::uuid', [str(vault_id)]
+                    )
+
+    memories = Memory.objects.only('id', 'vault_id', 'title', 'description', 'tags').order_by()
+    if vault_ids is not None:
+        memories = memories.filter(vault_id__in=vault_ids)
+
+    batch = []
+    total = 0
+    for memory in memories.iterator(chunk_size=batch_size):
+        batch.append(memory)
+        if len(batch) >= batch_size:
+            index_memories(batch)
+            total += len(batch)
+            batch = []
+    index_memories(batch)
+    return total + len(batch)
+
+
+def matching_ids(query):
+    """
+    Expresión SQL con los ids de recuerdos que coinciden con la búsqueda
+    """
+    stems = query_stems(query)
+    if not stems:
+        return None
+    if connection.vendor == 'sqlite':
+        return RawSQL(
+            f'SELECT memory_id FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s',
+            [_sqlite_match(stems)],
+        )
+    return RawSQL(
+        f"SELECT memory_id FROM {POSTGRES_TABLE} WHERE document @@ to_tsquery('spanish', %s)",
+        [_postgres_tsquery(stems)],
+    )
+
+
+def search(query, vault_ids, limit, after=None):
+    """
+    Busca recuerdos en los cofres indicados ordenados por relevancia.
+
+    Devuelve una lista de (memory_id, score) con score mayor = más relevante.
+    after es el (score, memory_id) del último resultado de la página anterior.
+    """
+    stems = query_stems(query)
+    vault_ids = list(vault_ids)
+    if not stems or not vault_ids:
+        return []
+
+    params = []
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        placeholders = ', '.join(['%s'] * len(vault_ids))
+        inner = (
+            f'SELECT memory_id, -bm25({SQLITE_TABLE}, 0, 0, {weights}) AS score '
+            f'FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s '
+            f'AND vault_id IN ({placeholders})'
+        )
+        params += [_sqlite_match(stems)] + [_as_uuid(vault_id).hex for vault_id in vault_ids]
+    else:
+        inner = (
+            'SELECT memory_id::text AS memory_id, '
+            'ts_rank_cd(document, query)::float8 AS score '
+            f"FROM {POSTGRES_TABLE}, to_tsquery('spanish', %s) query "
+            'WHERE document @@ query AND vault_id = ANY(%s::uuid[])'
+        )
+        params += [_postgres_tsquery(stems), [str(vault_id) for vault_id in vault_ids]]
+
+    sql = f'SELECT memory_id, score FROM ({inner}) ranked'
+    if after is not None:
+        sql += ' WHERE score < %s OR (score = %s AND memory_id > %s)'
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY score DESC, memory_id LIMIT %s'
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(memory_id, score) for memory_id, score in cursor.fetchall()]
+
+
+def highlight(text, stems, max_words=30, marker=('<b>', '</b>')):
+    """
+    Fragmento del texto alrededor de la primera coincidencia con las palabras
+    resaltadas, escapado como HTML (el texto lo escriben los usuarios)
+    """
+    if not text:
+        return ''
+    words = text.split()
+    matches = [
+        index for index, word in enumerate(words)
+        if any(fold(token).startswith(word_stem)
+               for token in _WORD_RE.findall(word) for word_stem in stems)
+    ]
+    if not matches:
+        return ' '.join(map(escape, words[:max_words])) + (' …' if len(words) > max_words else '')
+
+    start = max(0, matches[0] - max_words // 3)
+    end = min(len(words), start + max_words)
+    matched = set(matches)
+    fragment = [
+        f'{marker[0]}{escape(word)}{marker[1]}' if index in matched else escape(word)
+        for index, word in enumerate(words[start:end], start)
+    ]
+    prefix = '… ' if start > 0 else ''
+    suffix = ' …' if end < len(words) else ''
+    return prefix + ' '.join(fragment) + suffix
+
+
+class MemorySearchFilter(filters.SearchFilter):
+    """
+    SearchFilter que resuelve ?search= contra el índice de texto completo
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if not is_supported():
+            return super().filter_queryset(request, queryset, view)
+
+        ids = matching_ids(query)
+        if ids is None:
+            return queryset
+        return queryset.filter(id__in=ids)
+
+
+def fallback_queryset(queryset, query):
+    """
+    Búsqueda por icontains para motores sin índice de texto completo
+    """
+    condition = Q()
+    for word in _WORD_RE.findall(query):
+        condition &= (
+            Q(title__icontains=word) | Q(description__icontains=word) | Q(tags__icontains=word)
+        )
+    return queryset.filter(condition)
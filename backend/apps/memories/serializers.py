@@ -1,32 +1,34 @@
 from rest_framework import serializers
 from .models import Memory, MemoryComment, MemoryLike, MemoryShare
 from apps.accounts.serializers import UserSerializer
+from apps.media.fields import AudioAnalysisField, RenditionsField
+from .duplicates import similar
 
 
 class MemorySerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.name', read_only=True)
     vault_name = serializers.CharField(source='vault.name', read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
+    photo_renditions = RenditionsField()
+    audio_analysis = AudioAnalysisField()
     
     class Meta:
         model = Memory
         fields = (
-            'id', 'title', 'description', 'type', 'photo', 'audio', 'video',
+            'id', 'title', 'description', 'type', 'photo', 'photo_renditions', 'audio',
+            'audio_analysis', 'video',
             'date_taken', 'location', 'tags', 'vault', 'vault_name',
             'created_by', 'created_by_name', 'likes_count', 'comments_count',
             'is_liked', 'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'created_by', 'created_at', 'updated_at')
-    
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-    
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+        read_only_fields = (
+            'id', 'created_by', 'likes_count', 'comments_count', 'created_at', 'updated_at'
+        )
     
     def get_is_liked(self, obj):
+        # Las vistas de listado anotan is_liked con Exists (ver MemoryQuerySet.with_user_state)
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
@@ -37,12 +39,31 @@ class MemorySerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class MemoryCreateSerializer(serializers.ModelSerializer):
+class PossibleDuplicatesMixin(serializers.Serializer):
+    """
+    Aviso al subir una foto: recuerdos del mismo cofre con una foto casi igual
+    """
+    possible_duplicates = serializers.SerializerMethodField()
+    
+    def get_possible_duplicates(self, obj):
+        if obj.photo_hash is None:
+            return []
+        matches = similar(
+            Memory.objects.filter(vault_id=obj.vault_id).only('id', 'title', 'photo_hash'),
+            obj.photo_hash, exclude=obj.pk,
+        )
+        return [
+            {'id': str(memory.id), 'title': memory.title, 'distance': memory_distance}
+            for memory, memory_distance in matches
+        ]
+
+
+class MemoryCreateSerializer(PossibleDuplicatesMixin, serializers.ModelSerializer):
     class Meta:
         model = Memory
         fields = (
             'title', 'description', 'type', 'photo', 'audio', 'video',
-            'date_taken', 'location', 'tags', 'vault'
+            'date_taken', 'location', 'tags', 'vault', 'possible_duplicates'
         )
     
     def create(self, validated_data):
@@ -50,15 +71,38 @@ class MemoryCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class MemoryUpdateSerializer(serializers.ModelSerializer):
+class MemoryUpdateSerializer(PossibleDuplicatesMixin, serializers.ModelSerializer):
     class Meta:
         model = Memory
         fields = (
             'title', 'description', 'type', 'photo', 'audio', 'video',
-            'date_taken', 'location', 'tags'
+            'date_taken', 'location', 'tags', 'possible_duplicates'
         )
 
 
+class MemoryBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    Alta de un recuerdo dentro de un lote; el cofre se valida contra
+    context['vault_ids'] sin consultar la base de datos
+    """
+    vault = serializers.UUIDField()
+    
+    class Meta:
+        model = Memory
+        fields = ('title', 'description', 'type', 'date_taken', 'location', 'tags', 'vault')
+    
+    def validate_vault(self, value):
+        if value not in self.context['vault_ids']:
+            raise serializers.ValidationError('Vault no encontrado')
+        return value
+
+
+class MemoryBulkUpdateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Memory
+        fields = ('title', 'description', 'type', 'date_taken', 'location', 'tags')
+
+
 class MemoryCommentSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.name', read_only=True)
     user_avatar = serializers.ImageField(source='user.avatar', read_only=True)
@@ -104,6 +148,14 @@ class MemoryShareSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class MemorySearchResultSerializer(MemorySerializer):
+    score = serializers.FloatField(source='search_score', read_only=True)
+    highlights = serializers.DictField(source='search_highlights', read_only=True)
+    
+    class Meta(MemorySerializer.Meta):
+        fields = MemorySerializer.Meta.fields + ('score', 'highlights')
+
+
 class MemoryDetailSerializer(MemorySerializer):
     comments = MemoryCommentSerializer(many=True, read_only=True)
     likes = MemoryLikeSerializer(many=True, read_only=True)
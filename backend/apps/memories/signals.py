@@ -0,0 +1,82 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from . import duplicates
+from .models import Memory, MemoryTag
+from .search import index_memory, remove_memories
+from .stats import apply_rollup_delta, memory_bucket
+from .tags import sync_tags
+
+
+@receiver(pre_save, sender=Memory)
+def remember_memory_bucket(sender, instance, **kwargs):
+    """
+    Guarda el bucket anterior para mover el recuerdo si cambia de tipo o año,
+    y la foto anterior para saber si hay que recalcular su hash
+    """
+    instance._previous_rollup = None
+    instance._previous_photo = None
+    if instance._state.adding:
+        return
+    previous = Memory.objects.filter(pk=instance.pk).values(
+        'vault_id', 'type', 'date_taken', 'likes_count', 'comments_count', 'photo'
+    ).first()
+    if previous:
+        instance._previous_photo = previous['photo'] or ''
+        instance._previous_rollup = (
+            memory_bucket(previous['vault_id'], previous['type'], previous['date_taken']),
+            previous['likes_count'],
+            previous['comments_count'],
+        )
+
+
+@receiver(post_save, sender=Memory)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    bucket = memory_bucket(instance.vault_id, instance.type, instance.date_taken)
+    previous = getattr(instance, '_previous_rollup', None)
+    
+    if created or previous is None:
+        apply_rollup_delta(
+            bucket, memories=1, likes=instance.likes_count, comments=instance.comments_count
+        )
+        return
+    
+    previous_bucket, likes, comments = previous
+    if previous_bucket != bucket:
+        apply_rollup_delta(previous_bucket, memories=-1, likes=-likes, comments=-comments)
+        apply_rollup_delta(bucket, memories=1, likes=likes, comments=comments)
+
+
+@receiver(post_delete, sender=Memory)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    apply_rollup_delta(
+        memory_bucket(instance.vault_id, instance.type, instance.date_taken),
+        memories=-1,
+        likes=-instance.likes_count,
+        comments=-instance.comments_count,
+    )
+
+
+@receiver(post_save, sender=Memory)
+def update_search_index_on_save(sender, instance, **kwargs):
+    index_memory(instance)
+
+
+@receiver(post_delete, sender=Memory)
+def update_search_index_on_delete(sender, instance, **kwargs):
+    remove_memories([instance.pk])
+
+
+@receiver(post_save, sender=Memory)
+def update_tag_index_on_save(sender, instance, **kwargs):
+    sync_tags(MemoryTag, 'memory', [instance])
+
+
+@receiver(post_save, sender=Memory)
+def update_photo_hash_on_save(sender, instance, created, **kwargs):
+    name = instance.photo.name if instance.photo else ''
+    previous = getattr(instance, '_previous_photo', None)
+    if created or previous is None:
+        if name:
+            duplicates.refresh(instance)
+    elif previous != name:
+        duplicates.refresh(instance)
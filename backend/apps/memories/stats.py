@@ -0,0 +1,142 @@
+"""
+Motor de estadísticas de recuerdos.
+
+Las estadísticas se leen de MemoryRollup (agregados por cofre, tipo y año),
+que se mantiene de forma incremental en cada escritura de recuerdos, likes y
+comentarios. Así el coste de memory_stats depende del número de cofres y no
+del número de recuerdos.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, ExtractYear
+from django.utils import timezone
+from .models import Memory, MemoryRollup, MemoryType
+
+
+def memory_bucket(vault_id, memory_type, date_taken):
+    """
+    Devuelve la clave (vault_id, type, year) del agregado de un recuerdo
+    """
+    year = timezone.localtime(date_taken).year if date_taken else 0
+    return (vault_id, memory_type, year)
+
+
+def apply_rollup_delta(bucket, memories=0, likes=0, comments=0):
+    """
+    Suma los deltas al agregado del bucket, creándolo si hace falta
+    """
+    deltas = {
+        'memories_count': memories,
+        'likes_count': likes,
+        'comments_count': comments,
+    }
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not updates:
+        return
+
+    vault_id, memory_type, year = bucket
+    rollup = MemoryRollup.objects.filter(vault_id=vault_id, type=memory_type, year=year)
+    if rollup.update(**updates):
+        return
+
+    # Solo se crean agregados al sumar; una resta sobre un bucket inexistente
+    # solo ocurre durante borrados en cascada del propio cofre
+    if any(delta < 0 for delta in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            MemoryRollup.objects.create(
+                vault_id=vault_id, type=memory_type, year=year, **deltas
+            )
+    except IntegrityError:
+        rollup.update(**updates)
+
+
+def record_engagement(memory, likes=0, comments=0):
+    """
+    Actualiza los contadores del recuerdo y el agregado de su cofre
+    """
+    updates = {}
+    if likes:
+        updates['likes_count'] = F('likes_count') + likes
+    if comments:
+        updates['comments_count'] = F('comments_count') + comments
+    if not updates:
+        return
+    # Los contadores forman parte del recuerdo que ve el feed de sincronización
+    updates['updated_at'] = timezone.now()
+
+    with transaction.atomic():
+        Memory.objects.filter(pk=memory.pk).update(**updates)
+        apply_rollup_delta(
+            memory_bucket(memory.vault_id, memory.type, memory.date_taken),
+            likes=likes,
+            comments=comments,
+        )
+
+
+def compute_memory_stats(vault_ids):
+    """
+    Calcula las estadísticas de los cofres indicados con una única consulta agregada
+    """
+    stats = {
+        'total_memories': 0,
+        'by_type': {memory_type: 0 for memory_type in MemoryType.values},
+        'by_year': {},
+        'total_likes': 0,
+        'total_comments': 0,
+    }
+
+    # Agrupar también por cofre sigue el orden del índice único (vault, type,
+    # year) sin ordenar en una tabla temporal; los cofres se suman aquí
+    rows = MemoryRollup.objects.filter(vault_id__in=vault_ids).values(
+        'vault_id', 'type', 'year'
+    ).annotate(
+        memories=Sum('memories_count'),
+        likes=Sum('likes_count'),
+        comments=Sum('comments_count'),
+    ).order_by('vault_id', 'type', 'year')
+
+    for row in rows:
+        stats['total_memories'] += row['memories']
+        stats['total_likes'] += row['likes']
+        stats['total_comments'] += row['comments']
+        stats['by_type'][row['type']] = stats['by_type'].get(row['type'], 0) + row['memories']
+        if row['year'] and row['memories']:
+            stats['by_year'][row['year']] = stats['by_year'].get(row['year'], 0) + row['memories']
+
+    stats['by_year'] = dict(sorted(stats['by_year'].items()))
+    return stats
+
+
+def rebuild_rollups(vault_ids=None):
+    """
+    Reconstruye los agregados desde la tabla de recuerdos
+    """
+    memories = Memory.objects.all()
+    rollups = MemoryRollup.objects.all()
+    if vault_ids is not None:
+        memories = memories.filter(vault_id__in=vault_ids)
+        rollups = rollups.filter(vault_id__in=vault_ids)
+
+    rows = memories.order_by().values('vault_id', 'type').annotate(
+        year=Coalesce(ExtractYear('date_taken'), 0),
+    ).values('vault_id', 'type', 'year').annotate(
+        memories=Count('id'),
+        likes=Sum('likes_count'),
+        comments=Sum('comments_count'),
+    )
+
+    with transaction.atomic():
+        rollups.delete()
+        MemoryRollup.objects.bulk_create([
+            MemoryRollup(
+                vault_id=row['vault_id'],
+                type=row['type'],
+                year=row['year'],
+                memories_count=row['memories'],
+                likes_count=row['likes'] or 0,
+                comments_count=row['comments'] or 0,
+            )
+            for row in rows
+        ])
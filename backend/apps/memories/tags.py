@@ -0,0 +1,109 @@
+"""
+Índice normalizado de etiquetas.
+
+Memory.tags y Phrase.tags siguen siendo listas JSON; MemoryTag y PhraseTag
+guardan una fila por etiqueta para filtrar y contar con índices. Las
+funciones reciben el modelo de etiquetas y el nombre del campo del dueño
+para servir a ambos.
+"""
+from django.db import transaction
+from django.db.models import Count
+from rest_framework.filters import BaseFilterBackend
+from apps.accounts.access import accessible_vault_ids
+
+MAX_TAG_LENGTH = 100
+
+
+def normalize_tags(tags):
+    """
+    Etiquetas sin espacios sobrantes, en minúsculas y sin repetir
+    """
+    if not isinstance(tags, (list, tuple)):
+        return []
+    normalized = []
+    for tag in tags:
+        tag = str(tag).strip().lower()[:MAX_TAG_LENGTH]
+        if tag and tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+
+def sync_tags(tag_model, owner_field, instances):
+    """
+    Sincroniza las filas de etiquetas con el campo tags de las instancias
+    """
+    instances = [instance for instance in instances if instance.pk]
+    if not instances:
+        return
+
+    owner_id_field = f'{owner_field}_id'
+    existing = {}
+    rows = tag_model.objects.filter(
+        **{f'{owner_id_field}__in': [instance.pk for instance in instances]}
+    ).values_list('id', owner_id_field, 'vault_id', 'tag')
+    for row_id, owner_id, vault_id, tag in rows:
+        existing.setdefault(owner_id, {})[tag] = (row_id, vault_id)
+
+    to_delete = []
+    to_create = []
+    for instance in instances:
+        current = existing.get(instance.pk, {})
+        desired = normalize_tags(instance.tags)
+        for tag, (row_id, vault_id) in current.items():
+            # Las filas de un cofre anterior se recrean en el nuevo
+            if tag not in desired or vault_id != instance.vault_id:
+                to_delete.append(row_id)
+        for tag in desired:
+            if tag not in current or current[tag][1] != instance.vault_id:
+                to_create.append(tag_model(
+                    **{owner_id_field: instance.pk}, vault_id=instance.vault_id, tag=tag
+                ))
+
+    with transaction.atomic():
+        if to_delete:
+            tag_model.objects.filter(id__in=to_delete).delete()
+        if to_create:
+            tag_model.objects.bulk_create(to_create, ignore_conflicts=True)
+
+
+def tag_facets(tag_model, vault_ids):
+    """
+    Número de elementos por etiqueta agrupado por cofre
+    """
+    rows = tag_model.objects.filter(vault_id__in=vault_ids).values('vault_id', 'tag').annotate(
+        count=Count('id')
+    ).order_by('vault_id', '-count', 'tag')
+
+    facets = {}
+    for row in rows:
+        facets.setdefault(row['vault_id'], []).append({'tag': row['tag'], 'count': row['count']})
+    return [{'vault': vault_id, 'tags': tags} for vault_id, tags in facets.items()]
+
+
+class TagIndexFilter(BaseFilterBackend):
+    """
+    Filtra por ?tags=a,b usando el índice de etiquetas.
+
+    Con tags_mode=all (por defecto) se exigen todas las etiquetas y con
+    tags_mode=any basta con una. La vista define tag_model y tag_owner_field.
+    """
+    tags_param = 'tags'
+    mode_param = 'tags_mode'
+
+    def filter_queryset(self, request, queryset, view):
+        raw = request.query_params.get(self.tags_param, '')
+        tags = normalize_tags(raw.split(','))
+        if not tags:
+            return queryset
+
+        tag_model = view.tag_model
+        owner_id_field = f'{view.tag_owner_field}_id'
+        tag_rows = tag_model.objects.filter(vault_id__in=accessible_vault_ids(request))
+
+        if request.query_params.get(self.mode_param) == 'any':
+            return queryset.filter(
+                pk__in=tag_rows.filter(tag__in=tags).values(owner_id_field)
+            )
+        for tag in tags:
+            queryset = queryset.filter(pk__in=tag_rows.filter(tag=tag).values(owner_id_field))
+        return queryset
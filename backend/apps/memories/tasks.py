@@ -0,0 +1,32 @@
+"""
+Tareas en segundo plano de recuerdos (ver apps.jobs)
+"""
+import os
+from apps.accounts.models import User, Vault
+from apps.jobs.queue import task
+from . import ingest
+from .models import Memory
+from .stats import rebuild_rollups
+
+
+@task('memories.rebuild_counters', max_attempts=1)
+def rebuild_counters(vault_id=None):
+    memories = Memory.objects.all()
+    if vault_id:
+        memories = memories.filter(vault_id=vault_id)
+    updated = memories.rebuild_counters()
+    rebuild_rollups([vault_id] if vault_id else None)
+    return {'memories': updated}
+
+
+@task('memories.ingest_photos', max_attempts=1)
+def ingest_photos(path, vault_id, user_id, tags=None, description=''):
+    try:
+        vault = Vault.objects.get(pk=vault_id)
+        user = User.objects.get(pk=user_id)
+        results = ingest.ingest_photos(path, vault, user, tags=tags or [], description=description)
+        created = sum(1 for result in results if 'id' in result)
+        return {'created': created, 'failed': len(results) - created, 'results': results}
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
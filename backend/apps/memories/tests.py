@@ -0,0 +1,299 @@
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from apps.accounts.models import Vault
+from apps.accounts.testing import QueryPlanTestCase
+from . import search
+from .models import Memory, MemoryComment, MemoryLike, MemoryRollup, MemoryTag, MemoryType
+from .pagination import TimelineCursorPagination
+from .stats import compute_memory_stats, rebuild_rollups
+
+User = get_user_model()
+
+
+def _date(year, month=6, day=1):
+    return timezone.make_aware(datetime(year, month, day, 12))
+
+
+class MemoryTestCase(APITestCase):
+    """
+    Usuario con un cofre propio y el cliente autenticado
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='nonna', email='nonna@example.com', password='secreta', name='Nonna'
+        )
+        self.vault = Vault.objects.create(name='Familia', owner=self.user)
+        self.client.force_authenticate(self.user)
+    
+    def create_memory(self, vault=None, **fields):
+        fields.setdefault('title', 'Recuerdo')
+        return Memory.objects.create(vault=vault or self.vault, created_by=self.user, **fields)
+
+
+class RollupTests(MemoryTestCase):
+    
+    def snapshot(self):
+        return sorted(MemoryRollup.objects.filter(memories_count__gt=0).values_list(
+            'vault_id', 'type', 'year', 'memories_count', 'likes_count', 'comments_count'
+        ))
+    
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.snapshot())
+    
+    def test_bulk_update_moves_counts_between_years(self):
+        memories = [
+            self.create_memory(type='photo', date_taken=_date(1990), likes_count=2, comments_count=1)
+            for _ in range(3)
+        ]
+        response = self.client.post('/api/memories/bulk/', {'update': [
+            {'client_id': str(index), 'id': str(memory.id), 'date_taken': _date(2001).isoformat()}
+            for index, memory in enumerate(memories[:2])
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+    
+        stats = compute_memory_stats([self.vault.id])
+        self.assertEqual(stats['by_year'], {1990: 1, 2001: 2})
+        self.assertEqual(stats['total_likes'], 6)
+        self.assertEqual(stats['total_comments'], 3)
+        self.assertMatchesRebuild()
+    
+    def test_bulk_update_of_type_keeps_totals(self):
+        memory = self.create_memory(type='note', date_taken=_date(1990))
+        response = self.client.post('/api/memories/bulk/', {'update': [
+            {'client_id': 'a', 'id': str(memory.id), 'type': 'recipe'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+    
+        stats = compute_memory_stats([self.vault.id])
+        self.assertEqual(stats['total_memories'], 1)
+        self.assertEqual(stats['by_type']['note'], 0)
+        self.assertEqual(stats['by_type']['recipe'], 1)
+        self.assertMatchesRebuild()
+    
+    def test_vault_move_carries_counters(self):
+        other = Vault.objects.create(name='Otra rama', owner=self.user)
+        memory = self.create_memory(date_taken=_date(1975), likes_count=4, comments_count=2)
+        memory.vault = other
+        memory.save()
+    
+        self.assertEqual(compute_memory_stats([self.vault.id])['total_memories'], 0)
+        moved = compute_memory_stats([other.id])
+        self.assertEqual(moved['total_memories'], 1)
+        self.assertEqual(moved['total_likes'], 4)
+        self.assertEqual(moved['total_comments'], 2)
+        self.assertMatchesRebuild()
+    
+    def test_bulk_delete_subtracts(self):
+        kept = self.create_memory(date_taken=_date(1990))
+        removed = self.create_memory(date_taken=_date(1990), likes_count=3)
+        response = self.client.post('/api/memories/bulk/', {'delete': [
+            {'client_id': 'a', 'id': str(removed.id)},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+    
+        stats = compute_memory_stats([self.vault.id])
+        self.assertEqual(stats['total_memories'], 1)
+        self.assertEqual(stats['total_likes'], 0)
+        self.assertTrue(Memory.objects.filter(pk=kept.pk).exists())
+        self.assertMatchesRebuild()
+
+
+class TimelineCursorTests(MemoryTestCase):
+    
+    def walk(self, page_size):
+        ids, url, params = [], '/api/memories/timeline/', {'page_size': page_size}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), page_size)
+            ids += [memory['id'] for memory in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+    
+    def expected(self):
+        ordered = Memory.objects.order_by(*TimelineCursorPagination.ordering)
+        return [str(pk) for pk in ordered.values_list('id', flat=True)]
+    
+    def test_ties_and_undated_cross_page_boundaries(self):
+        # Mismo date_taken y created_at: solo el id desempata
+        tied = [self.create_memory(date_taken=_date(1990)) for _ in range(5)]
+        Memory.objects.filter(pk__in=[memory.pk for memory in tied]).update(
+            created_at=_date(2020)
+        )
+        self.create_memory(date_taken=_date(2000))
+        for _ in range(4):
+            self.create_memory()
+        Memory.objects.filter(date_taken__isnull=True).update(created_at=_date(2021))
+    
+        for page_size in (1, 2, 3, 5, 10, 11):
+            with self.subTest(page_size=page_size):
+                ids = self.walk(page_size)
+                self.assertEqual(ids, self.expected())
+                self.assertEqual(len(set(ids)), 10)
+    
+    def test_exact_page_has_no_next(self):
+        for year in (1980, 1981):
+            self.create_memory(date_taken=_date(year))
+        response = self.client.get('/api/memories/timeline/', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+    
+    def test_new_memories_do_not_shift_later_pages(self):
+        for year in range(1980, 1986):
+            self.create_memory(date_taken=_date(year))
+        first = self.client.get('/api/memories/timeline/', {'page_size': 3})
+        self.create_memory(date_taken=_date(2010))
+        second = self.client.get(first.data['next'])
+    
+        ids = [memory['id'] for memory in first.data['results'] + second.data['results']]
+        self.assertEqual(ids, self.expected()[1:])
+    
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/memories/timeline/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchIndexTests(MemoryTestCase):
+    
+    def found(self, query, vault_ids=None):
+        hits = search.search(query, vault_ids or [self.vault.id], 50)
+        return {memory_id for memory_id, _ in hits}
+    
+    def test_save_and_delete_keep_index_in_sync(self):
+        memory = self.create_memory(title='La receta de la abuela', description='Tortellini')
+        self.assertEqual(self.found('recetas'), {memory.id.hex})
+    
+        memory.title = 'Vacaciones en Sicilia'
+        memory.save()
+        self.assertEqual(self.found('receta'), set())
+        self.assertEqual(self.found('sicilia'), {memory.id.hex})
+    
+        memory.delete()
+        self.assertEqual(self.found('sicilia'), set())
+    
+    def test_bulk_writes_are_indexed(self):
+        response = self.client.post('/api/memories/bulk/', {'create': [
+            {'client_id': 'a', 'title': 'Boda en Nápoles', 'vault': str(self.vault.id)},
+        ]}, format='json')
+        memory_id = response.data['results']['a']['id']
+        self.assertEqual(self.found('napoles'), {memory_id.hex})
+    
+        self.client.post('/api/memories/bulk/', {'update': [
+            {'client_id': 'a', 'id': str(memory_id), 'tags': ['cumpleaños']},
+        ]}, format='json')
+        self.assertEqual(self.found('cumpleanos'), {memory_id.hex})
+    
+        self.client.post('/api/memories/bulk/', {'delete': [
+            {'client_id': 'a', 'id': str(memory_id)},
+        ]}, format='json')
+        self.assertEqual(self.found('napoles'), set())
+    
+    def test_vault_move_and_rebuild(self):
+        other = Vault.objects.create(name='Otra rama', owner=self.user)
+        memory = self.create_memory(title='Fiesta del pueblo')
+        memory.vault = other
+        memory.save()
+        self.assertEqual(self.found('fiesta'), set())
+        self.assertEqual(self.found('fiesta', [other.id]), {memory.id.hex})
+    
+        self.assertEqual(search.rebuild_index(), 1)
+        self.assertEqual(self.found('fiesta', [other.id]), {memory.id.hex})
+    
+    def test_vault_delete_clears_index(self):
+        self.create_memory(title='Navidad en casa')
+        vault_id = self.vault.id
+        self.vault.delete()
+        self.assertEqual(self.found('navidad', [vault_id]), set())
+    
+    def test_highlights_are_escaped(self):
+        self.create_memory(title='<script>receta</script> secreta')
+        response = self.client.get('/api/memories/search/', {'q': 'receta'})
+        self.assertEqual(response.status_code, 200)
+        highlight = response.data['results'][0]['highlights']['title']
+        self.assertNotIn('<script>', highlight)
+        self.assertIn('<b>&lt;script&gt;receta&lt;/script&gt;</b>', highlight)
+
+
+class MemoryQueryPlanTests(QueryPlanTestCase):
+    tables = {'memories', 'memory_likes'}
+    
+    @classmethod
+    def seed(cls):
+        now = timezone.now()
+        types = MemoryType.values
+        for vault, rows in cls.seeded_vaults:
+            memories = Memory.objects.bulk_create([
+                Memory(
+                    title=f'Recuerdo {index}', vault=vault, created_by=cls.user,
+                    type=types[index % len(types)],
+                    date_taken=now - timedelta(days=index) if index % 10 else None,
+                    tags=[f'tag{index % 20}'],
+                )
+                for index in range(rows)
+            ])
+            MemoryTag.objects.bulk_create([
+                MemoryTag(memory=memory, vault=vault, tag=memory.tags[0]) for memory in memories
+            ])
+            MemoryLike.objects.bulk_create([
+                MemoryLike(memory=memory, user=cls.user) for memory in memories[::3]
+            ])
+            MemoryComment.objects.bulk_create([
+                MemoryComment(memory=memories[index % 10], user=cls.user, text='Comentario')
+                for index in range(rows)
+            ])
+            MemoryRollup.objects.bulk_create([
+                MemoryRollup(vault=vault, type=memory_type, year=year, memories_count=1)
+                for memory_type in types for year in range(1950, 2030)
+            ])
+        cls.memory = Memory.objects.filter(vault=cls.vault).first()
+    
+    def expected(self, queryset, count):
+        return [str(pk) for pk in queryset.values_list('id', flat=True)[:count]]
+    
+    def test_timeline_merges_vaults_in_index_order(self):
+        response = self.assertRequestUsesIndexes('/api/memories/timeline/', self.tables)
+        ordered = Memory.objects.filter(vault_id__in=self.vault_ids).order_by(
+            *TimelineCursorPagination.ordering
+        )
+        ids = [memory['id'] for memory in response.data['results']]
+        self.assertEqual(ids, self.expected(ordered, 20))
+        self.assertEqual(
+            {memory['vault'] for memory in response.data['results']}, set(self.vault_ids)
+        )
+    
+        response = self.assertRequestUsesIndexes(response.data['next'], self.tables)
+        ids = [memory['id'] for memory in response.data['results']]
+        self.assertEqual(ids, self.expected(ordered[20:], 20))
+    
+    def test_list(self):
+        response = self.assertRequestUsesIndexes('/api/memories/', self.tables)
+        self.assertEqual(response.data['count'], self.rows * 2)
+        ordered = Memory.objects.filter(vault_id__in=self.vault_ids)
+        ids = [memory['id'] for memory in response.data['results']]
+        self.assertEqual(ids, self.expected(ordered.order_by('-date_taken', '-created_at', '-id'), 20))
+    
+        self.assertRequestUsesIndexes('/api/memories/', self.tables, {'page': 3})
+    
+    def test_list_by_type_and_tags(self):
+        response = self.assertRequestUsesIndexes(
+            '/api/memories/', self.tables, {'type': MemoryType.PHOTO}
+        )
+        self.assertTrue(all(memory['type'] == MemoryType.PHOTO for memory in response.data['results']))
+        response = self.assertRequestUsesIndexes(
+            '/api/memories/', self.tables | {'memory_tags'}, {'tags': 'tag1'}, allow_sort=True
+        )
+        self.assertEqual(response.data['count'], self.rows * 2 // 20)
+    
+    def test_stats(self):
+        response = self.assertRequestUsesIndexes('/api/memories/stats/', {'memory_rollups'})
+        self.assertEqual(response.data['total_memories'], len(MemoryType.values) * 80 * 2)
+    
+    def test_comments(self):
+        self.assertRequestUsesIndexes(
+            f'/api/memories/{self.memory.id}/comments/', self.tables | {'memory_comments'}
+        )
@@ -3,12 +3,19 @@ from . import views
 
 urlpatterns = [
     path('', views.MemoryListCreateView.as_view(), name='memory_list_create'),
+    path('bulk/', views.memory_bulk, name='memory_bulk'),
+    path('ingest/', views.memory_ingest, name='memory_ingest'),
+    path('duplicates/', views.memory_duplicates, name='memory_duplicates'),
     path('<uuid:pk>/', views.MemoryDetailView.as_view(), name='memory_detail'),
     path('<uuid:memory_id>/comments/', views.MemoryCommentListCreateView.as_view(), name='memory_comment_list_create'),
     path('<uuid:memory_id>/comments/<uuid:pk>/', views.MemoryCommentDetailView.as_view(), name='memory_comment_detail'),
+    path('<uuid:memory_id>/duplicates/', views.memory_similar, name='memory_similar'),
     path('<uuid:memory_id>/like/', views.toggle_memory_like, name='toggle_memory_like'),
     path('shares/', views.MemoryShareListCreateView.as_view(), name='memory_share_list_create'),
     path('shares/<uuid:pk>/', views.MemoryShareDetailView.as_view(), name='memory_share_detail'),
     path('timeline/', views.memory_timeline, name='memory_timeline'),
+    path('timeline/buckets/', views.memory_timeline_buckets, name='memory_timeline_buckets'),
     path('stats/', views.memory_stats, name='memory_stats'),
+    path('search/', views.memory_search, name='memory_search'),
+    path('tags/', views.memory_tag_facets, name='memory_tag_facets'),
 ]
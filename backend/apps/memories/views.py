@@ -1,13 +1,34 @@
 from rest_framework import generics, status, permissions, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import Memory, MemoryComment, MemoryLike, MemoryShare
+import os
+import shutil
+import uuid
+import zipfile
+from datetime import datetime
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from apps.accounts.access import accessible_vault_ids, has_vault_access, merge_vaults
+from apps.jobs.queue import enqueue
+from apps.jobs.serializers import JobSerializer
+from .models import Memory, MemoryComment, MemoryLike, MemoryShare, MemoryTag
+from . import duplicates, search
+from .bulk import BatchError, process_batch
+from .ingest import IngestError, check_archive
+from .pagination import TimelineCursorPagination, decode_cursor, encode_cursor
+from .stats import compute_memory_stats, record_engagement
+from .tags import TagIndexFilter, tag_facets
 from .serializers import (
     MemorySerializer, MemoryCreateSerializer, MemoryUpdateSerializer,
     MemoryDetailSerializer, MemoryCommentSerializer, MemoryLikeSerializer,
-    MemoryShareSerializer
+    MemoryShareSerializer, MemorySearchResultSerializer
 )
 
 
@@ -16,9 +37,13 @@ class MemoryListCreateView(generics.ListCreateAPIView):
     Vista para listar y crear recuerdos
     """
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [
+        DjangoFilterBackend, search.MemorySearchFilter, TagIndexFilter, filters.OrderingFilter
+    ]
     filterset_fields = ['type', 'vault', 'created_by']
     search_fields = ['title', 'description', 'tags']
+    tag_model = MemoryTag
+    tag_owner_field = 'memory'
     ordering_fields = ['created_at', 'updated_at', 'date_taken']
     ordering = ['-date_taken', '-created_at']
     
@@ -28,10 +53,12 @@ class MemoryListCreateView(generics.ListCreateAPIView):
         return MemorySerializer
     
     def get_queryset(self):
-        user = self.request.user
         return Memory.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+            vault_id__in=accessible_vault_ids(self.request)
+        ).with_user_state(self.request.user)
+    
+    def filter_queryset(self, queryset):
+        return merge_vaults(super().filter_queryset(queryset), accessible_vault_ids(self.request))
 
 
 class MemoryDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -46,10 +73,9 @@ class MemoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         return MemoryDetailSerializer
     
     def get_queryset(self):
-        user = self.request.user
         return Memory.objects.filter(
-            Q(vault__owner=user) | Q(vault__members__user=user)
-        ).distinct()
+            vault_id__in=accessible_vault_ids(self.request)
+        ).with_user_state(self.request.user).prefetch_related('comments__user', 'likes__user')
 
 
 class MemoryCommentListCreateView(generics.ListCreateAPIView):
@@ -61,12 +87,19 @@ class MemoryCommentListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         memory_id = self.kwargs['memory_id']
-        return MemoryComment.objects.filter(memory_id=memory_id)
+        return MemoryComment.objects.filter(
+            memory_id=memory_id,
+            memory__vault_id__in=accessible_vault_ids(self.request)
+        ).select_related('user')
     
     def perform_create(self, serializer):
         memory_id = self.kwargs['memory_id']
-        memory = Memory.objects.get(id=memory_id)
-        serializer.save(memory=memory)
+        memory = get_object_or_404(
+            Memory, id=memory_id, vault_id__in=accessible_vault_ids(self.request)
+        )
+        with transaction.atomic():
+            serializer.save(memory=memory)
+            record_engagement(memory, comments=1)
 
 
 class MemoryCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -78,7 +111,17 @@ class MemoryCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         memory_id = self.kwargs['memory_id']
-        return MemoryComment.objects.filter(memory_id=memory_id)
+        return MemoryComment.objects.filter(
+            memory_id=memory_id,
+            memory__vault_id__in=accessible_vault_ids(self.request)
+        ).select_related('user')
+    
+    def perform_destroy(self, instance):
+        # Dos borrados simultáneos del mismo comentario solo descuentan uno
+        with transaction.atomic():
+            deleted, _ = MemoryComment.objects.filter(pk=instance.pk).delete()
+            if deleted:
+                record_engagement(instance.memory, comments=-1)
 
 
 @api_view(['POST', 'DELETE'])
@@ -88,7 +131,7 @@ def toggle_memory_like(request, memory_id):
     Vista para dar/quitar like a un recuerdo
     """
     try:
-        memory = Memory.objects.get(id=memory_id)
+        memory = Memory.objects.get(id=memory_id, vault_id__in=accessible_vault_ids(request))
     except Memory.DoesNotExist:
         return Response(
             {'error': 'Recuerdo no encontrado'}, 
@@ -96,10 +139,13 @@ def toggle_memory_like(request, memory_id):
         )
     
     if request.method == 'POST':
-        like, created = MemoryLike.objects.get_or_create(
-            memory=memory,
-            user=request.user
-        )
+        with transaction.atomic():
+            like, created = MemoryLike.objects.get_or_create(
+                memory=memory,
+                user=request.user
+            )
+            if created:
+                record_engagement(memory, likes=1)
         if created:
             return Response(
                 {'message': 'Like agregado'}, 
@@ -112,18 +158,184 @@ def toggle_memory_like(request, memory_id):
             )
     
     elif request.method == 'DELETE':
-        try:
-            like = MemoryLike.objects.get(memory=memory, user=request.user)
-            like.delete()
+        # Solo descuenta quien borró la fila: dos DELETE simultáneos no
+        # pueden restar dos veces el mismo like
+        with transaction.atomic():
+            deleted, _ = MemoryLike.objects.filter(memory=memory, user=request.user).delete()
+            if deleted:
+                record_engagement(memory, likes=-1)
+        if deleted:
             return Response(
                 {'message': 'Like eliminado'}, 
                 status=status.HTTP_200_OK
             )
-        except MemoryLike.DoesNotExist:
-            return Response(
-                {'error': 'No tienes like en este recuerdo'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
+        return Response(
+            {'error': 'No tienes like en este recuerdo'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def memory_bulk(request):
+    """
+    Vista para crear, actualizar y eliminar recuerdos por lotes.
+    
+    Cuerpo: {"create": [...], "update": [...], "delete": [...]}, cada elemento
+    con su client_id. La respuesta indica el resultado de cada client_id.
+    """
+    try:
+        results, written = process_batch(request, request.data, accessible_vault_ids(request))
+    except BatchError as exc:
+        return Response(
+            {'error': str(exc)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    memories = Memory.objects.filter(id__in=written).with_user_state(request.user).in_bulk()
+    for result in results.values():
+        memory = memories.get(result.get('id'))
+        if memory is not None:
+            result['memory'] = MemorySerializer(memory, context={'request': request}).data
+    
+    return Response({'results': results})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([MultiPartParser])
+def memory_ingest(request):
+    """
+    Vista para crear recuerdos de tipo foto a partir de un zip de imágenes.
+    
+    La fecha y la ubicación salen del EXIF de cada foto. La ingesta se hace en
+    segundo plano; la respuesta incluye el trabajo para consultar su estado en
+    /api/jobs/<id>/.
+    """
+    archive = request.FILES.get('archive')
+    vault_id = request.data.get('vault')
+    if archive is None or not vault_id:
+        return Response(
+            {'error': 'archive y vault son requeridos'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        vault_id = uuid.UUID(str(vault_id))
+    except ValueError:
+        vault_id = None
+    if vault_id is None or not has_vault_access(request, vault_id):
+        return Response(
+            {'error': 'Vault no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        with zipfile.ZipFile(archive) as zipped:
+            check_archive(zipped)
+    except (zipfile.BadZipFile, IngestError) as exc:
+        message = str(exc) if isinstance(exc, IngestError) else 'El archivo no es un zip válido'
+        return Response(
+            {'error': message}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # El worker lee el zip desde disco
+    os.makedirs(settings.PHOTO_INGEST_DIR, exist_ok=True)
+    path = os.path.join(settings.PHOTO_INGEST_DIR, f'{uuid.uuid4().hex}.zip')
+    archive.seek(0)
+    with open(path, 'wb') as target:
+        shutil.copyfileobj(archive, target)
+    
+    tags = [tag.strip() for tag in request.data.get('tags', '').split(',') if tag.strip()]
+    job = enqueue(
+        'memories.ingest_photos',
+        {
+            'path': path, 'vault_id': str(vault_id), 'user_id': request.user.pk,
+            'tags': tags, 'description': request.data.get('description', ''),
+        },
+        user=request.user,
+    )
+    return Response({'job': JobSerializer(job).data}, status=status.HTTP_202_ACCEPTED)
+
+
+def _duplicate_distance(params):
+    value = params.get('distance')
+    if value in (None, ''):
+        return None
+    return duplicates.clamp_distance(value)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def memory_duplicates(request):
+    """
+    Vista para listar grupos de fotos casi duplicadas de un cofre.
+    
+    Parámetros: vault (requerido) y distance (bits distintos de 64 que se
+    toleran; por defecto MEMORY_DUPLICATE_DISTANCE).
+    """
+    try:
+        vault_id = uuid.UUID(request.query_params.get('vault', ''))
+        max_distance = _duplicate_distance(request.query_params)
+    except ValueError:
+        return Response(
+            {'error': 'vault y distance deben ser válidos'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not has_vault_access(request, vault_id):
+        return Response(
+            {'error': 'Vault no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    hashes = Memory.objects.filter(vault_id=vault_id, photo_hash__isnull=False).values_list(
+        'id', 'photo_hash'
+    )
+    groups = duplicates.duplicate_groups(hashes, max_distance)
+    memories = Memory.objects.filter(
+        id__in=[memory_id for group in groups for memory_id in group]
+    ).with_user_state(request.user).in_bulk()
+    results = []
+    for group in groups:
+        members = sorted(
+            (memories[memory_id] for memory_id in group if memory_id in memories),
+            key=lambda memory: memory.created_at,
+        )
+        results.append(MemorySerializer(members, many=True, context={'request': request}).data)
+    results.sort(key=len, reverse=True)
+    return Response({'count': len(results), 'groups': results})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def memory_similar(request, memory_id):
+    """
+    Vista para listar los recuerdos del mismo cofre con una foto casi igual
+    """
+    memory = get_object_or_404(
+        Memory, id=memory_id, vault_id__in=accessible_vault_ids(request)
+    )
+    try:
+        max_distance = _duplicate_distance(request.query_params)
+    except ValueError:
+        return Response(
+            {'error': 'distance inválido'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if memory.photo_hash is None:
+        return Response({'results': []})
+    
+    matches = duplicates.similar(
+        Memory.objects.filter(vault_id=memory.vault_id).with_user_state(request.user),
+        memory.photo_hash, max_distance, exclude=memory.pk,
+    )
+    results = []
+    for match, match_distance in matches:
+        data = MemorySerializer(match, context={'request': request}).data
+        data['distance'] = match_distance
+        results.append(data)
+    return Response({'results': results})
 
 
 class MemoryShareListCreateView(generics.ListCreateAPIView):
@@ -154,26 +366,79 @@ class MemoryShareDetailView(generics.RetrieveUpdateDestroyAPIView):
         ).distinct()
 
 
+def _timeline_range(params):
+    """
+    Convierte year/month en un rango [inicio, fin) de date_taken que puede usar índices
+    """
+    year = params.get('year')
+    month = params.get('month')
+    if not year:
+        return None
+    
+    year = int(year)
+    if month:
+        month = int(month)
+        start = datetime(year, month, 1)
+        end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    else:
+        start = datetime(year, 1, 1)
+        end = datetime(year + 1, 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def memory_timeline(request):
     """
-    Vista para obtener la línea de tiempo de recuerdos
+    Vista para obtener la línea de tiempo de recuerdos (paginada por cursor)
     """
     user = request.user
-    year = request.query_params.get('year')
     
-    memories = Memory.objects.filter(
-        Q(vault__owner=user) | Q(vault__members__user=user)
-    ).distinct()
+    try:
+        date_range = _timeline_range(request.query_params)
+    except ValueError:
+        return Response(
+            {'error': 'Año o mes inválido'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    vault_ids = accessible_vault_ids(request)
+    memories = Memory.objects.filter(vault_id__in=vault_ids).with_user_state(user)
     
-    if year:
-        memories = memories.filter(date_taken__year=year)
+    if date_range:
+        memories = memories.filter(date_taken__gte=date_range[0], date_taken__lt=date_range[1])
+    
+    paginator = TimelineCursorPagination()
+    page = paginator.paginate_queryset(memories, request, vault_ids=vault_ids)
+    serializer = MemorySerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def memory_timeline_buckets(request):
+    """
+    Vista para obtener el número de recuerdos por año y mes de la línea de tiempo
+    """
+    rows = Memory.objects.filter(vault_id__in=accessible_vault_ids(request)).annotate(
+        month=TruncMonth('date_taken')
+    ).values('month').annotate(count=Count('id')).order_by('-month')
     
-    memories = memories.order_by('-date_taken', '-created_at')
+    years = {}
+    undated = 0
+    for row in rows:
+        if row['month'] is None:
+            undated += row['count']
+            continue
+        month = timezone.localtime(row['month']) if timezone.is_aware(row['month']) else row['month']
+        bucket = years.setdefault(month.year, {'year': month.year, 'count': 0, 'months': []})
+        bucket['count'] += row['count']
+        bucket['months'].append({'month': month.month, 'count': row['count']})
     
-    serializer = MemorySerializer(memories, many=True, context={'request': request})
-    return Response(serializer.data)
+    return Response({
+        'years': sorted(years.values(), key=lambda bucket: bucket['year'], reverse=True),
+        'undated': undated,
+    })
 
 
 @api_view(['GET'])
@@ -182,30 +447,101 @@ def memory_stats(request):
     """
     Vista para obtener estadísticas de recuerdos
     """
-    user = request.user
+    return Response(compute_memory_stats(accessible_vault_ids(request)))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def memory_search(request):
+    """
+    Vista para buscar recuerdos por texto completo, ordenados por relevancia
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {'error': 'El parámetro q es requerido'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    vault_ids = accessible_vault_ids(request)
+    vault = request.query_params.get('vault')
+    if vault:
+        try:
+            vault_ids = vault_ids & {uuid.UUID(vault)}
+        except ValueError:
+            return Response(
+                {'error': 'Vault inválido'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    paginator = TimelineCursorPagination()
+    page_size = paginator.get_page_size(request)
+    
+    if not search.is_supported():
+        memories = search.fallback_queryset(
+            Memory.objects.filter(vault_id__in=vault_ids), query
+        ).with_user_state(request.user)[:page_size]
+        serializer = MemorySerializer(memories, many=True, context={'request': request})
+        return Response({'next': None, 'results': serializer.data})
+    
+    after = None
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        try:
+            score, memory_id = decode_cursor(cursor)
+            after = (float(score), str(memory_id))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Cursor inválido'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+    
+    hits = search.search(query, vault_ids, page_size + 1, after)
+    has_next = len(hits) > page_size
+    hits = hits[:page_size]
+    
     memories = Memory.objects.filter(
-        Q(vault__owner=user) | Q(vault__members__user=user)
-    ).distinct()
-    
-    stats = {
-        'total_memories': memories.count(),
-        'by_type': {},
-        'by_year': {},
-        'total_likes': 0,
-        'total_comments': 0,
-    }
-    
-    # Estadísticas por tipo
-    for memory_type, _ in Memory._meta.get_field('type').choices:
-        count = memories.filter(type=memory_type).count()
-        stats['by_type'][memory_type] = count
-    
-    # Estadísticas por año
-    for memory in memories:
-        if memory.date_taken:
-            year = memory.date_taken.year
-            stats['by_year'][year] = stats['by_year'].get(year, 0) + 1
-        stats['total_likes'] += memory.likes.count()
-        stats['total_comments'] += memory.comments.count()
-    
-    return Response(stats)
+        id__in=[memory_id for memory_id, _ in hits]
+    ).with_user_state(request.user).in_bulk()
+    stems = search.query_stems(query)
+    results = []
+    for memory_id, score in hits:
+        memory = memories.get(uuid.UUID(memory_id))
+        if memory is None:
+            continue
+        memory.search_score = score
+        memory.search_highlights = {
+            'title': search.highlight(memory.title, stems),
+            'description': search.highlight(memory.description, stems),
+        }
+        results.append(memory)
+    
+    next_link = None
+    if has_next:
+        last_id, last_score = hits[-1]
+        next_link = replace_query_param(
+            request.build_absolute_uri(), 'cursor', encode_cursor([last_score, last_id])
+        )
+    
+    serializer = MemorySearchResultSerializer(results, many=True, context={'request': request})
+    return Response({'next': next_link, 'results': serializer.data})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def memory_tag_facets(request):
+    """
+    Vista para obtener el número de recuerdos por etiqueta en cada cofre
+    """
+    vault_ids = accessible_vault_ids(request)
+    vault = request.query_params.get('vault')
+    if vault:
+        try:
+            vault_ids = vault_ids & {uuid.UUID(vault)}
+        except ValueError:
+            return Response(
+                {'error': 'Vault inválido'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    return Response(tag_facets(MemoryTag, vault_ids))
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Tombstone
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'vault_id', 'deleted_at')
+    list_filter = ('kind', 'deleted_at')
+    search_fields = ('object_id', 'vault_id')
+    ordering = ('-deleted_at',)
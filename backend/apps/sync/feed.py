@@ -0,0 +1,218 @@
+"""
+Feed de cambios por cofre para la sincronización incremental.
+
+El token es el instante hasta el que el cliente tiene los datos. Cada llamada
+devuelve las filas con updated_at posterior al token y las lápidas de lo
+borrado desde entonces. El nuevo token se retrasa SYNC_OVERLAP_SECONDS
+respecto al inicio de la consulta para recoger transacciones que confirmaron
+tarde; el cliente aplica los cambios de forma idempotente, así que repetir
+filas en la ventana de solapamiento no tiene efectos.
+
+Las respuestas traen como mucho page_size filas (cambios y lápidas). Si
+quedan más, has_more es true y el token es de continuación: guarda dónde
+quedó la página (tipo y último (updated_at, id)) y el token final de la
+ronda, calculado en la primera página. El cliente sigue pidiendo con ese
+token hasta has_more=false y recién entonces guarda el token recibido.
+"""
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.conversation.models import Phrase
+from apps.conversation.serializers import PhraseSerializer
+from apps.genealogy.models import Person, Relation
+from apps.genealogy.serializers import PersonSerializer, RelationSerializer
+from apps.memories.models import Memory, MemoryComment
+from apps.memories.pagination import decode_cursor, encode_cursor
+from apps.memories.serializers import MemorySerializer
+from .models import ChangeKind, Tombstone
+from .serializers import SyncCommentSerializer
+
+
+# Paso de las lápidas, después de todos los tipos
+_DELETED = 'deleted'
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class Position(NamedTuple):
+    """
+    Token decodificado: since es el punto de partida de la ronda (None =
+    instantánea completa); en una continuación, until es el token final de
+    la ronda y (step, moment, pk) la última fila entregada (sin moment, la
+    página siguiente empieza al principio de step)
+    """
+    since: datetime = None
+    until: datetime = None
+    step: str = None
+    moment: datetime = None
+    pk: str = None
+
+
+def _iso(moment):
+    return moment.isoformat() if moment else None
+
+
+def _parse(value, required=True):
+    if value is None and not required:
+        return None
+    moment = datetime.fromisoformat(value)
+    if timezone.is_naive(moment):
+        raise ValueError(value)
+    return moment
+
+
+def encode_token(moment):
+    return encode_cursor({'t': moment.isoformat()})
+
+
+def _continuation_token(since, until, step, moment, pk):
+    return encode_cursor({
+        't': _iso(since), 'e': until.isoformat(), 's': step, 'm': _iso(moment),
+        'i': str(pk) if pk is not None else None,
+    })
+
+
+def decode_token(token):
+    """
+    Position del token; lanza InvalidToken si no es válido
+    """
+    steps = {kind.value for kind in ChangeKind} | {_DELETED}
+    try:
+        payload = decode_cursor(token)
+        if 'e' not in payload:
+            return Position(since=_parse(payload['t']))
+        if payload['s'] not in steps:
+            raise ValueError(payload['s'])
+        return Position(
+            since=_parse(payload['t'], required=False), until=_parse(payload['e']),
+            step=payload['s'], moment=_parse(payload['m'], required=False),
+            pk=payload['i'] and str(payload['i']),
+        )
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise InvalidToken('Token de sincronización inválido')
+
+
+def _sources(request, vault_id):
+    """
+    Consultas y serializadores de cada tipo de objeto sincronizado
+    """
+    user = request.user
+    return {
+        ChangeKind.MEMORY: (
+            Memory.objects.filter(vault_id=vault_id).with_user_state(user),
+            MemorySerializer,
+        ),
+        ChangeKind.COMMENT: (
+            MemoryComment.objects.filter(memory__vault_id=vault_id).select_related('user'),
+            SyncCommentSerializer,
+        ),
+        ChangeKind.PERSON: (
+            Person.objects.filter(vault_id=vault_id).select_related('vault', 'created_by').annotate(
+                memories_count=Count('memories')
+            ),
+            PersonSerializer,
+        ),
+        ChangeKind.RELATION: (
+            Relation.objects.filter(vault_id=vault_id).select_related('person1', 'person2'),
+            RelationSerializer,
+        ),
+        ChangeKind.PHRASE: (
+            Phrase.objects.filter(vault_id=vault_id).select_related('vault', 'created_by').annotate(
+                playbacks_count=Count('playbacks')
+            ),
+            PhraseSerializer,
+        ),
+    }
+
+
+def _after(field, moment, pk):
+    return Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk})
+
+
+def change_feed(request, vault_id, position=None, page_size=None):
+    """
+    Una página de cambios y borrados del cofre desde position (None =
+    instantánea completa)
+    """
+    position = position or Position()
+    page_size = page_size or settings.SYNC_PAGE_SIZE
+    since = position.since
+    reset = False
+    if position.until is not None:
+        until = position.until
+    else:
+        started = timezone.now()
+        until = started - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+        # Con un token más antiguo que las lápidas conservadas no se pueden
+        # garantizar los borrados: el cliente debe descartar su copia
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        if since is not None and since < started - retention:
+            since = None
+        reset = since is None
+
+    sources = _sources(request, vault_id)
+    steps = [kind.value for kind in sources]
+    if since is not None:
+        steps.append(_DELETED)
+    if position.step is not None:
+        steps = steps[steps.index(position.step):] if position.step in steps else []
+
+    context = {'request': request}
+    changes = {kind.value: [] for kind in sources}
+    deleted = {kind.value: [] for kind in ChangeKind}
+    remaining = page_size
+    continuation = None
+    for step in steps:
+        if not remaining:
+            # Página llena justo al terminar el paso anterior
+            continuation = (step, None, None)
+            break
+        if step == _DELETED:
+            queryset, field = Tombstone.objects.filter(vault_id=vault_id), 'deleted_at'
+        else:
+            queryset, serializer_class = sources[ChangeKind(step)]
+            field = 'updated_at'
+        if since is not None:
+            queryset = queryset.filter(**{f'{field}__gt': since})
+        if step == position.step and position.moment is not None:
+            queryset = queryset.filter(_after(field, position.moment, position.pk))
+        rows = list(queryset.order_by(field, 'pk')[:remaining + 1])
+        if len(rows) > remaining:
+            rows = rows[:remaining]
+            continuation = (step, getattr(rows[-1], field), rows[-1].pk)
+
+        if step == _DELETED:
+            for tombstone in rows:
+                deleted[tombstone.kind].append(tombstone.object_id)
+        else:
+            changes[step] = serializer_class(rows, many=True, context=context).data
+        remaining -= len(rows)
+        if continuation:
+            break
+
+    has_more = continuation is not None
+    if has_more:
+        token = _continuation_token(since, until, *continuation)
+    else:
+        token = encode_token(until)
+    return {
+        'token': token,
+        'has_more': has_more,
+        'reset': reset,
+        'changes': changes,
+        'deleted': deleted,
+    }
+
+
+def prune_tombstones(now=None):
+    """
+    Elimina las lápidas más antiguas que el periodo de retención
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.sync.feed import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Elimina las lápidas de sincronización más antiguas que el periodo de retención'
+    
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} lápidas eliminadas'))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vault_id', models.UUIDField()),
+                ('kind', models.CharField(choices=[('memories', 'Recuerdos'), ('comments', 'Comentarios'), ('persons', 'Personas'), ('relations', 'Relaciones'), ('phrases', 'Frases')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Lápida',
+                'verbose_name_plural': 'Lápidas',
+                'db_table': 'sync_tombstones',
+                'ordering': ['deleted_at'],
+                'indexes': [models.Index(fields=['vault_id', 'deleted_at'], name='sync_tombstones_vault_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ChangeKind(models.TextChoices):
+    MEMORY = 'memories', 'Recuerdos'
+    COMMENT = 'comments', 'Comentarios'
+    PERSON = 'persons', 'Personas'
+    RELATION = 'relations', 'Relaciones'
+    PHRASE = 'phrases', 'Frases'
+
+
+class Tombstone(models.Model):
+    """
+    Registro de un objeto eliminado para el feed de sincronización.
+    
+    vault_id no es una clave foránea: las lápidas se crean durante el borrado
+    en cascada del propio cofre y se limpian al terminar (ver signals.py).
+    """
+    vault_id = models.UUIDField()
+    kind = models.CharField(max_length=20, choices=ChangeKind.choices)
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'sync_tombstones'
+        verbose_name = 'Lápida'
+        verbose_name_plural = 'Lápidas'
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['vault_id', 'deleted_at'], name='sync_tombstones_vault_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} - {self.deleted_at}"
@@ -0,0 +1,6 @@
+from apps.memories.serializers import MemoryCommentSerializer
+
+
+class SyncCommentSerializer(MemoryCommentSerializer):
+    class Meta(MemoryCommentSerializer.Meta):
+        fields = MemoryCommentSerializer.Meta.fields + ('memory',)
@@ -0,0 +1,93 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from apps.accounts.models import Vault
+from apps.conversation.models import Phrase
+from apps.genealogy.models import Person, Relation
+from apps.jobs.queue import enqueue
+from apps.memories.models import Memory, MemoryComment
+from .models import ChangeKind, Tombstone
+
+
+def _bury(vault_ids, kind, object_id):
+    Tombstone.objects.bulk_create([
+        Tombstone(vault_id=vault_id, kind=kind, object_id=object_id)
+        for vault_id in set(vault_ids) if vault_id is not None
+    ])
+
+
+@receiver(post_delete, sender=Memory)
+def bury_memory(sender, instance, **kwargs):
+    _bury([instance.vault_id], ChangeKind.MEMORY, instance.pk)
+
+
+@receiver(post_delete, sender=Person)
+def bury_person(sender, instance, **kwargs):
+    _bury([instance.vault_id], ChangeKind.PERSON, instance.pk)
+
+
+@receiver(post_delete, sender=Phrase)
+def bury_phrase(sender, instance, **kwargs):
+    _bury([instance.vault_id], ChangeKind.PHRASE, instance.pk)
+
+
+@receiver(post_delete, sender=MemoryComment)
+def bury_comment(sender, instance, **kwargs):
+    # En un borrado en cascada los comentarios se eliminan antes que su
+    # recuerdo, así que el cofre todavía se puede consultar
+    if MemoryComment.memory.is_cached(instance):
+        vault_ids = [instance.memory.vault_id]
+    else:
+        vault_ids = Memory.objects.filter(pk=instance.memory_id).values_list('vault_id', flat=True)
+    _bury(vault_ids, ChangeKind.COMMENT, instance.pk)
+
+
+@receiver(post_delete, sender=Relation)
+def bury_relation(sender, instance, **kwargs):
+    _bury([instance.vault_id], ChangeKind.RELATION, instance.pk)
+
+
+def _connect_moves(model, kind):
+    # Un objeto que cambia de cofre desaparece del cofre anterior: sin lápida
+    # los clientes de ese cofre lo conservarían para siempre
+    def remember_vault(sender, instance, update_fields=None, **kwargs):
+        instance._previous_vault_id = None
+        if instance._state.adding or (update_fields is not None and 'vault' not in update_fields):
+            return
+        instance._previous_vault_id = sender.objects.filter(pk=instance.pk).values_list(
+            'vault_id', flat=True
+        ).first()
+    
+    def bury_moved(sender, instance, created, **kwargs):
+        previous = getattr(instance, '_previous_vault_id', None)
+        if created or previous is None or previous == instance.vault_id:
+            return
+        _bury([previous], kind, instance.pk)
+        if model is Memory:
+            # Los comentarios se van con el recuerdo; se tocan para que los
+            # clientes del cofre nuevo los reciban en su próxima ronda
+            comments = MemoryComment.objects.filter(memory=instance)
+            Tombstone.objects.bulk_create([
+                Tombstone(vault_id=previous, kind=ChangeKind.COMMENT, object_id=comment_id)
+                for comment_id in comments.values_list('pk', flat=True)
+            ])
+            comments.update(updated_at=timezone.now())
+    
+    uid = f'sync:moves:{model._meta.label}'
+    pre_save.connect(remember_vault, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(bury_moved, sender=model, weak=False, dispatch_uid=uid)
+
+
+_connect_moves(Memory, ChangeKind.MEMORY)
+_connect_moves(Person, ChangeKind.PERSON)
+_connect_moves(Phrase, ChangeKind.PHRASE)
+
+
+@receiver(post_delete, sender=Vault)
+def clear_vault_tombstones(sender, instance, **kwargs):
+    # Un cofre borrado no tiene feed; las lápidas de su cascada se borran
+    # fuera de la petición
+    enqueue(
+        'sync.clear_vault_tombstones', {'vault_id': str(instance.pk)},
+        dedupe_key=f'sync.clear_vault_tombstones:{instance.pk}',
+    )
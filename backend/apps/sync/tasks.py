@@ -0,0 +1,10 @@
+"""
+Tareas en segundo plano de sincronización (ver apps.jobs)
+"""
+from apps.jobs.queue import task
+from .models import Tombstone
+
+
+@task('sync.clear_vault_tombstones')
+def clear_vault_tombstones(vault_id):
+    return {'deleted': Tombstone.objects.filter(vault_id=vault_id).delete()[0]}
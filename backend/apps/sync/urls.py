@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('vaults/<uuid:vault_id>/changes/', views.vault_changes, name='vault_changes'),
+]
@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from apps.accounts.access import has_vault_access
+from .feed import InvalidToken, change_feed, decode_token
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def vault_changes(request, vault_id):
+    """
+    Vista para obtener los cambios de un cofre desde un token de sincronización.
+    
+    Sin ?since= devuelve el contenido completo del cofre. La respuesta incluye
+    el token para la siguiente llamada; con reset=true el cliente debe
+    reemplazar su copia local en lugar de fusionarla. Cada respuesta trae
+    como mucho ?page_size= filas; con has_more=true se vuelve a pedir con el
+    token recibido hasta completar la ronda.
+    """
+    if not has_vault_access(request, vault_id):
+        return Response(
+            {'error': 'Vault no encontrado'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    since = request.query_params.get('since')
+    try:
+        position = decode_token(since) if since else None
+    except InvalidToken as exc:
+        return Response(
+            {'error': str(exc)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        page_size = int(request.query_params.get('page_size', settings.SYNC_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.SYNC_PAGE_SIZE
+    page_size = max(1, min(page_size, settings.SYNC_MAX_PAGE_SIZE))
+    
+    return Response(change_feed(request, vault_id, position, page_size))
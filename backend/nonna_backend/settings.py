@@ -3,6 +3,7 @@ Django settings for nonna_backend project.
 """
 
 import os
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -39,6 +40,9 @@ LOCAL_APPS = [
     'apps.memories',
     'apps.genealogy',
     'apps.conversation',
+    'apps.sync',
+    'apps.media',
+    'apps.jobs',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -127,6 +131,51 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+DEFAULT_FILE_STORAGE = 'apps.media.storage.SignedFileSystemStorage'
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=31536000, cast=int)
+# '' sirve los bytes desde Django; 'nginx' usa X-Accel-Redirect y 'apache' X-Sendfile
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+# Location interna de nginx que apunta a MEDIA_ROOT
+MEDIA_SENDFILE_PREFIX = config('MEDIA_SENDFILE_PREFIX', default='/protected-media/')
+# URLs de media firmadas: se sirven sin JWT ni consultas a la base de datos
+MEDIA_SIGNED_URLS = config('MEDIA_SIGNED_URLS', default=True, cast=bool)
+MEDIA_SIGNED_URL_TTL = config('MEDIA_SIGNED_URL_TTL', default=6 * 3600, cast=int)  # Validez mínima en segundos
+MEDIA_SIGNED_URL_WINDOW = config('MEDIA_SIGNED_URL_WINDOW', default=3600, cast=int)  # URL estable durante la ventana
+
+# Cache (en memoria por defecto; en producción conviene un backend compartido)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Segundos que se cachean los cofres accesibles de cada usuario (solo con un
+# backend compartido entre procesos; con LocMemCache se calculan en cada petición)
+VAULT_ACCESS_CACHE_TIMEOUT = config('VAULT_ACCESS_CACHE_TIMEOUT', default=300, cast=int)
+# Grafo genealógico por cofre; la clave incluye la versión, así que no queda desactualizado
+GENEALOGY_GRAPH_CACHE_TIMEOUT = config('GENEALOGY_GRAPH_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Sincronización incremental
+SYNC_OVERLAP_SECONDS = config('SYNC_OVERLAP_SECONDS', default=30, cast=int)
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=90, cast=int)
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)  # Filas por respuesta del feed
+SYNC_MAX_PAGE_SIZE = config('SYNC_MAX_PAGE_SIZE', default=2000, cast=int)
+
+# Cola de trabajos en segundo plano (manage.py run_jobs)
+JOBS_WORKERS = config('JOBS_WORKERS', default=2, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1.0, cast=float)
+JOBS_RETRY_BACKOFF = config('JOBS_RETRY_BACKOFF', default=30, cast=int)  # Segundos, se duplica en cada intento
+JOBS_RETRY_BACKOFF_MAX = config('JOBS_RETRY_BACKOFF_MAX', default=3600, cast=int)
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=1800, cast=int)  # Segundos hasta dar por muerto al worker
+JOBS_RETENTION_DAYS = config('JOBS_RETENTION_DAYS', default=7, cast=int)
+# Ejecutar los trabajos en el propio proceso al confirmar (desarrollo sin worker)
+JOBS_EAGER = config('JOBS_EAGER', default=False, cast=bool)
+
+# Análisis de audio: sin ffmpeg/ffprobe no hay versión comprimida ni picos
+# de formatos distintos de WAV
+MEDIA_FFMPEG_BINARY = config('MEDIA_FFMPEG_BINARY', default='ffmpeg')
+MEDIA_FFPROBE_BINARY = config('MEDIA_FFPROBE_BINARY', default='ffprobe')
+MEDIA_AUDIO_VARIANT_BITRATE = config('MEDIA_AUDIO_VARIANT_BITRATE', default='64k')
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -197,6 +246,30 @@ CORS_ALLOW_ALL_ORIGINS = DEBUG  # Solo en desarrollo
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Calculan el sha256 durante la subida para el almacenamiento por contenido
+FILE_UPLOAD_HANDLERS = [
+    'apps.media.uploadhandlers.HashingMemoryFileUploadHandler',
+    'apps.media.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Archivos temporales de subidas, importaciones e ingestas: fuera del código fuente
+TEMP_UPLOAD_ROOT = config('TEMP_UPLOAD_ROOT', default=os.path.join(tempfile.gettempdir(), 'nonna'))
+
+# Subidas reanudables por fragmentos (audio y video grandes)
+UPLOAD_SESSION_DIR = config('UPLOAD_SESSION_DIR', default=os.path.join(TEMP_UPLOAD_ROOT, 'uploads'))
+UPLOAD_SESSION_MAX_SIZE = config('UPLOAD_SESSION_MAX_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)
+UPLOAD_SESSION_EXPIRATION_HOURS = config('UPLOAD_SESSION_EXPIRATION_HOURS', default=24, cast=int)
+# Zips de importación de cofres a la espera del worker
+VAULT_IMPORT_DIR = config('VAULT_IMPORT_DIR', default=os.path.join(TEMP_UPLOAD_ROOT, 'imports'))
+# Ingesta masiva de fotos: zips recibidos y copias temporales de sus entradas
+PHOTO_INGEST_DIR = config('PHOTO_INGEST_DIR', default=os.path.join(TEMP_UPLOAD_ROOT, 'ingest'))
+PHOTO_INGEST_WORKERS = config('PHOTO_INGEST_WORKERS', default=4, cast=int)  # Procesos que leen el EXIF
+# Límites de los zips subidos (importación e ingesta), según el directorio central
+ZIP_MAX_ENTRIES = config('ZIP_MAX_ENTRIES', default=50000, cast=int)
+ZIP_MAX_ENTRY_SIZE = config('ZIP_MAX_ENTRY_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)
+ZIP_MAX_TOTAL_SIZE = config('ZIP_MAX_TOTAL_SIZE', default=20 * 1024 * 1024 * 1024, cast=int)
+# Distancia de Hamming máxima (de 64 bits) para considerar dos fotos casi duplicadas
+MEMORY_DUPLICATE_DISTANCE = config('MEMORY_DUPLICATE_DISTANCE', default=6, cast=int)
 
 # Logging
 LOGGING = {
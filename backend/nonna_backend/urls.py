@@ -2,9 +2,10 @@
 URL configuration for nonna_backend project.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from apps.media import views as media_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,9 +13,13 @@ urlpatterns = [
     path('api/memories/', include('apps.memories.urls')),
     path('api/genealogy/', include('apps.genealogy.urls')),
     path('api/conversation/', include('apps.conversation.urls')),
+    path('api/sync/', include('apps.sync.urls')),
+    path('api/uploads/', include('apps.media.urls')),
+    path('api/jobs/', include('apps.jobs.urls')),
+    # Media con control de acceso, Range y ETag (también en producción)
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<name>.+)$', media_views.serve_media, name='serve_media'),
 ]
 
-# Serve media files in development
+# Serve static files in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)